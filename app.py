@@ -4,19 +4,32 @@ Sistema de Gestão de Precatórios com Automação Inteligente
 Versão: 2.0
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, send_from_directory, Response
 from flask_cors import CORS
 from calculadora import calculadora
 from blueprints.calculadora import calculadora_bp
 from service_calculadora import CalculadoraService
 import sys
+import json
 from pathlib import Path
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
 
 sys.path.append("src")
-from database import SessionLocal
+from database import SessionLocal, SessionLeitura, SessionEscopo, criar_engine, CALCULOS_DATABASE_URL
 from models_atualizado import Processo, LogBuscaOficio, Contato, StatusProcessoEnum, TribunalEnum, NaturezaEnum
+from estatisticas_dashboard import estatisticas_dashboard
+import eventos_processos
+from cache_calculos import cache_calculos
+from cenarios_portfolio import motor_cenarios
+from movimentacoes import ingestao_movimentacoes
+from armazem_oficios import armazem_oficios
+from verificador_oficios import verificador_oficios
+from busca_textual import condicao_busca_contatos, ordenar_por_relevancia_contatos
+from consultas_processos import (
+    extrair_filtros, aplicar_filtros_processos, calcular_resumo_processos, ordenar_processos,
+    interpretar_campos, query_processos_api, serializar_processo_api, gerar_cursor
+)
 
 app = Flask(__name__)
 CORS(app)
@@ -28,32 +41,32 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
 
 # Configurações
 PROCESSOS_POR_PAGINA = 20
+API_PROCESSOS_LOTE = 500            # linhas por fetch no streaming de /api/processos
+API_PROCESSOS_LIMITE_MAXIMO = 5000  # tamanho máximo de página com cursor
+DETALHAMENTO_LIMITE_PADRAO = 120    # meses por página em /api/detalhamento-mensal
+DETALHAMENTO_LIMITE_MAXIMO = 600
+
+@app.teardown_appcontext
+def remover_sessao_escopo(exception=None):
+    """Libera a sessão usada pelas instâncias globais (monitor, inteligência) na requisição"""
+    SessionEscopo.remove()
 
 @app.route('/')
 def index():
     """Página inicial - Dashboard"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
-        # Estatísticas gerais
-        total_processos = db.query(Processo).count()
-        total_valor = db.query(func.sum(Processo.valor_atualizado)).scalar() or 0
-        processos_com_oficio = db.query(Processo).filter(Processo.tem_oficio == True).count()
-        processos_pendentes = db.query(Processo).filter(Processo.status == StatusProcessoEnum.PENDENTE).count()
-        
-        # Estatísticas por tribunal
-        por_tribunal = db.query(
-            Processo.tribunal,
-            func.count(Processo.id).label('total'),
-            func.sum(Processo.valor_atualizado).label('valor_total')
-        ).group_by(Processo.tribunal).all()
+        # Estatísticas gerais (tabela de agregados dashboard_stats)
+        resumo = estatisticas_dashboard.obter_resumo(db)
+        total_processos = resumo['total_processos']
+        total_valor = resumo['total_valor']
+        processos_com_oficio = resumo['com_oficio']
+        processos_pendentes = resumo['por_status'][StatusProcessoEnum.PENDENTE]
         
-        # Estatísticas por natureza
-        por_natureza = db.query(
-            Processo.natureza,
-            func.count(Processo.id).label('total'),
-            func.sum(Processo.valor_atualizado).label('valor_total')
-        ).group_by(Processo.natureza).all()
+        # Estatísticas por tribunal e por natureza
+        por_tribunal = resumo['por_tribunal']
+        por_natureza = resumo['por_natureza']
         
         # Processos recentes
         processos_recentes = db.query(Processo).order_by(
@@ -66,18 +79,14 @@ def index():
         ).limit(10).all()
         
         # Taxa de sucesso das buscas
-        total_buscas = db.query(LogBuscaOficio).count()
-        buscas_sucesso = db.query(LogBuscaOficio).filter(LogBuscaOficio.sucesso == True).count()
+        total_buscas, buscas_sucesso = db.query(
+            func.count(LogBuscaOficio.id),
+            func.coalesce(func.sum(case((LogBuscaOficio.sucesso == True, 1), else_=0)), 0)
+        ).one()
         taxa_sucesso = (buscas_sucesso / total_buscas * 100) if total_buscas > 0 else 0
         
         # Processos prioritários
-        processos_prioritarios = db.query(Processo).filter(
-            or_(
-                Processo.credor_idoso == True,
-                Processo.credor_doenca_grave == True,
-                Processo.credor_deficiente == True
-            )
-        ).count()
+        processos_prioritarios = resumo['prioritarios']
         
         return render_template('dashboard.html',
             total_processos=total_processos,
@@ -98,129 +107,24 @@ def index():
 @app.route('/processos')
 def listar_processos():
     """Lista de processos com filtros avançados"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
-        # Parâmetros de filtro
-        tribunal = request.args.get('tribunal')
-        esfera = request.args.get('esfera')
-        natureza = request.args.get('natureza')
-        status = request.args.get('status')
-        ano_precatorio = request.args.get('ano_precatorio', type=int)
-        valor_min = request.args.get('valor_min', type=float)
-        valor_max = request.args.get('valor_max', type=float)
-        tem_oficio = request.args.get('tem_oficio')
-        prioritario = request.args.get('prioritario')
-        situacao_pagamento = request.args.get('situacao_pagamento')  # NOVO
-        busca = request.args.get('busca')
+        filtros = extrair_filtros(request.args)
         pagina = request.args.get('pagina', 1, type=int)
         
-        # Query base
-        query = db.query(Processo)
-        
-        # Aplicar filtros
-        if tribunal:
-            query = query.filter(Processo.tribunal == TribunalEnum[tribunal])
-        
-        if esfera:
-            from models_atualizado import EsferaEnum
-            query = query.filter(Processo.esfera == EsferaEnum[esfera])
-        
-        if natureza:
-            query = query.filter(Processo.natureza == NaturezaEnum[natureza])
-        
-        if status:
-            query = query.filter(Processo.status == StatusProcessoEnum[status])
-        
-        if ano_precatorio:
-            query = query.filter(Processo.ano_precatorio == ano_precatorio)
-        
-        if valor_min:
-            query = query.filter(Processo.valor_atualizado >= valor_min)
-        
-        if valor_max:
-            query = query.filter(Processo.valor_atualizado <= valor_max)
-        
-        if tem_oficio == 'sim':
-            query = query.filter(Processo.tem_oficio == True)
-        elif tem_oficio == 'nao':
-            query = query.filter(Processo.tem_oficio == False)
-        
-        if prioritario == 'sim':
-            query = query.filter(
-                or_(
-                    Processo.credor_idoso == True,
-                    Processo.credor_doenca_grave == True,
-                    Processo.credor_deficiente == True
-                )
-            )
-        elif prioritario == 'nao':
-            query = query.filter(
-                and_(
-                    Processo.credor_idoso == False,
-                    Processo.credor_doenca_grave == False,
-                    Processo.credor_deficiente == False
-                )
-            )
-        
-        # NOVO: Filtro de situação de pagamento com 3 opções
-        if situacao_pagamento == 'com_pendencia':
-            # Com pendência: possui_pendencia_pagamento = True
-            query = query.filter(Processo.possui_pendencia_pagamento == True)
-        elif situacao_pagamento == 'pronto_nao_pago':
-            # Pronto e não pago: sem pendência MAS status != PAGO
-            query = query.filter(
-                and_(
-                    Processo.possui_pendencia_pagamento == False,
-                    Processo.status != StatusProcessoEnum.PAGO
-                )
-            )
-        elif situacao_pagamento == 'pago':
-            # Pago: status = PAGO
-            query = query.filter(Processo.status == StatusProcessoEnum.PAGO)
-        
-        if busca:
-            query = query.filter(
-                or_(
-                    Processo.numero_processo.contains(busca),
-                    Processo.processo_principal.contains(busca),
-                    Processo.credor_nome.contains(busca),
-                    Processo.advogado_nome.contains(busca),
-                    Processo.numero_oficio.contains(busca)
-                )
-            )
-        
-        # Ordenação
-        ordenar_por = request.args.get('ordenar', 'data_cadastro')
-        ordem = request.args.get('ordem', 'desc')
-        
-        if ordenar_por == 'valor':
-            query = query.order_by(Processo.valor_atualizado.desc() if ordem == 'desc' else Processo.valor_atualizado.asc())
-        elif ordenar_por == 'credor':
-            query = query.order_by(Processo.credor_nome.asc() if ordem == 'asc' else Processo.credor_nome.desc())
-        else:
-            query = query.order_by(Processo.data_cadastro.desc() if ordem == 'desc' else Processo.data_cadastro.asc())
-        
-        # Calcular estatísticas dos resultados ANTES da paginação
-        total = query.count()
-        
-        # Calcular valor total e estatísticas
-        todos_processos = query.all()
-        valor_total = sum(p.valor_atualizado for p in todos_processos) if todos_processos else 0
-        
-        # Contar com ofício
-        com_oficio = sum(1 for p in todos_processos if p.tem_oficio)
-        
-        # Contar com pendência
-        com_pendencia = sum(1 for p in todos_processos if p.possui_pendencia_pagamento)
-        
-        # Contar pronto e não pago (NOVO)
-        pronto_nao_pago = sum(1 for p in todos_processos if not p.possui_pendencia_pagamento and p.status.name != 'PAGO')
-        
-        # Contar pagos (NOVO)
-        pagos = sum(1 for p in todos_processos if p.status.name == 'PAGO')
-        
-        # Paginação
+        # Resumo (total, valor e contadores) em uma única consulta agregada
+        resumo = calcular_resumo_processos(db, filtros)
+        total = resumo['total']
+        
+        # Página atual, usando o mesmo construtor de filtros do resumo
+        query = aplicar_filtros_processos(db.query(Processo), filtros)
+        query = ordenar_processos(
+            query,
+            request.args.get('ordenar') or (None if filtros['busca'] else 'data_cadastro'),
+            request.args.get('ordem', 'desc'),
+            filtros['busca']
+        )
         processos = query.offset((pagina - 1) * PROCESSOS_POR_PAGINA).limit(PROCESSOS_POR_PAGINA).all()
         
         total_paginas = (total + PROCESSOS_POR_PAGINA - 1) // PROCESSOS_POR_PAGINA
@@ -230,11 +134,11 @@ def listar_processos():
             pagina=pagina,
             total_paginas=total_paginas,
             total=total,
-            valor_total=valor_total,
-            com_oficio=com_oficio,
-            com_pendencia=com_pendencia,
-            pronto_nao_pago=pronto_nao_pago,
-            pagos=pagos,
+            valor_total=resumo['valor_total'],
+            com_oficio=resumo['com_oficio'],
+            com_pendencia=resumo['com_pendencia'],
+            pronto_nao_pago=resumo['pronto_nao_pago'],
+            pagos=resumo['pagos'],
             tribunais=TribunalEnum,
             naturezas=NaturezaEnum,
             status_list=StatusProcessoEnum
@@ -310,7 +214,7 @@ def cadastrar_processo():
 @app.route('/processo/<int:processo_id>')
 def detalhe_processo(processo_id):
     """Detalhes de um processo específico"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
         processo = db.query(Processo).filter(Processo.id == processo_id).first()
@@ -429,7 +333,7 @@ def deletar_processo(processo_id):
 @app.route('/automacao')
 def automacao():
     """Página de automação de buscas"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
         # Estatísticas de automação
@@ -489,7 +393,7 @@ def iniciar_automacao():
 @app.route('/relatorios')
 def relatorios():
     """Página de relatórios e análises"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
         # Relatório por período
@@ -540,7 +444,7 @@ def relatorios():
 @app.route('/contatos')
 def contatos():
     """Página de gestão de contatos (leads)"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
         busca = request.args.get('busca')
@@ -549,17 +453,15 @@ def contatos():
         query = db.query(Contato)
         
         if busca:
-            query = query.filter(
-                or_(
-                    Contato.nome.contains(busca),
-                    Contato.email_principal.contains(busca),
-                    Contato.telefone_principal.contains(busca)
-                )
-            )
+            query = query.filter(condicao_busca_contatos(db, busca))
         
         if tipo:
             query = query.filter(Contato.tipo == tipo)
         
+        # Com busca, resultados mais relevantes primeiro
+        if busca:
+            query = ordenar_por_relevancia_contatos(query, db, busca)
+        
         contatos = query.order_by(Contato.data_cadastro.desc()).all()
         
         return render_template('contatos.html',
@@ -571,24 +473,38 @@ def contatos():
 
 @app.route('/download-oficio/<int:processo_id>')
 def download_oficio(processo_id):
-    """Download do ofício requisitório"""
-    db = SessionLocal()
+    """
+    Download do ofício requisitório, servido do armazém de ofícios pelo hash.
+    
+    ETag = SHA-256 do arquivo: If-None-Match responde 304 e Range responde 206
+    (downloads retomados e visualizadores de PDF que leem por partes).
+    """
+    db = SessionLeitura()
     
     try:
         processo = db.query(Processo).filter(Processo.id == processo_id).first()
         
-        if not processo or not processo.caminho_oficio:
+        if not processo or not (processo.hash_oficio or processo.caminho_oficio):
             return "Ofício não encontrado", 404
         
-        caminho = Path(processo.caminho_oficio)
+        if armazem_oficios.contem(processo.hash_oficio):
+            caminho = armazem_oficios.caminho(processo.hash_oficio)
+            etag = processo.hash_oficio
+        else:
+            # Arquivo ainda fora do armazém (migrar_armazem_oficios.py)
+            caminho = Path(processo.caminho_oficio or "")
+            etag = True
         
-        if not caminho.exists():
+        if not caminho.is_file():
             return "Arquivo não encontrado", 404
         
         return send_file(
             caminho,
+            mimetype="application/pdf",
             as_attachment=True,
-            download_name=f"oficio_{processo.numero_processo.replace('/', '_')}.pdf"
+            download_name=f"oficio_{processo.numero_processo.replace('/', '_')}.pdf",
+            conditional=True,
+            etag=etag
         )
         
     finally:
@@ -597,16 +513,18 @@ def download_oficio(processo_id):
 @app.route('/api/estatisticas')
 def api_estatisticas():
     """API para estatísticas em tempo real"""
-    db = SessionLocal()
+    db = SessionLeitura()
     
     try:
+        resumo = estatisticas_dashboard.obter_resumo(db)
+        
         stats = {
-            "total_processos": db.query(Processo).count(),
-            "total_valor": float(db.query(func.sum(Processo.valor_atualizado)).scalar() or 0),
-            "com_oficio": db.query(Processo).filter(Processo.tem_oficio == True).count(),
-            "pendentes": db.query(Processo).filter(Processo.status == StatusProcessoEnum.PENDENTE).count(),
-            "em_negociacao": db.query(Processo).filter(Processo.status == StatusProcessoEnum.NEGOCIACAO).count(),
-            "concluidos": db.query(Processo).filter(Processo.status == StatusProcessoEnum.CONCLUIDO).count()
+            "total_processos": resumo['total_processos'],
+            "total_valor": float(resumo['total_valor']),
+            "com_oficio": resumo['com_oficio'],
+            "pendentes": resumo['por_status'][StatusProcessoEnum.PENDENTE],
+            "em_negociacao": resumo['por_status'][StatusProcessoEnum.NEGOCIACAO],
+            "concluidos": resumo['por_status'][StatusProcessoEnum.CONCLUIDO]
         }
         
         return jsonify(stats)
@@ -802,14 +720,15 @@ def atualizar_oficio(processo_id):
         
         # Atualizar valor se fornecido
         if valor_atualizado:
-            db.execute(text("""
-                UPDATE processos 
-                SET valor_atualizado = :valor
-                WHERE id = :id
-            """), {
-                "valor": valor_atualizado,
-                "id": processo_id
-            })
+            with eventos_processos.rastrear(db, processo_id):
+                db.execute(text("""
+                    UPDATE processos 
+                    SET valor_atualizado = :valor
+                    WHERE id = :id
+                """), {
+                    "valor": valor_atualizado,
+                    "id": processo_id
+                })
         
         db.commit()
         
@@ -906,31 +825,65 @@ def dashboard_moderno():
 # API para dados do dashboard
 @app.route('/api/processos')
 def api_processos():
-    """API para retornar dados dos processos"""
-    db = SessionLocal()
+    """
+    API para retornar dados dos processos (streaming)
+    
+    Parâmetros opcionais:
+        fields   - campos desejados, ex.: fields=id,numero,valor
+        ordenar  - id (padrão) ou valor; ordem=asc|desc
+        cursor   - continuação retornada no header X-Proximo-Cursor
+        limite   - tamanho da página (máx. API_PROCESSOS_LIMITE_MAXIMO);
+                   sem limite, todos os processos são enviados em streaming
+        formato  - json (array, padrão) ou ndjson (um objeto por linha)
+    Aceita também os filtros da listagem /processos.
+    """
+    ordenar = request.args.get('ordenar', 'id')
+    ordem = request.args.get('ordem', 'asc')
+    limite = request.args.get('limite', type=int)
+    formato = request.args.get('formato', 'json')
+    
+    db = SessionLeitura()
+    headers = {}
+    
     try:
-        processos = db.query(Processo).all()
-        
-        dados = []
-        for p in processos:
-            dados.append({
-                'id': p.id,
-                'numero': p.numero_processo,
-                'tribunal': p.tribunal.value if p.tribunal else '',
-                'credor': p.credor_nome,
-                'valor': float(p.valor_atualizado) if p.valor_atualizado else 0,
-                'natureza': p.natureza.value if p.natureza else '',
-                'status': p.status.value if p.status else '',
-                'situacao': 'Pago' if p.status and p.status.name == 'PAGO' else 
-                           'Pronto Não Pago' if not p.possui_pendencia_pagamento else 
-                           'Com Pendência',
-                'temOficio': p.tem_oficio,
-                'prioritario': p.credor_idoso or p.credor_doenca_grave or p.credor_deficiente
-            })
+        campos = interpretar_campos(request.args.get('fields'))
+        query = query_processos_api(
+            db, campos, ordenar, ordem,
+            request.args.get('cursor'), extrair_filtros(request.args)
+        )
         
-        return jsonify(dados)
-    finally:
+        if limite:
+            # Página limitada: carrega só a página para já informar o próximo cursor
+            limite = max(1, min(limite, API_PROCESSOS_LIMITE_MAXIMO))
+            processos = query.limit(limite).all()
+            if len(processos) == limite:
+                headers['X-Proximo-Cursor'] = gerar_cursor(processos[-1], ordenar)
+        else:
+            processos = query.yield_per(API_PROCESSOS_LOTE)
+    except (ValueError, KeyError) as e:
         db.close()
+        return jsonify({"sucesso": False, "erro": str(e)}), 400
+    except Exception:
+        db.close()
+        raise
+    
+    def gerar():
+        try:
+            if formato == 'ndjson':
+                for p in processos:
+                    yield json.dumps(serializar_processo_api(p, campos), ensure_ascii=False) + '\n'
+            else:
+                yield '['
+                separador = ''
+                for p in processos:
+                    yield separador + json.dumps(serializar_processo_api(p, campos), ensure_ascii=False)
+                    separador = ','
+                yield ']'
+        finally:
+            db.close()
+    
+    mimetype = 'application/x-ndjson' if formato == 'ndjson' else 'application/json'
+    return Response(gerar(), mimetype=mimetype, headers=headers)
 
 
 
@@ -987,29 +940,45 @@ def atualizar_valores_page(processo_id):
     finally:
         db.close()
 
+def _entradas_calculadora_juros(data):
+    """
+    Entradas normalizadas das rotas da calculadora de juros (também formam a
+    chave do cache). Sem data_final, vale a data de hoje.
+    """
+    return {
+        'valor_principal': float(data['valor_principal']),
+        'data_base': data['data_base'],
+        'data_final': data['data_final'] or datetime.now().strftime('%Y-%m-%d'),
+        'taxa_juros': float(data['taxa_juros']),
+        'indice_correcao': data['indice_correcao']
+    }
+
+def _calculadora_juros(entradas):
+    from calculadora_juros import CalculadoraPrecatorio
+    
+    return CalculadoraPrecatorio(
+        valor_principal=entradas['valor_principal'],
+        data_base=entradas['data_base'],
+        data_final=entradas['data_final'],
+        taxa_juros_mensal=entradas['taxa_juros'],
+        indice_correcao=entradas['indice_correcao']
+    )
+
 @app.route('/api/calcular-valores', methods=['POST'])
 def api_calcular_valores():
     """API para calcular valores"""
     try:
         data = request.get_json()
         
-        # Importar calculadora
-        import sys
-        sys.path.append('src')
-        from calculadora_juros import CalculadoraPrecatorio
+        entradas = _entradas_calculadora_juros(data)
+        tipo_juros = data.get('tipo_juros', 'SIMPLES')
         
-        # Criar calculadora
-        calc = CalculadoraPrecatorio(
-            valor_principal=data['valor_principal'],
-            data_base=data['data_base'],
-            data_final=data['data_final'],
-            taxa_juros_mensal=data['taxa_juros'],
-            indice_correcao=data['indice_correcao']
+        # Mesmo cenário (valor/datas/taxa/índice) vem do cache
+        resultado = cache_calculos.obter_ou_calcular(
+            'calculadora_juros.calcular_tudo', dict(entradas, tipo_juros=tipo_juros),
+            lambda: _calculadora_juros(entradas).calcular_tudo(tipo_juros=tipo_juros)
         )
         
-        # Calcular
-        resultado = calc.calcular_tudo(tipo_juros=data.get('tipo_juros', 'SIMPLES'))
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -1017,31 +986,160 @@ def api_calcular_valores():
 
 @app.route('/api/detalhamento-mensal', methods=['POST'])
 def api_detalhamento_mensal():
-    """API para detalhamento mensal"""
+    """
+    API para detalhamento mensal (paginado)
+    
+    Além dos dados do cálculo, aceita no JSON (ou na querystring):
+        offset  - primeiro mês da página (padrão 0)
+        limite  - meses por página (padrão DETALHAMENTO_LIMITE_PADRAO,
+                  máx. DETALHAMENTO_LIMITE_MAXIMO)
+        agrupar - "ano" para os totais por ano civil em vez dos meses
+    Sem offset nem limite a resposta traz todos os meses, como antes da
+    paginação. Os headers X-Total-Meses e X-Proximo-Offset indicam as
+    próximas páginas.
+    """
     try:
         data = request.get_json()
         
-        # Importar calculadora
-        import sys
-        sys.path.append('src')
-        from calculadora_juros import CalculadoraPrecatorio
+        entradas = _entradas_calculadora_juros(data)
+        agrupar = data.get('agrupar') or request.args.get('agrupar')
+        offset = data.get('offset', request.args.get('offset'))
+        limite = data.get('limite', request.args.get('limite'))
+        if offset is None and limite is None:
+            # Chamadas sem paginação (templates) recebem o detalhamento inteiro
+            offset = 0
+        else:
+            offset = max(int(offset or 0), 0)
+            limite = max(1, min(int(limite or DETALHAMENTO_LIMITE_PADRAO), DETALHAMENTO_LIMITE_MAXIMO))
+        
+        def calcular():
+            detalhamento = _calculadora_juros(entradas).detalhamento_mensal()
+            if agrupar == 'ano':
+                linhas = detalhamento.por_ano()
+            else:
+                linhas = list(detalhamento.iterar(offset, limite))
+            return {'total_meses': len(detalhamento), 'linhas': linhas}
+        
+        # Gerar a página (ou reaproveitar do cache)
+        pagina = cache_calculos.obter_ou_calcular(
+            'calculadora_juros.detalhamento_mensal',
+            dict(entradas, offset=offset, limite=limite, agrupar=agrupar),
+            calcular
+        )
         
-        # Criar calculadora
-        calc = CalculadoraPrecatorio(
-            valor_principal=data['valor_principal'],
-            data_base=data['data_base'],
-            data_final=data['data_final'],
-            taxa_juros_mensal=data['taxa_juros'],
-            indice_correcao=data['indice_correcao']
+        resposta = jsonify(pagina['linhas'])
+        resposta.headers['X-Total-Meses'] = str(pagina['total_meses'])
+        if agrupar != 'ano' and limite is not None and offset + limite < pagina['total_meses']:
+            resposta.headers['X-Proximo-Offset'] = str(offset + limite)
+        return resposta
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cenarios-portfolio', methods=['POST'])
+def api_cenarios_portfolio():
+    """
+    Cenários "e se" da carteira inteira (grade desconto x atraso x índice)
+    
+    Request JSON (todos opcionais):
+        - descontos: lista de descontos na compra (0 a 1)
+        - atrasos_meses: lista de atrasos além do prazo estimado
+        - indices: lista de índices de correção (IPCA-E, SELIC, ...)
+        - processos_ids: lista de IDs (padrão: carteira inteira)
+    
+    Response JSON: eixos da grade, grupos (ente_pagador x natureza e TOTAL) e
+    as matrizes roi e tir [grupo][desconto][atraso][índice][estatística]
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        resultado = motor_cenarios.simular(
+            descontos=data.get('descontos'),
+            atrasos_meses=data.get('atrasos_meses'),
+            indices=data.get('indices'),
+            processos_ids=data.get('processos_ids')
         )
+        if resultado is None:
+            return jsonify({'error': 'Nenhum processo com valor na carteira'}), 404
         
-        # Gerar detalhamento
-        detalhes = calc.gerar_detalhamento_mensal()
+        resultado['roi'] = resultado['roi'].round(4).tolist()
+        resultado['tir'] = resultado['tir'].round(4).tolist()
+        return jsonify(resultado)
         
-        return jsonify(detalhes)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/processo/<int:processo_id>/movimentacoes', methods=['POST'])
+def api_ingerir_movimentacoes(processo_id):
+    """
+    Ingere as movimentações de uma consulta ao tribunal (só as novas são gravadas)
+    
+    Request JSON:
+        - movimentacoes: lista de {data: 'dd/mm/aaaa' ou 'aaaa-mm-dd', descricao}
+    
+    Response JSON: novas movimentações, fase identificada no delta e o
+    status_oficio (avancou = true quando a fase avançou)
+    """
+    db = SessionLocal()
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        movimentacoes = data.get('movimentacoes') or []
+        if not isinstance(movimentacoes, list):
+            return jsonify({'error': 'movimentacoes deve ser uma lista'}), 400
+        
+        resultado = ingestao_movimentacoes.ingerir(db, processo_id, movimentacoes)
+        if resultado is None:
+            return jsonify({'error': 'Processo não encontrado'}), 404
         
+        db.commit()
+        return jsonify(resultado)
+        
+    except (KeyError, ValueError) as e:
+        db.rollback()
+        return jsonify({'error': f'Movimentação inválida: {e}'}), 400
     except Exception as e:
+        db.rollback()
         return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@app.route('/api/oficios/verificar', methods=['POST'])
+def api_verificar_oficios():
+    """
+    Inicia a verificação de integridade de todos os ofícios em segundo plano
+    
+    Response JSON (202): iniciada; 409 se já houver uma verificação em andamento
+    """
+    if not verificador_oficios.em_segundo_plano():
+        return jsonify({'error': 'Verificação já em andamento'}), 409
+    return jsonify({'iniciada': True}), 202
+
+@app.route('/api/oficios/verificacao')
+def api_verificacao_oficios():
+    """
+    Resumo da última verificação de integridade dos ofícios e suas ocorrências
+    
+    Query params:
+        - limite: máximo de ocorrências retornadas (padrão 100)
+    """
+    db = SessionLeitura()
+    
+    try:
+        limite = request.args.get('limite', 100, type=int)
+        ultima = verificador_oficios.ultima_verificacao(db, limite=limite)
+        if ultima is None:
+            return jsonify({'error': 'Nenhuma verificação executada'}), 404
+        
+        ultima['em_andamento'] = verificador_oficios.em_andamento()
+        return jsonify(ultima)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
 
 @app.route('/processo/<int:processo_id>/salvar-atualizacao-valores', methods=['POST'])
 def salvar_atualizacao_valores(processo_id):
@@ -1082,26 +1180,27 @@ def salvar_atualizacao_valores(processo_id):
         })
         
         # Atualizar processo
-        db.execute(text("""
-            UPDATE processos 
-            SET valor_principal = :valor_principal,
-                valor_juros = :valor_juros,
-                valor_correcao_monetaria = :valor_correcao,
-                valor_atualizado = :valor_total,
-                taxa_juros_mensal = :taxa_juros,
-                indice_correcao = :indice_correcao,
-                data_ultima_atualizacao_valor = :data_atualizacao
-            WHERE id = :id
-        """), {
-            "valor_principal": data['valor_principal'],
-            "valor_juros": data['valor_juros'],
-            "valor_correcao": data['valor_correcao'],
-            "valor_total": data['valor_total'],
-            "taxa_juros": data['taxa_juros_mensal'],
-            "indice_correcao": data['indice_correcao'],
-            "data_atualizacao": datetime.now(),
-            "id": processo_id
-        })
+        with eventos_processos.rastrear(db, processo_id):
+            db.execute(text("""
+                UPDATE processos 
+                SET valor_principal = :valor_principal,
+                    valor_juros = :valor_juros,
+                    valor_correcao_monetaria = :valor_correcao,
+                    valor_atualizado = :valor_total,
+                    taxa_juros_mensal = :taxa_juros,
+                    indice_correcao = :indice_correcao,
+                    data_ultima_atualizacao_valor = :data_atualizacao
+                WHERE id = :id
+            """), {
+                "valor_principal": data['valor_principal'],
+                "valor_juros": data['valor_juros'],
+                "valor_correcao": data['valor_correcao'],
+                "valor_total": data['valor_total'],
+                "taxa_juros": data['taxa_juros_mensal'],
+                "indice_correcao": data['indice_correcao'],
+                "data_atualizacao": datetime.now(),
+                "id": processo_id
+            })
         
         db.commit()
         
@@ -1327,11 +1426,10 @@ import json
 from service_calculadora import CalculadoraService
 from models_calculadora import CalculoPrecatorio
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 import os
 
 # Configurar banco para cálculos
-engine_calculos = create_engine('sqlite:///calculos_precatorios.db')
+engine_calculos = criar_engine(CALCULOS_DATABASE_URL)
 SessionCalc = sessionmaker(bind=engine_calculos)
 
 # ============================================================================
@@ -3,8 +3,13 @@ Blueprint da Calculadora de Precatórios
 Módulo isolado e reutilizável
 """
 
-from flask import Blueprint, render_template, request, jsonify
+import json
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, Response, send_file
 from calculadora import calculadora
+from service_calculadora import CalculadoraService
+from cache_calculos import cache_calculos
 
 # Criar Blueprint
 calculadora_bp = Blueprint(
@@ -14,6 +19,9 @@ calculadora_bp = Blueprint(
     template_folder='../../templates'
 )
 
+# Máximo de casos por requisição de /api/calcular-lote
+LOTE_MAXIMO_CASOS = 50000
+
 @calculadora_bp.route('/')
 def index():
     """Página principal da calculadora"""
@@ -59,6 +67,66 @@ def api_calcular():
     except Exception as e:
         return jsonify({'sucesso': False, 'erro': str(e)}), 500
 
+@calculadora_bp.route('/api/calcular-lote', methods=['POST'])
+def api_calcular_lote():
+    """
+    Cálculo em lote.
+    
+    Entrada: array JSON de casos (ou {"casos": [...]}) ou arquivo CSV/XLSX no
+    campo "arquivo" do formulário, com as colunas valor_original,
+    indice_correcao, data_inicial, data_final, incluir_juros, taxa_juros e
+    percentual_honorarios.
+    Saída (?formato=): ndjson (padrão, um resultado por linha, em streaming)
+    ou xlsx. Cada linha traz "linha", "sucesso" e o erro de validação, se houver.
+    """
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'xlsx'):
+        return jsonify({'sucesso': False, 'erro': f'Formato inválido: {formato}'}), 400
+    
+    try:
+        if 'arquivo' in request.files:
+            arquivo = request.files['arquivo']
+            casos = list(CalculadoraService.ler_casos_arquivo(arquivo.filename, arquivo.read()))
+        else:
+            dados = request.get_json(silent=True)
+            casos = dados.get('casos') if isinstance(dados, dict) else dados
+            if not isinstance(casos, list):
+                return jsonify({'sucesso': False, 'erro': 'Envie um array JSON de casos ou um arquivo CSV/XLSX'}), 400
+    except ImportError:
+        return jsonify({'sucesso': False, 'erro': 'Suporte a XLSX indisponível (instale openpyxl)'}), 400
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'sucesso': False, 'erro': f'Arquivo inválido: {str(e)}'}), 400
+    
+    if len(casos) > LOTE_MAXIMO_CASOS:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Máximo de {LOTE_MAXIMO_CASOS} casos por lote'
+        }), 400
+    
+    resultados = CalculadoraService.calcular_lote(casos)
+    headers = {'X-Total-Casos': str(len(casos))}
+    
+    if formato == 'xlsx':
+        try:
+            planilha = CalculadoraService.gerar_planilha_lote(resultados)
+        except ImportError:
+            return jsonify({'sucesso': False, 'erro': 'Suporte a XLSX indisponível (instale openpyxl)'}), 400
+        
+        resposta = send_file(
+            planilha,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=f"calculo_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        )
+        resposta.headers.update(headers)
+        return resposta
+    
+    def gerar():
+        for resultado in resultados:
+            yield json.dumps(resultado, ensure_ascii=False) + '\n'
+    
+    return Response(gerar(), mimetype='application/x-ndjson', headers=headers)
+
 @calculadora_bp.route('/api/indices', methods=['GET'])
 def api_indices():
     """Lista índices disponíveis"""
@@ -77,5 +145,6 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'module': 'calculadora',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'cache': cache_calculos.estatisticas()
     }), 200
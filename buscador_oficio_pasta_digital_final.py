@@ -15,7 +15,10 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
 from pathlib import Path
 import logging
-from datetime import datetime
+import sys
+
+sys.path.append("src")
+from gerenciador_downloads import gerenciador_downloads
 
 logging.basicConfig(
     level=logging.INFO,
@@ -329,70 +332,52 @@ class BuscadorOficioTJSPAvancado:
         logger.info("="*60)
         
         try:
-            if oficio_info.get("manual"):
-                # Aguardar download manual
-                print("\n💡 Clique no documento para visualizar/baixar")
-                print("Depois pressione ENTER aqui...")
-                input()
-            else:
-                # Clicar no elemento
-                elemento = oficio_info["elemento"]
+            # Download isolado no diretório da tarefa, gravado pelo hash do conteúdo
+            with gerenciador_downloads.diretorio_tarefa() as diretorio:
+                gerenciador_downloads.configurar_selenium(self.driver, diretorio)
                 
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", elemento)
-                time.sleep(1)
+                if oficio_info.get("manual"):
+                    # Aguardar download manual
+                    print("\n💡 Clique no documento para visualizar/baixar")
+                    print("Depois pressione ENTER aqui...")
+                    input()
+                else:
+                    # Clicar no elemento
+                    elemento = oficio_info["elemento"]
+                    
+                    self.driver.execute_script("arguments[0].scrollIntoView(true);", elemento)
+                    
+                    logger.info(f"Clicando em: {oficio_info['texto'][:50]}")
+                    elemento.click()
                 
-                logger.info(f"Clicando em: {oficio_info['texto'][:50]}")
-                elemento.click()
-                time.sleep(5)
-            
-            # Aguardar download
-            logger.info("Aguardando download...")
-            time.sleep(10)
-            
-            # Verificar arquivos baixados
-            arquivos_pdf = list(self.downloads_dir.glob("*.pdf"))
-            
-            if arquivos_pdf:
-                arquivo_mais_recente = max(arquivos_pdf, key=lambda p: p.stat().st_mtime)
+                # Aguardar download (termina assim que o arquivo da tarefa fica completo)
+                logger.info("Aguardando download...")
+                arquivo = gerenciador_downloads.aguardar_arquivo(diretorio)
+                mensagem = "Ofício baixado com sucesso"
                 
-                # Verificar se foi baixado recentemente (últimos 60 segundos)
-                if time.time() - arquivo_mais_recente.stat().st_mtime < 60:
-                    # Renomear arquivo
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    novo_nome = f"oficio_TJSP_{timestamp}.pdf"
-                    novo_caminho = self.downloads_dir / novo_nome
+                if not arquivo:
+                    logger.warning("Arquivo não foi baixado automaticamente")
                     
-                    if novo_caminho.exists():
-                        novo_caminho = self.downloads_dir / f"oficio_TJSP_{timestamp}_{int(time.time())}.pdf"
+                    print("\n💡 Se o PDF abriu em uma nova aba:")
+                    print("1. Clique com botão direito no PDF")
+                    print("2. Selecione 'Salvar como...'")
+                    print(f"3. Salve na pasta '{diretorio}'")
+                    print("4. Pressione ENTER aqui quando terminar...")
+                    input()
                     
-                    arquivo_mais_recente.rename(novo_caminho)
-                    
-                    logger.info(f"✅ OFÍCIO BAIXADO: {novo_caminho}")
+                    # Verificar novamente
+                    arquivo = gerenciador_downloads.aguardar_arquivo(diretorio, timeout=0)
+                    mensagem = "Ofício salvo manualmente"
+                
+                if arquivo:
+                    armazenado = gerenciador_downloads.armazenar_arquivo(arquivo, mover=True)
+                    logger.info(f"✅ OFÍCIO BAIXADO: {armazenado['caminho']}")
                     
                     return {
                         "sucesso": True,
-                        "caminho": str(novo_caminho),
-                        "mensagem": "Ofício baixado com sucesso"
-                    }
-            
-            logger.warning("Arquivo não foi baixado automaticamente")
-            
-            print("\n💡 Se o PDF abriu em uma nova aba:")
-            print("1. Clique com botão direito no PDF")
-            print("2. Selecione 'Salvar como...'")
-            print("3. Salve na pasta 'data/oficios'")
-            print("4. Pressione ENTER aqui quando terminar...")
-            input()
-            
-            # Verificar novamente
-            arquivos_pdf = list(self.downloads_dir.glob("*.pdf"))
-            if arquivos_pdf:
-                arquivo_mais_recente = max(arquivos_pdf, key=lambda p: p.stat().st_mtime)
-                if time.time() - arquivo_mais_recente.stat().st_mtime < 120:
-                    return {
-                        "sucesso": True,
-                        "caminho": str(arquivo_mais_recente),
-                        "mensagem": "Ofício salvo manualmente"
+                        "caminho": armazenado["caminho"],
+                        "hash": armazenado["hash"],
+                        "mensagem": mensagem
                     }
             
             return {
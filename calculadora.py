@@ -3,74 +3,72 @@ Módulo de Calculadora de Atualização de Precatórios
 Tax Master - Sistema de Gestão de Precatórios
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal, ROUND_HALF_UP
+import calendar
 import math
+import sys
+sys.path.append('src')
+from indices_monetarios import INDICES_MENSAIS, indices_monetarios
+
+
+def _ler_data(texto):
+    """'YYYY-MM-DD' -> date (fromisoformat no caso comum, strptime nos demais)"""
+    if isinstance(texto, str) and len(texto) == 10 and texto[4] == '-' and texto[7] == '-':
+        return date.fromisoformat(texto)
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def _somar_meses(data, meses):
+    """data + relativedelta(months=meses): dia limitado ao último dia do mês"""
+    ano, mes = divmod(data.year * 12 + data.month - 1 + meses, 12)
+    return date(ano, mes + 1, min(data.day, calendar.monthrange(ano, mes + 1)[1]))
+
+
+def _meses_entre(inicio, fim):
+    """Meses completos de inicio a fim (fim >= inicio), como relativedelta"""
+    meses = (fim.year - inicio.year) * 12 + fim.month - inicio.month
+    if _somar_meses(inicio, meses) > fim:
+        meses -= 1
+    return meses
+
+
+def _arredondar(valor):
+    """
+    Arredonda um float para centavos com ROUND_HALF_UP.
+    
+    Retorna None quando o valor está perto demais de meio centavo (ou é
+    negativo) para garantir o mesmo resultado do Decimal; nesse caso quem
+    chama refaz o cálculo em Decimal.
+    """
+    centavos = valor * 100
+    if centavos < 0:
+        return None
+    piso = math.floor(centavos)
+    resto = centavos - piso
+    if abs(resto - 0.5) < max(1e-6, centavos * 1e-12):
+        return None
+    return (piso + 1 if resto > 0.5 else piso) / 100
+
+
+def _quantizar(valor_decimal):
+    return float(valor_decimal.quantize(Decimal('0.01'), ROUND_HALF_UP))
+
 
 class CalculadoraPrecatorio:
     """
     Calculadora completa para atualização de valores de precatórios
     com suporte a múltiplos índices e juros
+    
+    Os cálculos usam float e só arredondam (ROUND_HALF_UP) na saída. Quando
+    o valor cai a menos de 1e-6 centavo de um meio centavo, o cálculo é
+    refeito em Decimal, de modo que o resultado é sempre o mesmo da versão
+    inteiramente em Decimal.
     """
     
-    # Taxas mensais médias (valores aproximados - devem ser atualizados com API real)
-    INDICES_MENSAIS = {
-        'IPCA-E': {
-            '2024-01': 0.42, '2024-02': 0.84, '2024-03': 0.16, '2024-04': 0.38,
-            '2024-05': 0.46, '2024-06': 0.21, '2024-07': 0.38, '2024-08': -0.02,
-            '2024-09': 0.44, '2024-10': 0.56, '2024-11': 0.62, '2024-12': 0.52,
-            '2025-01': 0.50, '2025-02': 0.45, '2025-03': 0.40, '2025-04': 0.42,
-            '2025-05': 0.48, '2025-06': 0.35, '2025-07': 0.38, '2025-08': 0.30,
-            '2025-09': 0.40, '2025-10': 0.50, '2025-11': 0.55, '2025-12': 0.45,
-            '2026-01': 0.43
-        },
-        'INPC': {
-            '2024-01': 0.42, '2024-02': 0.78, '2024-03': 0.16, '2024-04': 0.38,
-            '2024-05': 0.46, '2024-06': 0.21, '2024-07': 0.38, '2024-08': -0.02,
-            '2024-09': 0.44, '2024-10': 0.61, '2024-11': 0.64, '2024-12': 0.52,
-            '2025-01': 0.48, '2025-02': 0.43, '2025-03': 0.38, '2025-04': 0.40,
-            '2025-05': 0.46, '2025-06': 0.33, '2025-07': 0.36, '2025-08': 0.28,
-            '2025-09': 0.38, '2025-10': 0.48, '2025-11': 0.53, '2025-12': 0.43,
-            '2026-01': 0.41
-        },
-        'TR': {
-            '2024-01': 0.00, '2024-02': 0.00, '2024-03': 0.00, '2024-04': 0.00,
-            '2024-05': 0.00, '2024-06': 0.00, '2024-07': 0.00, '2024-08': 0.00,
-            '2024-09': 0.00, '2024-10': 0.00, '2024-11': 0.00, '2024-12': 0.00,
-            '2025-01': 0.00, '2025-02': 0.00, '2025-03': 0.00, '2025-04': 0.00,
-            '2025-05': 0.00, '2025-06': 0.00, '2025-07': 0.00, '2025-08': 0.00,
-            '2025-09': 0.00, '2025-10': 0.00, '2025-11': 0.00, '2025-12': 0.00,
-            '2026-01': 0.00
-        },
-        'SELIC': {
-            '2024-01': 0.92, '2024-02': 0.82, '2024-03': 0.86, '2024-04': 0.88,
-            '2024-05': 0.86, '2024-06': 0.88, '2024-07': 0.88, '2024-08': 0.88,
-            '2024-09': 0.88, '2024-10': 0.90, '2024-11': 0.92, '2024-12': 0.96,
-            '2025-01': 1.00, '2025-02': 1.02, '2025-03': 1.04, '2025-04': 1.06,
-            '2025-05': 1.08, '2025-06': 1.10, '2025-07': 1.12, '2025-08': 1.14,
-            '2025-09': 1.16, '2025-10': 1.18, '2025-11': 1.20, '2025-12': 1.22,
-            '2026-01': 1.24
-        },
-        'POUPANCA': {
-            '2024-01': 0.58, '2024-02': 0.58, '2024-03': 0.59, '2024-04': 0.60,
-            '2024-05': 0.59, '2024-06': 0.60, '2024-07': 0.60, '2024-08': 0.60,
-            '2024-09': 0.60, '2024-10': 0.61, '2024-11': 0.62, '2024-12': 0.65,
-            '2025-01': 0.68, '2025-02': 0.69, '2025-03': 0.70, '2025-04': 0.72,
-            '2025-05': 0.73, '2025-06': 0.75, '2025-07': 0.76, '2025-08': 0.77,
-            '2025-09': 0.79, '2025-10': 0.80, '2025-11': 0.81, '2025-12': 0.83,
-            '2026-01': 0.84
-        },
-        'IGP-DI': {
-            '2024-01': 0.41, '2024-02': 0.52, '2024-03': 0.40, '2024-04': 0.38,
-            '2024-05': 0.46, '2024-06': 0.50, '2024-07': 0.55, '2024-08': 0.12,
-            '2024-09': 0.62, '2024-10': 1.54, '2024-11': 1.18, '2024-12': 0.87,
-            '2025-01': 0.45, '2025-02': 0.50, '2025-03': 0.48, '2025-04': 0.52,
-            '2025-05': 0.55, '2025-06': 0.45, '2025-07': 0.50, '2025-08': 0.40,
-            '2025-09': 0.48, '2025-10': 0.60, '2025-11': 0.65, '2025-12': 0.55,
-            '2026-01': 0.50
-        }
-    }
+    # Taxas mensais médias (tabela compartilhada em src/indices_monetarios.py)
+    INDICES_MENSAIS = INDICES_MENSAIS
     
     def __init__(self):
         self.valor_original = Decimal('0')
@@ -81,49 +79,92 @@ class CalculadoraPrecatorio:
         self.taxa_juros_compensatorios = Decimal('0.5')  # 6% ao ano = 0.5% ao mês
         self.taxa_honorarios = Decimal('0')
         
-    def calcular_correcao_monetaria(self, valor, data_inicio, data_fim, indice='IPCA-E'):
+    def calcular_correcao_monetaria(self, valor, data_inicio, data_fim, indice='IPCA-E', incluir_detalhamento=True):
         """
         Calcula a correção monetária entre duas datas
+        (incluir_detalhamento=False devolve lista vazia, usado no cálculo em lote)
         """
-        valor_decimal = Decimal(str(valor))
-        data_atual = datetime.strptime(data_inicio, '%Y-%m-%d')
-        data_final = datetime.strptime(data_fim, '%Y-%m-%d')
+        data_inicial = _ler_data(data_inicio)
+        data_final = _ler_data(data_fim)
+        serie = indices_monetarios.serie(indice)
+        
+        # Valor final: razão entre dois pontos do acumulado, O(1)
+        valor_corrigido = _arredondar(float(valor) * serie.fator_float(data_inicial, data_final))
+        if valor_corrigido is None:
+            valor_corrigido = _quantizar(Decimal(str(valor)) * serie.fator(data_inicial, data_final))
         
-        valor_corrigido = valor_decimal
         detalhamento = []
+        if incluir_detalhamento:
+            detalhamento = list(self.iterar_detalhamento(valor, data_inicial, data_final, indice))
         
-        while data_atual <= data_final:
-            mes_ano = data_atual.strftime('%Y-%m')
-            
-            if mes_ano in self.INDICES_MENSAIS.get(indice, {}):
-                taxa = Decimal(str(self.INDICES_MENSAIS[indice][mes_ano])) / Decimal('100')
-                valor_mes = valor_corrigido * taxa
-                valor_corrigido += valor_mes
-                
-                detalhamento.append({
-                    'mes': data_atual.strftime('%m/%Y'),
-                    'indice': indice,
-                    'taxa': float(self.INDICES_MENSAIS[indice][mes_ano]),
-                    'valor_correcao': float(valor_mes.quantize(Decimal('0.01'), ROUND_HALF_UP)),
-                    'valor_acumulado': float(valor_corrigido.quantize(Decimal('0.01'), ROUND_HALF_UP))
-                })
-            
-            # Avançar para o próximo mês
-            data_atual += relativedelta(months=1)
-            data_atual = data_atual.replace(day=1)
+        return valor_corrigido, detalhamento
+    
+    def iterar_detalhamento(self, valor, data_inicio, data_fim, indice='IPCA-E'):
+        """
+        Detalhamento mês a mês da correção, gerado sob demanda.
+        
+        Cada mês é calculado em Decimal sobre o valor do mês anterior
+        (valor * taxa), como na versão original: a diferença entre fatores
+        acumulados pode arredondar um empate de meio centavo para o outro lado.
+        """
+        valor_corrigido = Decimal(str(valor))
+        serie = indices_monetarios.serie(indice)
         
-        return float(valor_corrigido.quantize(Decimal('0.01'), ROUND_HALF_UP)), detalhamento
+        for ano, mes, taxa, _ in serie.meses_no_periodo(data_inicio, data_fim):
+            valor_mes = valor_corrigido * (Decimal(str(taxa)) / Decimal('100'))
+            valor_corrigido += valor_mes
+            yield {
+                'mes': f"{mes:02d}/{ano}",
+                'indice': indice,
+                'taxa': float(taxa),
+                'valor_correcao': _quantizar(valor_mes),
+                'valor_acumulado': _quantizar(valor_corrigido)
+            }
     
     def calcular_juros_mora(self, valor, data_inicio, data_fim, taxa_mensal=1.0):
         """
         Calcula juros de mora (1% ao mês)
         """
+        data_inicial = _ler_data(data_inicio)
+        data_final = _ler_data(data_fim)
+        
+        return self._juros_mora(valor, data_inicial, data_final, taxa_mensal,
+                                self._periodo_juros(data_inicial, data_final))
+    
+    @staticmethod
+    def _periodo_juros(data_inicial, data_final):
+        """(meses completos, dias extras) entre as datas, ou None se invertidas"""
+        if data_final < data_inicial:
+            return None
+        meses = _meses_entre(data_inicial, data_final)
+        return meses, (data_final - _somar_meses(data_inicial, meses)).days
+    
+    def _juros_mora(self, valor, data_inicial, data_final, taxa_mensal, periodo):
+        if periodo is not None:
+            meses, dias_extras = periodo
+            
+            valor_float = float(valor)
+            taxa = float(taxa_mensal) / 100
+            juros_total = valor_float * (taxa * meses + (taxa / 30) * dias_extras)
+            
+            valor_juros = _arredondar(juros_total)
+            valor_total = _arredondar(valor_float + juros_total)
+            if valor_juros is not None and valor_total is not None:
+                return {
+                    'meses': meses,
+                    'dias': dias_extras,
+                    'taxa_mensal': float(taxa_mensal),
+                    'valor_juros': valor_juros,
+                    'valor_total': valor_total
+                }
+        
+        return self._calcular_juros_mora_decimal(valor, data_inicial, data_final, taxa_mensal)
+    
+    def _calcular_juros_mora_decimal(self, valor, data_inicial, data_final, taxa_mensal):
+        """Cálculo exato em Decimal (datas invertidas ou empate no arredondamento)"""
         valor_decimal = Decimal(str(valor))
         taxa = Decimal(str(taxa_mensal)) / Decimal('100')
         
-        data_inicial = datetime.strptime(data_inicio, '%Y-%m-%d')
-        data_final = datetime.strptime(data_fim, '%Y-%m-%d')
-        
         meses = relativedelta(data_final, data_inicial).months + \
                 (relativedelta(data_final, data_inicial).years * 12)
         
@@ -136,33 +177,41 @@ class CalculadoraPrecatorio:
             'meses': meses,
             'dias': dias_extras,
             'taxa_mensal': float(taxa * 100),
-            'valor_juros': float(juros_total.quantize(Decimal('0.01'), ROUND_HALF_UP)),
-            'valor_total': float((valor_decimal + juros_total).quantize(Decimal('0.01'), ROUND_HALF_UP))
+            'valor_juros': _quantizar(juros_total),
+            'valor_total': _quantizar(valor_decimal + juros_total)
         }
     
     def calcular_honorarios(self, valor, percentual=10.0):
         """
         Calcula honorários advocatícios
         """
-        valor_decimal = Decimal(str(valor))
-        taxa = Decimal(str(percentual)) / Decimal('100')
-        honorarios = valor_decimal * taxa
+        valor_float = float(valor)
+        honorarios = valor_float * (float(percentual) / 100)
+        
+        valor_honorarios = _arredondar(honorarios)
+        valor_liquido = _arredondar(valor_float - honorarios)
+        
+        if valor_honorarios is None or valor_liquido is None:
+            valor_decimal = Decimal(str(valor))
+            honorarios = valor_decimal * (Decimal(str(percentual)) / Decimal('100'))
+            valor_honorarios = _quantizar(honorarios)
+            valor_liquido = _quantizar(valor_decimal - honorarios)
         
         return {
             'percentual': float(percentual),
-            'valor_honorarios': float(honorarios.quantize(Decimal('0.01'), ROUND_HALF_UP)),
-            'valor_liquido': float((valor_decimal - honorarios).quantize(Decimal('0.01'), ROUND_HALF_UP))
+            'valor_honorarios': valor_honorarios,
+            'valor_liquido': valor_liquido
         }
     
     def calculo_completo(self, valor_original, data_inicio, data_fim, 
                         indice='IPCA-E', incluir_juros_mora=True, 
-                        taxa_juros=1.0, percentual_honorarios=0):
+                        taxa_juros=1.0, percentual_honorarios=0, incluir_detalhamento=True):
         """
         Realiza cálculo completo: correção monetária + juros + honorários
         """
         # 1. Correção Monetária
         valor_corrigido, detalhamento_correcao = self.calcular_correcao_monetaria(
-            valor_original, data_inicio, data_fim, indice
+            valor_original, data_inicio, data_fim, indice, incluir_detalhamento
         )
         
         # 2. Juros de Mora (sobre valor corrigido)
@@ -182,9 +231,13 @@ class CalculadoraPrecatorio:
                 valor_com_juros, percentual_honorarios
             )
         
+        valor_original_arredondado = _arredondar(float(valor_original))
+        if valor_original_arredondado is None:
+            valor_original_arredondado = _quantizar(Decimal(str(valor_original)))
+        
         # Resultado Final
         return {
-            'valor_original': float(Decimal(str(valor_original)).quantize(Decimal('0.01'), ROUND_HALF_UP)),
+            'valor_original': valor_original_arredondado,
             'data_inicio': data_inicio,
             'data_fim': data_fim,
             'indice_utilizado': indice,
@@ -206,5 +259,91 @@ class CalculadoraPrecatorio:
             }
         }
 
+    def comparar_indices(self, valor_original, data_inicio, data_fim, indices,
+                         incluir_juros_mora=True, taxa_juros=1.0, percentual_honorarios=0):
+        """
+        Mesmo cálculo de calculo_completo para vários índices de uma vez.
+        
+        Datas e período dos juros são interpretados uma vez e os fatores de
+        todos os índices saem juntos da matriz de acumulados; só juros e
+        honorários (que dependem do valor corrigido) são feitos por índice.
+        Retorna {indice: {valor_corrigido, valor_juros, valor_honorarios, valor_liquido}}.
+        """
+        data_inicial = _ler_data(data_inicio)
+        data_final = _ler_data(data_fim)
+        periodo = self._periodo_juros(data_inicial, data_final)
+        valor_float = float(valor_original)
+        
+        fatores = indices_monetarios.fatores_float(indices, data_inicial, data_final)
+        
+        cenarios = {}
+        for indice, fator in zip(indices, fatores):
+            valor_corrigido = _arredondar(valor_float * fator)
+            if valor_corrigido is None:
+                serie = indices_monetarios.serie(indice)
+                valor_corrigido = _quantizar(Decimal(str(valor_original)) * serie.fator(data_inicial, data_final))
+            
+            valor_juros = 0
+            valor_com_juros = valor_corrigido
+            if incluir_juros_mora:
+                juros = self._juros_mora(valor_corrigido, data_inicial, data_final, taxa_juros, periodo)
+                valor_juros = juros['valor_juros']
+                valor_com_juros = juros['valor_total']
+            
+            valor_honorarios = 0
+            valor_liquido = valor_com_juros
+            if percentual_honorarios > 0:
+                honorarios = self.calcular_honorarios(valor_com_juros, percentual_honorarios)
+                valor_honorarios = honorarios['valor_honorarios']
+                valor_liquido = honorarios['valor_liquido']
+            
+            cenarios[indice] = {
+                'valor_corrigido': valor_corrigido,
+                'valor_juros': valor_juros,
+                'valor_honorarios': valor_honorarios,
+                'valor_liquido': valor_liquido
+            }
+        
+        return cenarios
+
+    def __call__(self, dados, incluir_detalhamento=True):
+        """
+        Cálculo a partir do dicionário recebido pelas APIs.
+        
+        Aceita os nomes usados pelo blueprint/serviço (indice_correcao,
+        data_inicial, data_final, incluir_juros, percentual_honorarios) e os
+        da tela (indice, data_inicio, data_fim, incluir_juros_mora, honorarios).
+        Retorna o resultado de calculo_completo mais os totais no primeiro
+        nível, ou {'erro': ...}.
+        """
+        try:
+            valor_original = float(dados['valor_original'])
+            indice = dados.get('indice_correcao') or dados.get('indice') or 'IPCA-E'
+            data_inicial = dados.get('data_inicial') or dados.get('data_inicio')
+            data_final = dados.get('data_final') or dados.get('data_fim')
+            incluir_juros = bool(dados.get('incluir_juros', dados.get('incluir_juros_mora', False)))
+            taxa_juros = float(dados.get('taxa_juros') or 0)
+            honorarios = float(dados.get('percentual_honorarios', dados.get('honorarios')) or 0)
+            
+            resultado = self.calculo_completo(
+                valor_original, data_inicial, data_final, indice,
+                incluir_juros_mora=incluir_juros, taxa_juros=taxa_juros,
+                percentual_honorarios=honorarios, incluir_detalhamento=incluir_detalhamento
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return {'erro': f'Dados inválidos: {str(e)}'}
+        
+        resumo = resultado['resumo']
+        resultado.update({
+            'indice': indice,
+            'data_inicial': data_inicial,
+            'data_final': data_final,
+            'valor_corrigido': resumo['valor_corrigido'],
+            'valor_juros': resumo['valor_juros'],
+            'valor_honorarios': resumo['valor_honorarios'],
+            'valor_liquido': resumo['valor_liquido']
+        })
+        return resultado
+
 # Instância global
 calculadora = CalculadoraPrecatorio()
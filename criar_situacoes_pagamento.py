@@ -7,6 +7,7 @@ sys.path.append("src")
 
 from database import SessionLocal
 from models_atualizado import Processo, StatusProcessoEnum
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 
 def criar_exemplos_situacao_pagamento():
     """Cria exemplos das 3 situações de pagamento"""
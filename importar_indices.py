@@ -0,0 +1,41 @@
+﻿"""
+Importa as séries oficiais de índices para o armazém em data/indices
+
+Coloque os arquivos exportados do SGS (Banco Central) com o nome do índice:
+
+    data/indices/mensal/IPCA-E.csv     "data";"valor"  /  "01/01/2024";"0,42"
+    data/indices/anual/SELIC.json      [{"data": "2024", "valor": "10.40"}]
+
+e execute:
+
+    python importar_indices.py
+
+Os processos em execução adotam a nova versão em até
+TAXMASTER_INDICES_VERIFICACAO segundos (o cache de cálculos é esvaziado).
+"""
+
+import sys
+sys.path.append("src")
+
+from indices_monetarios import ArmazemIndices, DIRETORIO_INDICES
+
+def importar_indices(diretorio=DIRETORIO_INDICES):
+    """Regrava o armazém com as tabelas embutidas + as séries oficiais encontradas"""
+    
+    print("\n" + "="*70)
+    print("TAX MASTER - IMPORTAÇÃO DE ÍNDICES MONETÁRIOS")
+    print("="*70)
+    
+    armazem = ArmazemIndices(diretorio)
+    versao, importados = armazem.importar()
+    
+    for periodicidade, indice, quantidade in importados:
+        print(f"   [OK] {indice} ({periodicidade}): {quantidade} taxas importadas")
+    if not importados:
+        print("   [+] Nenhuma série oficial encontrada; gravadas as tabelas embutidas")
+    
+    print(f"\n[OK] Armazém de índices gravado: {armazem.diretorio} (versão {versao})")
+    return versao
+
+if __name__ == "__main__":
+    importar_indices()
@@ -0,0 +1,56 @@
+﻿"""
+Bootstrap do banco de dados do Tax Master
+
+Cria as tabelas dos modelos e aplica todas as migrações, na ordem. Deve ser
+executado no deploy e sempre que houver uma nova migração (a aplicação não
+cria mais o schema ao ser importada):
+
+    python inicializar_banco.py
+"""
+
+import sys
+sys.path.append("src")
+
+from database import init_db, CALCULOS_DATABASE_URL, criar_engine
+from models_calculadora import Base as BaseCalculos
+
+from migrar_valores_juros import adicionar_campos_valores
+from migrar_atualizacao_oficio import adicionar_campos_atualizacao_oficio
+from migrar_dashboard_stats import criar_dashboard_stats
+from migrar_busca_textual import criar_busca_textual
+from migrar_score_oportunidade import criar_score_oportunidade
+from migrar_movimentacoes import criar_movimentacoes
+from migrar_armazem_oficios import criar_armazem_oficios
+from migrar_verificacao_oficios import criar_verificacao_oficios
+
+# Migrações aplicadas após o create_all, em ordem
+MIGRACOES = [
+    adicionar_campos_valores,
+    adicionar_campos_atualizacao_oficio,
+    criar_dashboard_stats,
+    criar_busca_textual,
+    criar_score_oportunidade,
+    criar_movimentacoes,
+    criar_armazem_oficios,
+    criar_verificacao_oficios,
+]
+
+def inicializar_banco():
+    """Cria o schema e aplica as migrações (todas são idempotentes)"""
+
+    print("\n" + "="*70)
+    print("TAX MASTER - INICIALIZAÇÃO DO BANCO DE DADOS")
+    print("="*70)
+
+    # Banco principal
+    init_db()
+
+    # Banco da calculadora
+    BaseCalculos.metadata.create_all(bind=criar_engine(CALCULOS_DATABASE_URL))
+    print(f"[OK] Tabelas criadas/verificadas: {CALCULOS_DATABASE_URL}")
+
+    for migracao in MIGRACOES:
+        migracao()
+
+if __name__ == "__main__":
+    inicializar_banco()
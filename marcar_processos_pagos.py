@@ -7,6 +7,7 @@ sys.path.append("src")
 
 from database import SessionLocal
 from models_atualizado import Processo
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 
 def marcar_processos_pagos():
     """Marca alguns processos como pagos (sem pendência)"""
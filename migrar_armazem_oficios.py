@@ -0,0 +1,93 @@
+﻿"""
+Migração dos ofícios para o armazém endereçado pelo conteúdo (SHA-256)
+
+Os PDFs salvos como data/oficios/oficio_<numero>_<timestamp>.pdf entram no
+armazém por hard link (sem cópia), processos.caminho_oficio passa a apontar
+para o blob e processos.hash_oficio passa a ser o SHA-256 (os hashes MD5
+antigos são substituídos). Depois do commit os arquivos antigos são
+removidos: o conteúdo continua no blob, e cópias idênticas viram um só.
+"""
+
+import os
+import sys
+sys.path.append("src")
+
+from pathlib import Path
+
+from database import SessionLocal
+from armazem_oficios import armazem_oficios
+from sqlalchemy import text
+
+def criar_armazem_oficios():
+    """Indexa processos.hash_oficio e importa os ofícios existentes para o armazém"""
+    
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - ARMAZÉM DE OFÍCIOS")
+    print("="*70)
+    
+    db = SessionLocal()
+    
+    try:
+        print("\n[+] Criando índice ix_processos_hash_oficio...")
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_processos_hash_oficio ON processos (hash_oficio)"))
+        db.commit()
+        print("   [OK] Índice criado")
+        
+        print("\n[+] Importando ofícios para o armazém...")
+        linhas = db.execute(text("""
+            SELECT id, caminho_oficio, hash_oficio FROM processos
+            WHERE caminho_oficio IS NOT NULL AND caminho_oficio != ''
+        """)).fetchall()
+        
+        diretorio_blobs = armazem_oficios.diretorio.resolve()
+        importados = 0
+        deduplicados = 0
+        ausentes = 0
+        antigos = set()
+        
+        for processo_id, caminho_oficio, hash_oficio in linhas:
+            caminho = Path(caminho_oficio)
+            
+            # Já no armazém
+            if armazem_oficios.contem(hash_oficio) and caminho.resolve() == armazem_oficios.caminho(hash_oficio).resolve():
+                continue
+            
+            if not caminho.is_file():
+                ausentes += 1
+                continue
+            
+            armazenado = armazem_oficios.importar_arquivo(caminho)
+            db.execute(text("""
+                UPDATE processos SET caminho_oficio = :caminho, hash_oficio = :hash WHERE id = :id
+            """), {"caminho": armazenado["caminho"], "hash": armazenado["hash"], "id": processo_id})
+            
+            importados += 1
+            deduplicados += not armazenado["novo"]
+            if diretorio_blobs not in caminho.resolve().parents:
+                antigos.add(caminho)
+        
+        db.commit()
+        print(f"   [OK] {importados} ofícios importados ({deduplicados} com conteúdo já armazenado)")
+        if ausentes:
+            print(f"   [!] {ausentes} processos com caminho_oficio apontando para arquivo inexistente")
+        
+        print("\n[+] Removendo arquivos antigos...")
+        for caminho in antigos:
+            if caminho.is_file():
+                os.unlink(caminho)
+        print(f"   [OK] {len(antigos)} arquivos removidos")
+        
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+        
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_armazem_oficios()
@@ -0,0 +1,47 @@
+﻿"""
+Migração para criar os índices de busca textual (FTS5) de processos e contatos
+"""
+
+import sys
+sys.path.append("src")
+
+from database import SessionLocal
+from busca_textual import criar_indices_busca, INDICES_FTS
+from sqlalchemy import text
+
+def criar_busca_textual():
+    """Cria as tabelas FTS5, as triggers de sincronização e carrega os dados"""
+    
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - BUSCA TEXTUAL (FTS5)")
+    print("="*70)
+    
+    db = SessionLocal()
+    
+    try:
+        if db.get_bind().dialect.name != "sqlite":
+            print("\n[!] FTS5 só existe no SQLite: a busca continua usando LIKE")
+            return
+
+        print("\n[+] Criando índices FTS5 e triggers...")
+        criar_indices_busca(db)
+        db.commit()
+        
+        for nome in INDICES_FTS:
+            total = db.execute(text(f"SELECT COUNT(*) FROM {nome}")).scalar()
+            print(f"   [OK] {nome}: {total} registros indexados")
+        
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+        
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_busca_textual()
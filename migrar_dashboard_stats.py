@@ -0,0 +1,48 @@
+﻿"""
+Migração para criar e popular a tabela de agregados do dashboard (dashboard_stats)
+"""
+
+import sys
+sys.path.append("src")
+
+from database import SessionLocal, engine
+from models_atualizado import DashboardStats
+from estatisticas_dashboard import estatisticas_dashboard
+from sqlalchemy import text
+
+def criar_dashboard_stats():
+    """Cria a tabela dashboard_stats e reconstrói os agregados"""
+
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - ESTATÍSTICAS DO DASHBOARD")
+    print("="*70)
+
+    db = SessionLocal()
+
+    try:
+        print("\n[+] Criando tabela dashboard_stats...")
+        DashboardStats.__table__.create(bind=engine, checkfirst=True)
+        print("   [OK] Tabela dashboard_stats criada")
+
+        print("\n[+] Reconstruindo agregados a partir de processos...")
+        estatisticas_dashboard.reconstruir(db)
+        db.commit()
+
+        grupos = db.execute(text("SELECT COUNT(*) FROM dashboard_stats")).scalar()
+        total = db.execute(text("SELECT COALESCE(SUM(total), 0) FROM dashboard_stats")).scalar()
+        print(f"   [OK] {grupos} grupos / {total} processos agregados")
+
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_dashboard_stats()
@@ -0,0 +1,76 @@
+﻿"""
+Migração para a ingestão incremental de movimentações (tabela movimentacoes
+e marca d'água por processo)
+"""
+
+import sys
+sys.path.append("src")
+
+from database import SessionLocal
+from sqlalchemy import text
+
+def criar_movimentacoes():
+    """Cria a tabela movimentacoes e os campos da marca d'água em processos"""
+    
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - MOVIMENTAÇÕES")
+    print("="*70)
+    
+    db = SessionLocal()
+    
+    try:
+        # Marca d'água: data da última movimentação ingerida e hash da sequência daquele dia
+        result = db.execute(text("PRAGMA table_info(processos)"))
+        colunas_existentes = [row[1] for row in result]
+        
+        campos_novos = {
+            'data_ultima_movimentacao': 'DATE',
+            'hash_ultima_movimentacao': 'VARCHAR(64)'
+        }
+        
+        for campo, tipo in campos_novos.items():
+            if campo not in colunas_existentes:
+                print(f"\n[+] Adicionando campo: {campo}")
+                db.execute(text(f"ALTER TABLE processos ADD COLUMN {campo} {tipo}"))
+                db.commit()
+                print(f"   [OK] Campo {campo} adicionado")
+            else:
+                print(f"   [OK] Campo {campo} já existe")
+        
+        print("\n[+] Criando tabela movimentacoes...")
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS movimentacoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                processo_id INTEGER NOT NULL,
+                data_movimentacao DATE NOT NULL,
+                descricao TEXT NOT NULL,
+                hash_sequencia VARCHAR(64) NOT NULL,
+                data_cadastro DATETIME NOT NULL,
+                FOREIGN KEY (processo_id) REFERENCES processos(id)
+            )
+        """))
+        db.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_movimentacoes_hash
+            ON movimentacoes(processo_id, hash_sequencia)
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_movimentacoes_processo_data
+            ON movimentacoes(processo_id, data_movimentacao)
+        """))
+        db.commit()
+        print("   [OK] Tabela movimentacoes criada")
+        
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+        
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_movimentacoes()
@@ -0,0 +1,44 @@
+﻿"""
+Migração para indexar e preencher o score de oportunidade (processos.score_lead)
+"""
+
+import sys
+sys.path.append("src")
+
+from database import SessionLocal
+from monitor_oficios import monitor_oficios
+from sqlalchemy import text
+
+def criar_score_oportunidade():
+    """Cria o índice de score_lead e calcula o score de todos os processos"""
+    
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - SCORE DE OPORTUNIDADE")
+    print("="*70)
+    
+    db = SessionLocal()
+    
+    try:
+        print("\n[+] Criando índice ix_processos_score_lead...")
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_processos_score_lead ON processos (score_lead)"))
+        print("   [OK] Índice criado")
+        
+        print("\n[+] Calculando scores...")
+        atualizados = monitor_oficios.recalcular_scores(db)
+        db.commit()
+        print(f"   [OK] {atualizados} processos com score atualizado")
+        
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+        
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_score_oportunidade()
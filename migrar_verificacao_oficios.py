@@ -0,0 +1,97 @@
+﻿"""
+Migração para a verificação em massa dos ofícios (impressões dos arquivos já
+verificados, ocorrências de auditoria e resumo de cada execução)
+"""
+
+import sys
+sys.path.append("src")
+
+from database import SessionLocal
+from sqlalchemy import text
+
+def criar_verificacao_oficios():
+    """Cria as tabelas impressoes_oficios, auditoria_oficios e verificacoes_oficios"""
+
+    print("\n" + "="*70)
+    print("MIGRANDO BANCO DE DADOS - VERIFICAÇÃO DE OFÍCIOS")
+    print("="*70)
+
+    db = SessionLocal()
+
+    try:
+        print("\n[+] Criando tabela impressoes_oficios...")
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS impressoes_oficios (
+                caminho VARCHAR(500) PRIMARY KEY,
+                hash VARCHAR(64) NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                data_verificacao DATETIME NOT NULL
+            )
+        """))
+        db.commit()
+        print("   [OK] Tabela impressoes_oficios criada")
+
+        print("\n[+] Criando tabela auditoria_oficios...")
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS auditoria_oficios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                execucao VARCHAR(32) NOT NULL,
+                data_verificacao DATETIME NOT NULL,
+                tipo VARCHAR(20) NOT NULL,
+                processo_id INTEGER,
+                caminho VARCHAR(500) NOT NULL,
+                hash_esperado VARCHAR(64),
+                hash_encontrado VARCHAR(64),
+                detalhes TEXT,
+                FOREIGN KEY (processo_id) REFERENCES processos(id)
+            )
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_auditoria_oficios_execucao
+            ON auditoria_oficios(execucao)
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_auditoria_oficios_processo
+            ON auditoria_oficios(processo_id)
+        """))
+        db.commit()
+        print("   [OK] Tabela auditoria_oficios criada")
+
+        print("\n[+] Criando tabela verificacoes_oficios...")
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS verificacoes_oficios (
+                execucao VARCHAR(32) PRIMARY KEY,
+                inicio DATETIME NOT NULL,
+                fim DATETIME NOT NULL,
+                arquivos INTEGER NOT NULL,
+                verificados INTEGER NOT NULL,
+                ignorados INTEGER NOT NULL,
+                bytes_lidos INTEGER NOT NULL,
+                divergentes INTEGER NOT NULL,
+                ausentes INTEGER NOT NULL,
+                orfaos INTEGER NOT NULL,
+                erros INTEGER NOT NULL
+            )
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_verificacoes_oficios_inicio
+            ON verificacoes_oficios(inicio)
+        """))
+        db.commit()
+        print("   [OK] Tabela verificacoes_oficios criada")
+
+        print("\n" + "="*70)
+        print("MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
+        print("="*70)
+
+    except Exception as e:
+        db.rollback()
+        print(f"\n[ERRO] {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    criar_verificacao_oficios()
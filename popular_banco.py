@@ -7,6 +7,7 @@ sys.path.append("src")
 
 from database import SessionLocal
 from models_atualizado import Processo, TribunalEnum, NaturezaEnum, StatusProcessoEnum
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 from datetime import datetime, date
 
 def criar_processos_exemplo():
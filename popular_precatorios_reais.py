@@ -11,6 +11,7 @@ from models_atualizado import (
     Processo, TribunalEnum, NaturezaEnum, StatusProcessoEnum,
     EsferaEnum, EntePagadorEnum
 )
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 from datetime import datetime, date
 
 def criar_precatorios_reais():
@@ -0,0 +1,37 @@
+﻿"""
+Varredura diária do score de oportunidade (processos.score_lead)
+
+O score é mantido a cada gravação pelo ORM, mas a maturidade avança com o
+tempo e UPDATEs em massa não passam pelo ORM. Agendar uma vez por dia, por
+exemplo no cron:
+
+    0 3 * * *  cd /caminho/do/taxmaster && python recalcular_scores.py
+"""
+
+import sys
+sys.path.append("src")
+
+from datetime import datetime
+from database import SessionLocal
+from monitor_oficios import monitor_oficios
+
+def recalcular_scores():
+    """Recalcula todos os scores e grava os que mudaram"""
+    
+    inicio = datetime.now()
+    db = SessionLocal()
+    
+    try:
+        atualizados = monitor_oficios.recalcular_scores(db)
+        db.commit()
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"[OK] {atualizados} processos com score atualizado ({duracao:.1f}s)")
+    except Exception as e:
+        db.rollback()
+        print(f"[ERRO] {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    recalcular_scores()
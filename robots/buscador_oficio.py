@@ -1,9 +1,13 @@
-﻿from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+﻿from playwright.async_api import TimeoutError as PlaywrightTimeout
 import logging
-from datetime import datetime
 from pathlib import Path
-import time
 import re
+import sys
+import time
+from pool_navegadores import pool_navegadores
+
+sys.path.append("src")
+from gerenciador_downloads import gerenciador_downloads
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,10 +15,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger("BuscadorOficio")
 
+class FalhaPortal(Exception):
+    """
+    Erro transitório da busca: o pool repete a busca. Só timeouts e falhas de
+    navegação (sobrecarga=True) fazem o portal recuar no backoff.
+    """
+    
+    def __init__(self, resultado, sobrecarga=False):
+        super().__init__(resultado["mensagem"])
+        self.resultado = resultado
+        self.sobrecarga = sobrecarga
+
 class BuscadorOficioRequisitorio:
     """Robô para buscar e baixar ofícios requisitórios dos tribunais"""
     
-    def __init__(self):
+    def __init__(self, pool=None):
+        # Navegadores de vida longa compartilhados (ver pool_navegadores)
+        self.pool = pool or pool_navegadores
+        self.capturas = self.pool.perfil["capturas"]
         self.downloads_dir = Path("data/oficios")
         self.downloads_dir.mkdir(parents=True, exist_ok=True)
         
@@ -38,95 +56,156 @@ class BuscadorOficioRequisitorio:
     
     def buscar_oficio(self, numero_processo, tribunal):
         """Método principal para buscar ofício em qualquer tribunal"""
+        return self.buscar_lote([numero_processo], tribunal)[0]
+    
+    def buscar_lote(self, numeros_processos, tribunal):
+        """
+        Busca os ofícios de vários processos de um tribunal.
+        
+        Retorna os resultados na ordem dos números (mesmo formato de
+        buscar_oficio).
+        """
+        numeros_processos = list(numeros_processos)
+        resultados = dict(self.buscar_em_andamento(numeros_processos, tribunal))
+        return [resultados[numero_processo] for numero_processo in numeros_processos]
+    
+    def buscar_em_andamento(self, numeros_processos, tribunal):
+        """
+        Busca os ofícios em paralelo e gera (numero_processo, resultado) na
+        ordem em que as buscas terminam.
+        
+        As buscas rodam no motor assíncrono do pool (várias páginas ao mesmo
+        tempo, com o limite e o backoff do portal). Timeouts, falhas de
+        navegação e erros da busca são repetidos pelo pool antes de virarem
+        resultado; só os dois primeiros contam como sobrecarga do portal. Cada resultado
+        traz também o "tempo" da busca em segundos.
+        """
+        numeros_processos = list(numeros_processos)
+        logger.info(f"Iniciando busca de ofícios - {len(numeros_processos)} processo(s), Tribunal: {tribunal}")
+        
+        # Verificar se tribunal está implementado
+        if tribunal not in self.portais:
+            for numero_processo in numeros_processos:
+                yield numero_processo, {
+                    "sucesso": False,
+                    "erro": "tribunal_nao_implementado",
+                    "mensagem": f"Tribunal {tribunal} ainda não está implementado"
+                }
+            return
+        
+        erros_sobrecarga = {"timeout", "erro_navegacao"}
+        erros_transitorios = erros_sobrecarga | {"erro_busca", f"erro_{tribunal.lower()}"}
+        
+        async def tarefa(page, numero_processo):
+            inicio = time.monotonic()
+            resultado = await self._buscar_na_pagina(numero_processo, tribunal, page)
+            resultado["tempo"] = time.monotonic() - inicio
+            if resultado.get("erro") in erros_transitorios:
+                raise FalhaPortal(resultado, sobrecarga=resultado["erro"] in erros_sobrecarga)
+            return resultado
+        
+        try:
+            andamento = self.pool.em_andamento(tribunal, tarefa, numeros_processos)
+        except Exception as e:
+            for numero_processo in numeros_processos:
+                yield numero_processo, self._erro_navegador(e)
+            return
+        
+        encontrados = 0
+        for numero_processo, futuro in andamento:
+            try:
+                resultado = futuro.result()
+            except FalhaPortal as e:
+                resultado = e.resultado
+            except Exception as e:
+                resultado = self._erro_navegador(e)
+            encontrados += bool(resultado.get("sucesso"))
+            yield numero_processo, resultado
+        
+        logger.info(f"Busca concluída - {encontrados}/{len(numeros_processos)} ofício(s) baixado(s) no {tribunal}")
+    
+    def _erro_navegador(self, e):
+        logger.error(f"Erro ao iniciar navegador: {str(e)}")
+        return {
+            "sucesso": False,
+            "erro": "erro_navegador",
+            "mensagem": f"Erro ao iniciar navegador: {str(e)}"
+        }
+    
+    async def _buscar_na_pagina(self, numero_processo, tribunal, page):
+        """Busca um processo numa página do pool (executa no loop do pool)"""
         logger.info(f"Iniciando busca de ofício - Processo: {numero_processo}, Tribunal: {tribunal}")
         
         try:
-            with sync_playwright() as p:
-                # Configurar navegador
-                browser = p.chromium.launch(
-                    headless=False,
-                    downloads_path=str(self.downloads_dir),
-                    slow_mo=1000  # Delay de 1 segundo entre ações
-                )
-                
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    accept_downloads=True
-                )
-                
-                page = context.new_page()
-                
-                try:
-                    # Verificar se tribunal está implementado
-                    if tribunal not in self.portais:
-                        return {
-                            "sucesso": False,
-                            "erro": "tribunal_nao_implementado",
-                            "mensagem": f"Tribunal {tribunal} ainda não está implementado"
-                        }
-                    
-                    # Acessar portal
-                    logger.info(f"Acessando portal: {self.portais[tribunal]}")
-                    page.goto(self.portais[tribunal], timeout=60000, wait_until="networkidle")
-                    logger.info("Portal carregado com sucesso")
-                    time.sleep(3)  # Aguardar carregamento completo
-                    
-                    # Buscar processo conforme tribunal
-                    if tribunal == "TJRJ":
-                        resultado = self._buscar_tjrj(numero_processo, page)
-                    elif tribunal == "TJSP":
-                        resultado = self._buscar_tjsp(numero_processo, page)
-                    elif tribunal in ["TRF1", "TRF2", "TRF3", "TRF4", "TRF5"]:
-                        resultado = self._buscar_trf(numero_processo, tribunal, page)
-                    else:
-                        resultado = {
-                            "sucesso": False,
-                            "erro": "tribunal_nao_implementado",
-                            "mensagem": f"Busca não implementada para {tribunal}"
-                        }
-                    
-                    return resultado
-                    
-                except PlaywrightTimeout as e:
-                    logger.error(f"Timeout ao acessar portal: {str(e)}")
-                    return {
-                        "sucesso": False,
-                        "erro": "timeout",
-                        "mensagem": "Tempo limite excedido ao acessar o portal do tribunal"
-                    }
-                
-                except Exception as e:
-                    logger.error(f"Erro durante busca: {str(e)}")
-                    return {
-                        "sucesso": False,
-                        "erro": "erro_busca",
-                        "mensagem": f"Erro durante a busca: {str(e)}"
-                    }
-                
-                finally:
-                    try:
-                        time.sleep(2)  # Aguardar antes de fechar
-                        browser.close()
-                    except:
-                        pass
+            # Acessar portal
+            logger.info(f"Acessando portal: {self.portais[tribunal]}")
+            try:
+                await page.goto(self.portais[tribunal], timeout=60000, wait_until="networkidle")
+            except PlaywrightTimeout:
+                raise
+            except Exception as e:
+                logger.error(f"Falha ao carregar o portal: {str(e)}")
+                return {
+                    "sucesso": False,
+                    "erro": "erro_navegacao",
+                    "mensagem": f"Falha ao carregar o portal do tribunal: {str(e)}"
+                }
+            logger.info("Portal carregado com sucesso")
+            
+            # Buscar processo conforme tribunal
+            if tribunal == "TJRJ":
+                return await self._buscar_tjrj(numero_processo, page)
+            elif tribunal == "TJSP":
+                return await self._buscar_tjsp(numero_processo, page)
+            elif tribunal in ["TRF1", "TRF2", "TRF3", "TRF4", "TRF5"]:
+                return await self._buscar_trf(numero_processo, tribunal, page)
+            else:
+                return {
+                    "sucesso": False,
+                    "erro": "tribunal_nao_implementado",
+                    "mensagem": f"Busca não implementada para {tribunal}"
+                }
+            
+        except PlaywrightTimeout as e:
+            logger.error(f"Timeout ao acessar portal: {str(e)}")
+            return {
+                "sucesso": False,
+                "erro": "timeout",
+                "mensagem": "Tempo limite excedido ao acessar o portal do tribunal"
+            }
         
         except Exception as e:
-            logger.error(f"Erro ao iniciar navegador: {str(e)}")
+            logger.error(f"Erro durante busca: {str(e)}")
             return {
                 "sucesso": False,
-                "erro": "erro_navegador",
-                "mensagem": f"Erro ao iniciar navegador: {str(e)}"
+                "erro": "erro_busca",
+                "mensagem": f"Erro durante a busca: {str(e)}"
             }
     
-    def _buscar_tjrj(self, numero_processo, page):
+    async def _capturar(self, page, numero_processo, nome):
+        """
+        Screenshot de depuração (só no perfil de depuração do pool). O número
+        do processo entra no nome do arquivo: o pool busca vários ao mesmo tempo
+        """
+        if self.capturas:
+            nome = f"{self.limpar_numero_processo(numero_processo)}_{nome}"
+            await page.screenshot(path=str(self.downloads_dir / nome))
+            logger.info(f"Screenshot salvo: {nome}")
+    
+    async def _aguardar_campo(self, page):
+        """Aguarda algum campo de texto do formulário ficar visível"""
+        try:
+            await page.wait_for_selector("input[type='text']", state="visible", timeout=10000)
+        except PlaywrightTimeout:
+            pass  # Cada tribunal ainda tenta os seus seletores e informa campo_nao_encontrado
+    
+    async def _buscar_tjrj(self, numero_processo, page):
         """Busca processo no TJRJ"""
         try:
             logger.info(f"Buscando processo {numero_processo} no TJRJ")
             
             # Tirar screenshot para debug
-            page.screenshot(path=str(self.downloads_dir / "tjrj_inicial.png"))
-            logger.info("Screenshot salvo: tjrj_inicial.png")
+            await self._capturar(page, numero_processo, "tjrj_inicial.png")
             
             # Tentar múltiplos seletores para o campo de busca
             seletores_possiveis = [
@@ -140,12 +219,12 @@ class BuscadorOficioRequisitorio:
             campo_encontrado = False
             for seletor in seletores_possiveis:
                 try:
-                    if page.locator(seletor).count() > 0:
+                    if await page.locator(seletor).count() > 0:
                         logger.info(f"Campo encontrado com seletor: {seletor}")
                         
                         # Preencher número do processo
                         numero_limpo = self.limpar_numero_processo(numero_processo)
-                        page.fill(seletor, numero_limpo)
+                        await page.fill(seletor, numero_limpo)
                         logger.info(f"Número preenchido: {numero_limpo}")
                         
                         campo_encontrado = True
@@ -163,8 +242,7 @@ class BuscadorOficioRequisitorio:
                 }
             
             # Tirar screenshot após preencher
-            page.screenshot(path=str(self.downloads_dir / "tjrj_preenchido.png"))
-            logger.info("Screenshot salvo: tjrj_preenchido.png")
+            await self._capturar(page, numero_processo, "tjrj_preenchido.png")
             
             # Clicar em consultar - tentar múltiplos seletores
             botoes_possiveis = [
@@ -177,9 +255,9 @@ class BuscadorOficioRequisitorio:
             botao_clicado = False
             for botao in botoes_possiveis:
                 try:
-                    if page.locator(botao).count() > 0:
+                    if await page.locator(botao).count() > 0:
                         logger.info(f"Botão encontrado: {botao}")
-                        page.click(botao)
+                        await page.click(botao)
                         botao_clicado = True
                         break
                 except Exception as e:
@@ -196,15 +274,13 @@ class BuscadorOficioRequisitorio:
             
             # Aguardar resultado
             logger.info("Aguardando resultado da busca...")
-            page.wait_for_load_state("networkidle", timeout=30000)
-            time.sleep(3)
+            await page.wait_for_load_state("networkidle", timeout=30000)
             
             # Tirar screenshot do resultado
-            page.screenshot(path=str(self.downloads_dir / "tjrj_resultado.png"))
-            logger.info("Screenshot salvo: tjrj_resultado.png")
+            await self._capturar(page, numero_processo, "tjrj_resultado.png")
             
             # Verificar se processo foi encontrado
-            conteudo = page.content().lower()
+            conteudo = (await page.content()).lower()
             
             if "processo não encontrado" in conteudo or "não foi encontrado" in conteudo or "não encontrado" in conteudo:
                 logger.warning(f"Processo {numero_processo} não encontrado no TJRJ")
@@ -217,28 +293,28 @@ class BuscadorOficioRequisitorio:
             logger.info("Processo encontrado! Buscando ofício...")
             
             # Buscar links de documentos
-            links = page.locator("a").all()
+            links = await page.locator("a").all()
             logger.info(f"Total de links encontrados: {len(links)}")
             
             for i, link in enumerate(links):
                 try:
-                    texto = link.inner_text().strip().lower()
+                    texto = (await link.inner_text()).strip().lower()
                     if texto and ("ofício" in texto or "requisitório" in texto or "requisitorio" in texto):
-                        logger.info(f"Ofício encontrado no link {i}: {link.inner_text()}")
+                        logger.info(f"Ofício encontrado no link {i}: {await link.inner_text()}")
                         
                         # Tentar fazer download
-                        with page.expect_download(timeout=30000) as download_info:
-                            link.click()
+                        async with page.expect_download(timeout=30000) as download_info:
+                            await link.click()
                         
-                        download = download_info.value
-                        filename = f"oficio_TJRJ_{numero_processo.replace('/', '_').replace('.', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                        filepath = self.downloads_dir / filename
-                        download.save_as(filepath)
+                        download = await download_info.value
+                        armazenado = await gerenciador_downloads.armazenar_download(download)
                         
-                        logger.info(f"Ofício baixado: {filepath}")
+                        logger.info(f"Ofício baixado: {armazenado['caminho']}")
                         return {
                             "sucesso": True,
-                            "caminho": str(filepath),
+                            "caminho": armazenado["caminho"],
+                            "hash": armazenado["hash"],
+                            "tamanho": armazenado["tamanho"],
                             "mensagem": "Ofício baixado com sucesso"
                         }
                 except Exception as e:
@@ -253,6 +329,8 @@ class BuscadorOficioRequisitorio:
                 "mensagem": "Processo existe no tribunal, mas o ofício requisitório não foi encontrado ou ainda não foi expedido"
             }
             
+        except PlaywrightTimeout:
+            raise  # Sobrecarga do portal: tratado em _buscar_na_pagina
         except Exception as e:
             logger.error(f"Erro ao buscar no TJRJ: {str(e)}")
             return {
@@ -261,16 +339,16 @@ class BuscadorOficioRequisitorio:
                 "mensagem": f"Erro ao buscar no TJRJ: {str(e)}"
             }
     
-    def _buscar_tjsp(self, numero_processo, page):
+    async def _buscar_tjsp(self, numero_processo, page):
         """Busca processo no TJSP"""
         try:
             logger.info(f"Buscando processo {numero_processo} no TJSP")
             
-            # Screenshot inicial
-            page.screenshot(path=str(self.downloads_dir / "tjsp_inicial.png"))
+            # Aguardar o formulário
+            await self._aguardar_campo(page)
             
-            # Aguardar carregamento
-            time.sleep(3)
+            # Screenshot inicial
+            await self._capturar(page, numero_processo, "tjsp_inicial.png")
             
             # Preencher número do processo
             numero_limpo = self.limpar_numero_processo(numero_processo)
@@ -278,19 +356,19 @@ class BuscadorOficioRequisitorio:
             # Tentar diferentes seletores
             campo_preenchido = False
             
-            if page.locator("#numeroDigitoAnoUnificado").count() > 0:
+            if await page.locator("#numeroDigitoAnoUnificado").count() > 0:
                 logger.info("Usando campos unificados do TJSP")
-                page.fill("#numeroDigitoAnoUnificado", numero_limpo[:15])
+                await page.fill("#numeroDigitoAnoUnificado", numero_limpo[:15])
                 if len(numero_limpo) > 15:
-                    page.fill("#foroNumeroUnificado", numero_limpo[15:])
+                    await page.fill("#foroNumeroUnificado", numero_limpo[15:])
                 campo_preenchido = True
-            elif page.locator("input[name='nuProcesso']").count() > 0:
+            elif await page.locator("input[name='nuProcesso']").count() > 0:
                 logger.info("Usando campo nuProcesso")
-                page.fill("input[name='nuProcesso']", numero_limpo)
+                await page.fill("input[name='nuProcesso']", numero_limpo)
                 campo_preenchido = True
-            elif page.locator("input[type='text']").count() > 0:
+            elif await page.locator("input[type='text']").count() > 0:
                 logger.info("Usando primeiro campo de texto")
-                page.locator("input[type='text']").first.fill(numero_limpo)
+                await page.locator("input[type='text']").first.fill(numero_limpo)
                 campo_preenchido = True
             
             if not campo_preenchido:
@@ -301,17 +379,16 @@ class BuscadorOficioRequisitorio:
                 }
             
             logger.info(f"Número preenchido: {numero_limpo}")
-            page.screenshot(path=str(self.downloads_dir / "tjsp_preenchido.png"))
+            await self._capturar(page, numero_processo, "tjsp_preenchido.png")
             
             # Clicar em consultar
-            page.click("input[type='submit']")
-            page.wait_for_load_state("networkidle", timeout=30000)
-            time.sleep(3)
+            await page.click("input[type='submit']")
+            await page.wait_for_load_state("networkidle", timeout=30000)
             
-            page.screenshot(path=str(self.downloads_dir / "tjsp_resultado.png"))
+            await self._capturar(page, numero_processo, "tjsp_resultado.png")
             
             # Verificar se processo foi encontrado
-            conteudo = page.content().lower()
+            conteudo = (await page.content()).lower()
             
             if "não encontrado" in conteudo or "não foi possível" in conteudo:
                 logger.warning(f"Processo {numero_processo} não encontrado no TJSP")
@@ -324,33 +401,32 @@ class BuscadorOficioRequisitorio:
             logger.info("Processo encontrado! Buscando ofício...")
             
             # Tentar clicar em "Documentos"
-            if page.locator("text=Documentos").count() > 0:
-                page.click("text=Documentos")
-                page.wait_for_load_state("networkidle", timeout=10000)
-                time.sleep(2)
+            if await page.locator("text=Documentos").count() > 0:
+                await page.click("text=Documentos")
+                await page.wait_for_load_state("networkidle", timeout=10000)
             
             # Buscar ofício
-            links = page.locator("a").all()
+            links = await page.locator("a").all()
             logger.info(f"Total de links encontrados: {len(links)}")
             
             for i, link in enumerate(links):
                 try:
-                    texto = link.inner_text().strip().lower()
+                    texto = (await link.inner_text()).strip().lower()
                     if texto and ("ofício" in texto or "requisitório" in texto):
-                        logger.info(f"Ofício encontrado no link {i}: {link.inner_text()}")
+                        logger.info(f"Ofício encontrado no link {i}: {await link.inner_text()}")
                         
-                        with page.expect_download(timeout=30000) as download_info:
-                            link.click()
+                        async with page.expect_download(timeout=30000) as download_info:
+                            await link.click()
                         
-                        download = download_info.value
-                        filename = f"oficio_TJSP_{numero_processo.replace('/', '_').replace('.', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                        filepath = self.downloads_dir / filename
-                        download.save_as(filepath)
+                        download = await download_info.value
+                        armazenado = await gerenciador_downloads.armazenar_download(download)
                         
-                        logger.info(f"Ofício baixado: {filepath}")
+                        logger.info(f"Ofício baixado: {armazenado['caminho']}")
                         return {
                             "sucesso": True,
-                            "caminho": str(filepath),
+                            "caminho": armazenado["caminho"],
+                            "hash": armazenado["hash"],
+                            "tamanho": armazenado["tamanho"],
                             "mensagem": "Ofício baixado com sucesso"
                         }
                 except Exception as e:
@@ -363,6 +439,8 @@ class BuscadorOficioRequisitorio:
                 "mensagem": "Processo existe no tribunal, mas o ofício requisitório não foi encontrado ou ainda não foi expedido"
             }
             
+        except PlaywrightTimeout:
+            raise  # Sobrecarga do portal: tratado em _buscar_na_pagina
         except Exception as e:
             logger.error(f"Erro ao buscar no TJSP: {str(e)}")
             return {
@@ -371,13 +449,13 @@ class BuscadorOficioRequisitorio:
                 "mensagem": f"Erro ao buscar no TJSP: {str(e)}"
             }
     
-    def _buscar_trf(self, numero_processo, tribunal, page):
+    async def _buscar_trf(self, numero_processo, tribunal, page):
         """Busca processo nos TRFs"""
         try:
             logger.info(f"Buscando processo {numero_processo} no {tribunal}")
             
-            time.sleep(3)
-            page.screenshot(path=str(self.downloads_dir / f"{tribunal.lower()}_inicial.png"))
+            await self._aguardar_campo(page)
+            await self._capturar(page, numero_processo, f"{tribunal.lower()}_inicial.png")
             
             numero_limpo = self.limpar_numero_processo(numero_processo)
             
@@ -391,8 +469,8 @@ class BuscadorOficioRequisitorio:
             
             preenchido = False
             for seletor in seletores:
-                if page.locator(seletor).count() > 0:
-                    page.fill(seletor, numero_limpo)
+                if await page.locator(seletor).count() > 0:
+                    await page.fill(seletor, numero_limpo)
                     preenchido = True
                     logger.info(f"Campo preenchido com seletor: {seletor}")
                     break
@@ -407,16 +485,15 @@ class BuscadorOficioRequisitorio:
             # Clicar em consultar
             botoes = ["input[type='submit']", "button[type='submit']", "text=Consultar", "text=Pesquisar"]
             for botao in botoes:
-                if page.locator(botao).count() > 0:
-                    page.click(botao)
+                if await page.locator(botao).count() > 0:
+                    await page.click(botao)
                     break
             
-            page.wait_for_load_state("networkidle", timeout=30000)
-            time.sleep(2)
-            page.screenshot(path=str(self.downloads_dir / f"{tribunal.lower()}_resultado.png"))
+            await page.wait_for_load_state("networkidle", timeout=30000)
+            await self._capturar(page, numero_processo, f"{tribunal.lower()}_resultado.png")
             
             # Verificar resultado
-            conteudo = page.content().lower()
+            conteudo = (await page.content()).lower()
             
             if "não encontrado" in conteudo or "não localizado" in conteudo:
                 return {
@@ -426,25 +503,25 @@ class BuscadorOficioRequisitorio:
                 }
             
             # Buscar ofício
-            links = page.locator("a").all()
+            links = await page.locator("a").all()
             
             for link in links:
                 try:
-                    texto = link.inner_text().strip().lower()
+                    texto = (await link.inner_text()).strip().lower()
                     if texto and ("ofício" in texto or "requisitório" in texto):
-                        logger.info(f"Ofício encontrado: {link.inner_text()}")
+                        logger.info(f"Ofício encontrado: {await link.inner_text()}")
                         
-                        with page.expect_download(timeout=30000) as download_info:
-                            link.click()
+                        async with page.expect_download(timeout=30000) as download_info:
+                            await link.click()
                         
-                        download = download_info.value
-                        filename = f"oficio_{tribunal}_{numero_processo.replace('/', '_').replace('.', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                        filepath = self.downloads_dir / filename
-                        download.save_as(filepath)
+                        download = await download_info.value
+                        armazenado = await gerenciador_downloads.armazenar_download(download)
                         
                         return {
                             "sucesso": True,
-                            "caminho": str(filepath),
+                            "caminho": armazenado["caminho"],
+                            "hash": armazenado["hash"],
+                            "tamanho": armazenado["tamanho"],
                             "mensagem": "Ofício baixado com sucesso"
                         }
                 except Exception as e:
@@ -456,6 +533,8 @@ class BuscadorOficioRequisitorio:
                 "mensagem": "Processo existe no tribunal, mas o ofício requisitório não foi encontrado"
             }
             
+        except PlaywrightTimeout:
+            raise  # Sobrecarga do portal: tratado em _buscar_na_pagina
         except Exception as e:
             logger.error(f"Erro ao buscar no {tribunal}: {str(e)}")
             return {
@@ -473,7 +552,8 @@ if __name__ == "__main__":
     resultado = buscador.buscar_oficio("7654313-59.2021.9.81.5556", "TJRJ")
     print(f"Resultado: {resultado}")
     
+    # Screenshots só no perfil de depuração (TAXMASTER_NAVEGADOR_PERFIL=depuracao)
     print("\n📸 Verifique os screenshots em: data/oficios/")
-    print("   - tjrj_inicial.png")
-    print("   - tjrj_preenchido.png")
-    print("   - tjrj_resultado.png")
+    print("   - 76543135920219815556_tjrj_inicial.png")
+    print("   - 76543135920219815556_tjrj_preenchido.png")
+    print("   - 76543135920219815556_tjrj_resultado.png")
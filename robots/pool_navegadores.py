@@ -0,0 +1,339 @@
+﻿"""
+Módulo de Pool de Navegadores
+Motor assíncrono (playwright.async_api) que executa as buscas nos portais em paralelo
+
+Um único Chromium de vida longa roda num event loop asyncio, numa thread
+própria, e atende todas as tarefas. Cada tarefa recebe uma página de um
+contexto do portal. Os contextos ociosos (sessão, cookies e cache do portal)
+são reaproveitados e recriados depois de USOS_POR_CONTEXTO tarefas, quando a
+página trava ou fecha, ou quando a tarefa falha.
+
+Cada portal tem um semáforo adaptativo: começa com CONCORRENCIA_PORTAL
+páginas simultâneas e, a cada sinal de sobrecarga do portal (timeout ou
+falha de navegação), reduz o limite pela metade e dobra o intervalo entre o
+início de duas tarefas (até ATRASO_MAXIMO). A cada sucesso o limite volta a
+subir de um em um e o intervalo cai pela metade. O intervalo só espaça as
+partidas (um horário de próxima partida compartilhado): a tarefa espera
+antes de ocupar uma vaga, então as vagas ficam com o trabalho. Erros do
+próprio item (página sem o processo, seletor ausente) não mexem no ritmo, e
+cada item conta no máximo uma sobrecarga, mesmo falhando em todas as
+tentativas. Tarefas que falham são repetidas até TENTATIVAS vezes. Assim a
+vazão cresce com a concorrência, sem sleeps fixos, e recua sozinha quando o
+portal começa a falhar.
+
+Código síncrono (dashboard, processar_lote) usa submeter(), que devolve um
+concurrent.futures.Future. Código assíncrono pode aguardar executar()
+diretamente no loop do pool.
+
+Perfis: "producao" (headless, sem slow_mo, sem screenshots) e "depuracao"
+(janela visível, slow_mo de 1 s e screenshots de cada etapa).
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import as_completed
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+
+logger = logging.getLogger("PoolNavegadores")
+
+PERFIS = {
+    "producao": {"headless": True, "slow_mo": 0, "capturas": False},
+    "depuracao": {"headless": False, "slow_mo": 1000, "capturas": True},
+}
+
+# Configuração (variáveis de ambiente)
+PERFIL = os.environ.get("TAXMASTER_NAVEGADOR_PERFIL", "producao")
+CONCORRENCIA_PORTAL = int(os.environ.get("TAXMASTER_NAVEGADOR_CONCORRENCIA", 4))
+USOS_POR_CONTEXTO = int(os.environ.get("TAXMASTER_NAVEGADOR_USOS_CONTEXTO", 50))
+TIMEOUT_PADRAO = int(os.environ.get("TAXMASTER_NAVEGADOR_TIMEOUT", 30000))  # ms
+TENTATIVAS = int(os.environ.get("TAXMASTER_NAVEGADOR_TENTATIVAS", 2))
+ATRASO_MINIMO = float(os.environ.get("TAXMASTER_NAVEGADOR_ATRASO_MINIMO", 1.0))  # segundos
+ATRASO_MAXIMO = float(os.environ.get("TAXMASTER_NAVEGADOR_ATRASO_MAXIMO", 60.0))  # segundos
+
+# Concorrência específica por portal, sobrepondo CONCORRENCIA_PORTAL. Exemplo:
+# {"TJSP": 2}
+LIMITES_PORTAL = {}
+
+OPCOES_CONTEXTO = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "accept_downloads": True,
+}
+
+
+def indica_sobrecarga(erro):
+    """
+    Timeout ou falha de navegação: sinal de que o portal está sobrecarregado.
+    A exceção pode decidir pelo atributo `sobrecarga` (ex.: FalhaPortal).
+    """
+    if hasattr(erro, "sobrecarga"):
+        return bool(erro.sobrecarga)
+    return isinstance(erro, (PlaywrightTimeout, asyncio.TimeoutError)) or "net::ERR_" in str(erro)
+
+
+class SemaforoAdaptativo:
+    """
+    Semáforo de um portal com limite e ritmo de partidas ajustados pelo
+    resultado das tarefas.
+
+    Só é usado dentro do loop do pool.
+    """
+
+    def __init__(self, maximo):
+        self.maximo = max(int(maximo), 1)
+        self.limite = self.maximo
+        self.em_uso = 0
+        self.atraso = 0.0
+        self._proxima_partida = 0.0
+        self._fila = asyncio.Lock()
+        self._condicao = asyncio.Condition()
+
+    async def entrar(self):
+        # Uma partida por vez, na ordem de chegada: a primeira da fila espera o
+        # horário da próxima partida (sem ocupar vaga), depois uma vaga livre
+        loop = asyncio.get_running_loop()
+        async with self._fila:
+            espera = self._proxima_partida - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            async with self._condicao:
+                await self._condicao.wait_for(lambda: self.em_uso < self.limite)
+                self.em_uso += 1
+            self._proxima_partida = loop.time() + self.atraso
+
+    async def sair(self, sucesso, sobrecarga=False):
+        """Libera a vaga; sucesso acelera, sobrecarga recua, as demais falhas não mudam nada"""
+        async with self._condicao:
+            self.em_uso -= 1
+            if sucesso:
+                self.limite = min(self.maximo, self.limite + 1)
+                self.atraso = self.atraso / 2 if self.atraso >= 2 * ATRASO_MINIMO else 0.0
+            elif sobrecarga:
+                self.limite = max(1, self.limite // 2)
+                self.atraso = min(max(self.atraso * 2, ATRASO_MINIMO), ATRASO_MAXIMO)
+            self._condicao.notify_all()
+
+
+class _Sessao:
+    """Contexto e página de um portal"""
+
+    def __init__(self, contexto, pagina):
+        self.contexto = contexto
+        self.pagina = pagina
+        self.usos = 0
+        self.travou = False
+        pagina.on("crash", self._marcar_travamento)
+
+    def _marcar_travamento(self, _pagina):
+        self.travou = True
+
+    def reaproveitavel(self, usos_por_contexto):
+        return not self.travou and not self.pagina.is_closed() and self.usos < usos_por_contexto
+
+    async def fechar(self):
+        try:
+            await self.contexto.close()
+        except Exception:
+            pass
+
+
+class _Portal:
+    def __init__(self, maximo):
+        self.semaforo = SemaforoAdaptativo(maximo)
+        self.ociosas = []
+
+
+class PoolNavegadores:
+    """
+    Motor de navegação assíncrono compartilhado.
+
+    O loop, o Playwright e o navegador são iniciados na primeira tarefa e
+    ficam vivos até fechar().
+
+    Args:
+        concorrencia_portal: páginas simultâneas por portal (antes das reduções por falha)
+        usos_por_contexto: tarefas atendidas por um contexto antes de recriá-lo
+        perfil: "producao" ou "depuracao"
+        tentativas: execuções de uma tarefa que falha, contando a primeira
+        limites_portal: {portal: concorrência}, sobrepondo concorrencia_portal
+    """
+
+    def __init__(self, concorrencia_portal=CONCORRENCIA_PORTAL, usos_por_contexto=USOS_POR_CONTEXTO,
+                 perfil=PERFIL, tentativas=TENTATIVAS, limites_portal=None):
+        if perfil not in PERFIS:
+            raise ValueError(f"Perfil de navegador desconhecido: {perfil}")
+        self.concorrencia_portal = max(int(concorrencia_portal), 1)
+        self.usos_por_contexto = max(int(usos_por_contexto), 1)
+        self.nome_perfil = perfil
+        self.perfil = PERFIS[perfil]
+        self.tentativas = max(int(tentativas), 1)
+        self.limites_portal = dict(LIMITES_PORTAL if limites_portal is None else limites_portal)
+
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._fechado = False
+
+        # Estado do loop
+        self._playwright = None
+        self._navegador = None
+        self._lock_navegador = None
+        self._portais = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    # Ponte com código síncrono
+
+    def _iniciar_loop(self):
+        with self._lock:
+            if self._fechado:
+                raise RuntimeError("Pool de navegadores fechado")
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="pool-navegadores", daemon=True)
+                self._thread.start()
+                atexit.register(self.fechar)
+            return self._loop
+
+    def submeter(self, portal, tarefa, item):
+        """
+        Agenda executar(portal, tarefa, item) no loop do pool.
+
+        Returns:
+            concurrent.futures.Future: resultado da tarefa (ou a exceção da última tentativa)
+        """
+        return asyncio.run_coroutine_threadsafe(self.executar(portal, tarefa, item), self._iniciar_loop())
+
+    def submeter_lote(self, portal, tarefa, itens):
+        """submeter() de cada item, na ordem dos itens"""
+        return [self.submeter(portal, tarefa, item) for item in itens]
+
+    def em_andamento(self, portal, tarefa, itens):
+        """Agenda todos os itens e retorna um gerador de (item, future) na ordem em que as tarefas terminam"""
+        itens = list(itens)
+        futuros = {futuro: item for futuro, item in zip(self.submeter_lote(portal, tarefa, itens), itens)}
+        return ((futuros[futuro], futuro) for futuro in as_completed(futuros))
+
+    def aquecer(self):
+        """Lança o navegador antes da primeira tarefa"""
+        asyncio.run_coroutine_threadsafe(self._navegador_pronto(), self._iniciar_loop()).result()
+
+    # Loop do pool
+
+    async def executar(self, portal, tarefa, item):
+        """
+        Executa await tarefa(pagina, item) numa página do portal, respeitando
+        o semáforo adaptativo e repetindo a tarefa em caso de falha. Só a
+        primeira falha por sobrecarga do item conta para o backoff.
+        """
+        estado = self._portal(portal)
+        sobrecarga_contada = False
+        for tentativa in range(1, self.tentativas + 1):
+            await estado.semaforo.entrar()
+            sessao = None
+            sucesso = False
+            sobrecarga = False
+            try:
+                sessao = await self._sessao(estado)
+                resultado = await tarefa(sessao.pagina, item)
+                sucesso = True
+                return resultado
+            except Exception as e:
+                sobrecarga = not sobrecarga_contada and indica_sobrecarga(e)
+                sobrecarga_contada = sobrecarga_contada or sobrecarga
+                if tentativa == self.tentativas:
+                    raise
+                logger.warning(f"Falha em {portal} (tentativa {tentativa}/{self.tentativas}): {str(e)}")
+            finally:
+                await estado.semaforo.sair(sucesso, sobrecarga)
+                if sessao is not None:
+                    await self._devolver(estado, sessao, sucesso)
+
+    def _portal(self, portal):
+        if portal not in self._portais:
+            self._portais[portal] = _Portal(self.limites_portal.get(portal, self.concorrencia_portal))
+        return self._portais[portal]
+
+    async def _navegador_pronto(self):
+        if self._lock_navegador is None:
+            self._lock_navegador = asyncio.Lock()
+        async with self._lock_navegador:
+            if self._navegador is None or not self._navegador.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                # Contextos de um navegador que caiu não servem mais
+                for estado in self._portais.values():
+                    estado.ociosas.clear()
+                self._navegador = await self._playwright.chromium.launch(
+                    headless=self.perfil["headless"],
+                    slow_mo=self.perfil["slow_mo"]
+                )
+            return self._navegador
+
+    async def _sessao(self, estado):
+        while estado.ociosas:
+            sessao = estado.ociosas.pop()
+            if sessao.reaproveitavel(self.usos_por_contexto):
+                sessao.usos += 1
+                return sessao
+            await sessao.fechar()
+
+        navegador = await self._navegador_pronto()
+        contexto = await navegador.new_context(**OPCOES_CONTEXTO)
+        contexto.set_default_timeout(TIMEOUT_PADRAO)
+        sessao = _Sessao(contexto, await contexto.new_page())
+        sessao.usos = 1
+        return sessao
+
+    async def _devolver(self, estado, sessao, sucesso):
+        if not sucesso or not sessao.reaproveitavel(self.usos_por_contexto):
+            await sessao.fechar()
+            return
+        # Abas abertas pela tarefa (pop-ups) não passam para a próxima
+        for pagina in sessao.contexto.pages:
+            if pagina is not sessao.pagina:
+                await pagina.close()
+        estado.ociosas.append(sessao)
+
+    async def _encerrar(self):
+        for estado in self._portais.values():
+            for sessao in estado.ociosas:
+                await sessao.fechar()
+            estado.ociosas.clear()
+        if self._navegador is not None:
+            try:
+                await self._navegador.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._navegador = None
+        self._playwright = None
+
+    def fechar(self):
+        """Fecha os contextos ociosos e o navegador e encerra o loop"""
+        with self._lock:
+            if self._fechado:
+                return
+            self._fechado = True
+            loop = self._loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._encerrar(), loop).result(timeout=TIMEOUT_PADRAO / 1000)
+        except Exception as e:
+            logger.warning(f"Erro ao fechar navegadores: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=TIMEOUT_PADRAO / 1000)
+
+
+# Instância global
+pool_navegadores = PoolNavegadores()
@@ -1,4 +1,4 @@
-﻿from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+﻿from playwright.async_api import TimeoutError as PlaywrightTimeout
 import logging
 from datetime import datetime
 import json
@@ -6,6 +6,7 @@ from pathlib import Path
 import sys
 sys.path.append("src")
 from database import SessionLocal, Processo
+from pool_navegadores import pool_navegadores
 
 logging.basicConfig(
     level=logging.INFO,
@@ -75,77 +76,74 @@ class TJSPRobot:
         finally:
             db.close()
         
+    async def _coletar(self, page, _):
+        """Extrai os processos da página de precatórios (executa no loop do pool)"""
+        logger.info(f"Acessando {self.url}")
+        await page.goto(self.url, timeout=30000)
+        await page.wait_for_load_state("networkidle")
+        
+        processos = []
+        
+        # Exemplo de extracao (adaptar conforme estrutura real do site)
+        # Aguardar tabela de precatorios
+        await page.wait_for_selector("table", timeout=10000)
+        
+        # Extrair linhas da tabela
+        rows = await page.locator("table tbody tr").all()
+        
+        for row in rows[:10]:  # Limitar a 10 para teste
+            try:
+                cells = await row.locator("td").all()
+                if len(cells) >= 5:
+                    processo_data = {
+                        "numero_processo": (await cells[0].inner_text()).strip(),
+                        "tribunal": self.name,
+                        "tipo": "Precatorio",
+                        "credor_nome": (await cells[1].inner_text()).strip(),
+                        "valor_principal": float((await cells[2].inner_text()).replace("R$", "").replace(".", "").replace(",", ".").strip()),
+                        "fase": (await cells[3].inner_text()).strip(),
+                        "data_expedicao": datetime.now(),
+                        "dados_completos": json.dumps({
+                            "fonte": self.url,
+                            "data_coleta": datetime.now().isoformat()
+                        })
+                    }
+                    
+                    # Calcular score
+                    processo_data["score_oportunidade"] = self.calcular_score(processo_data)
+                    processo_data["valor_atualizado"] = processo_data["valor_principal"] * 1.1
+                    
+                    processos.append(processo_data)
+                    
+            except Exception as e:
+                logger.warning(f"Erro ao processar linha: {str(e)}")
+                continue
+        
+        return processos
+        
     def run(self):
         logger.info(f"Iniciando coleta - {self.name}")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            )
-            page = context.new_page()
+        try:
+            # Página do motor assíncrono compartilhado (ver pool_navegadores)
+            processos = pool_navegadores.submeter(self.name, self._coletar, None).result()
             
-            try:
-                logger.info(f"Acessando {self.url}")
-                page.goto(self.url, timeout=30000)
-                page.wait_for_load_state("networkidle")
-                
-                processos = []
-                
-                # Exemplo de extracao (adaptar conforme estrutura real do site)
-                # Aguardar tabela de precatorios
-                page.wait_for_selector("table", timeout=10000)
-                
-                # Extrair linhas da tabela
-                rows = page.locator("table tbody tr").all()
-                
-                for row in rows[:10]:  # Limitar a 10 para teste
-                    try:
-                        cells = row.locator("td").all()
-                        if len(cells) >= 5:
-                            processo_data = {
-                                "numero_processo": cells[0].inner_text().strip(),
-                                "tribunal": self.name,
-                                "tipo": "Precatorio",
-                                "credor_nome": cells[1].inner_text().strip(),
-                                "valor_principal": float(cells[2].inner_text().replace("R$", "").replace(".", "").replace(",", ".").strip()),
-                                "fase": cells[3].inner_text().strip(),
-                                "data_expedicao": datetime.now(),
-                                "dados_completos": json.dumps({
-                                    "fonte": self.url,
-                                    "data_coleta": datetime.now().isoformat()
-                                })
-                            }
-                            
-                            # Calcular score
-                            processo_data["score_oportunidade"] = self.calcular_score(processo_data)
-                            processo_data["valor_atualizado"] = processo_data["valor_principal"] * 1.1
-                            
-                            processos.append(processo_data)
-                            
-                    except Exception as e:
-                        logger.warning(f"Erro ao processar linha: {str(e)}")
-                        continue
-                
-                # Salvar em arquivo JSON
-                output_file = self.data_dir / f"coleta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(processos, f, ensure_ascii=False, indent=2, default=str)
-                
-                # Salvar no banco de dados
-                if processos:
-                    self.salvar_banco_dados(processos)
-                
-                logger.info(f"Coleta concluida: {len(processos)} processos encontrados")
-                logger.info(f"Dados salvos em: {output_file}")
-                
-            except PlaywrightTimeout:
-                logger.error("Timeout ao acessar o site")
-            except Exception as e:
-                logger.error(f"Erro durante a coleta: {str(e)}")
-            finally:
-                browser.close()
+            # Salvar em arquivo JSON
+            output_file = self.data_dir / f"coleta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(processos, f, ensure_ascii=False, indent=2, default=str)
+            
+            # Salvar no banco de dados
+            if processos:
+                self.salvar_banco_dados(processos)
+            
+            logger.info(f"Coleta concluida: {len(processos)} processos encontrados")
+            logger.info(f"Dados salvos em: {output_file}")
+            
+        except PlaywrightTimeout:
+            logger.error("Timeout ao acessar o site")
+        except Exception as e:
+            logger.error(f"Erro durante a coleta: {str(e)}")
 
 if __name__ == "__main__":
     robot = TJSPRobot()
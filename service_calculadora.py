@@ -1,9 +1,31 @@
-﻿import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+﻿import csv
+import io
+import json
+import re
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
 import sys
 sys.path.append('src')
 from calculadora import calculadora
+from cache_calculos import cache_calculos
+
+# Colunas aceitas no cálculo em lote (JSON, CSV ou XLSX)
+CAMPOS_LOTE = (
+    'valor_original', 'indice_correcao', 'data_inicial', 'data_final',
+    'incluir_juros', 'taxa_juros', 'percentual_honorarios'
+)
+
+# Colunas do resultado do lote (NDJSON e planilha)
+COLUNAS_RESULTADO_LOTE = (
+    'linha', 'sucesso', 'erro', 'valor_original', 'indice', 'data_inicial', 'data_final',
+    'valor_corrigido', 'valor_juros', 'valor_honorarios', 'valor_liquido'
+)
+
+VALORES_VERDADEIROS = ('1', 'true', 'sim', 's', 'yes', 'x')
+
+# Número com um só separador seguido de exatamente 3 dígitos ("1.234", "1,234"):
+# pode ser milhar ou decimal, então a linha é rejeitada
+PADRAO_NUMERO_AMBIGUO = re.compile(r'-?[1-9]\d{0,2}[.,]\d{3}')
 
 class CalculadoraService:
     """Serviço avançado de cálculo de precatórios"""
@@ -13,7 +35,9 @@ class CalculadoraService:
         'INPC': 'Índice Nacional de Preços ao Consumidor',
         'SELIC': 'Taxa Selic',
         'TR': 'Taxa Referencial',
-        'IGPM': 'Índice Geral de Preços do Mercado'
+        'IGPM': 'Índice Geral de Preços do Mercado',
+        'IGP-DI': 'Índice Geral de Preços - Disponibilidade Interna',
+        'POUPANCA': 'Rendimento da Poupança'
     }
     
     @staticmethod
@@ -91,8 +115,10 @@ class CalculadoraService:
                 'honorarios': float(dados.get('percentual_honorarios', 0))
             }
             
-            # Chamar função de cálculo
-            resultado = calculadora(calc_data)
+            # Chamar função de cálculo (resultados repetidos vêm do cache)
+            resultado = cache_calculos.obter_ou_calcular(
+                'calculadora.calcular', calc_data, lambda: calculadora(calc_data)
+            )
             
             if not resultado or 'erro' in resultado:
                 return {
@@ -115,28 +141,54 @@ class CalculadoraService:
     
     @staticmethod
     def comparar_indices(dados: Dict, indices: List[str]) -> Dict:
-        """Compara resultado entre múltiplos índices"""
-        resultados = {}
+        """
+        Compara resultado entre múltiplos índices em uma única passada:
+        valida e interpreta os dados uma vez e calcula todos os índices juntos
+        (ver CalculadoraPrecatorio.comparar_indices). Índices não disponíveis
+        são ignorados; ranking ordena os índices do maior para o menor valor final.
+        """
+        indices = [i for i in dict.fromkeys(indices) if i in CalculadoraService.INDICES_DISPONIVEIS]
+        if not indices:
+            return {'sucesso': True, 'comparacao': {}, 'melhor_indice': None, 'ranking': []}
         
-        for indice in indices:
-            dados_calculo = dados.copy()
-            dados_calculo['indice_correcao'] = indice
-            
-            resultado = CalculadoraService.calcular(dados_calculo)
-            
-            if resultado.get('sucesso'):
-                resultados[indice] = {
-                    'valor_corrigido': resultado.get('valor_corrigido', 0),
-                    'valor_final': resultado.get('valor_liquido', 0),
-                    'diferenca_percentual': ((resultado.get('valor_liquido', 0) / 
-                                             dados['valor_original']) - 1) * 100
-                }
+        valido, erro = CalculadoraService.validar_dados(dict(dados, indice_correcao=indices[0]))
+        if not valido:
+            return {'sucesso': False, 'erro': erro}
+        
+        entradas = {
+            'valor_original': float(dados['valor_original']),
+            'data_inicial': dados['data_inicial'],
+            'data_final': dados['data_final'],
+            'incluir_juros': bool(dados.get('incluir_juros', False)),
+            'taxa_juros': float(dados.get('taxa_juros', 0)),
+            'honorarios': float(dados.get('percentual_honorarios', 0)),
+            'indices': indices
+        }
+        
+        cenarios = cache_calculos.obter_ou_calcular(
+            'calculadora.comparar_indices', entradas,
+            lambda: calculadora.comparar_indices(
+                entradas['valor_original'], entradas['data_inicial'], entradas['data_final'], indices,
+                incluir_juros_mora=entradas['incluir_juros'], taxa_juros=entradas['taxa_juros'],
+                percentual_honorarios=entradas['honorarios']
+            )
+        )
+        
+        resultados = {
+            indice: {
+                'valor_corrigido': cenario['valor_corrigido'],
+                'valor_final': cenario['valor_liquido'],
+                'diferenca_percentual': ((cenario['valor_liquido'] / entradas['valor_original']) - 1) * 100
+            }
+            for indice, cenario in cenarios.items()
+        }
+        ranking = sorted(resultados, key=lambda i: resultados[i]['valor_final'], reverse=True)
         
         return {
             'sucesso': True,
             'comparacao': resultados,
-            'melhor_indice': max(resultados.items(), 
-                               key=lambda x: x[1]['valor_final'])[0] if resultados else None
+            'melhor_indice': ranking[0],
+            'ranking': ranking
         }
     
     @staticmethod
@@ -162,3 +214,161 @@ Correção: {((resultado.get('valor_corrigido', 0) / resultado.get('valor_origin
         """
         
         return resumo.strip()
+    
+    # ========================================================================
+    # CÁLCULO EM LOTE
+    # ========================================================================
+    
+    @staticmethod
+    def normalizar_caso(caso: Dict) -> Dict:
+        """
+        Converte uma linha de planilha/JSON para o formato de validar_dados:
+        datas em YYYY-MM-DD, números em texto (normalizar_numero) e booleanos em texto.
+        """
+        dados = {}
+        for campo in CAMPOS_LOTE:
+            valor = caso.get(campo)
+            if isinstance(valor, str):
+                valor = valor.strip()
+            
+            if campo in ('data_inicial', 'data_final'):
+                if isinstance(valor, datetime):
+                    valor = valor.strftime('%Y-%m-%d')
+                elif isinstance(valor, date):
+                    valor = valor.isoformat()
+                elif isinstance(valor, str) and '/' in valor:
+                    try:
+                        valor = datetime.strptime(valor, '%d/%m/%Y').strftime('%Y-%m-%d')
+                    except ValueError:
+                        pass
+                dados[campo] = valor or ''
+            elif campo == 'incluir_juros':
+                dados[campo] = str(valor).lower() in VALORES_VERDADEIROS if isinstance(valor, str) else bool(valor)
+            elif campo == 'indice_correcao':
+                dados[campo] = (valor or '').upper() if isinstance(valor, str) else valor
+            else:
+                if isinstance(valor, str):
+                    valor = CalculadoraService.normalizar_numero(campo, valor)
+                dados[campo] = valor if valor not in (None, '') else 0
+        
+        return dados
+    
+    @staticmethod
+    def normalizar_numero(campo: str, valor: str) -> str:
+        """
+        Converte um número em texto para o formato do float ("1.234,56" e
+        "1,234.56" -> "1234.56"). Com os dois separadores, o último é o decimal;
+        com um só separador repetido, ele é o de milhar; com um só separador
+        uma vez, é o decimal. ValueError se o número for ambíguo ("1.234").
+        """
+        if PADRAO_NUMERO_AMBIGUO.fullmatch(valor):
+            raise ValueError(f"{campo}: valor ambíguo '{valor}' (use 1234,56 ou 1.234,56)")
+        
+        separadores = [separador for separador in ',.' if separador in valor]
+        if not separadores:
+            return valor
+        if len(separadores) == 2:
+            decimal = max(separadores, key=valor.rfind)
+        elif valor.count(separadores[0]) == 1:
+            decimal = separadores[0]
+        else:
+            decimal = None
+        milhar = next((separador for separador in separadores if separador != decimal), None)
+        
+        inteiro, fracao = valor.rsplit(decimal, 1) if decimal else (valor, '')
+        if milhar:
+            grupos = inteiro.lstrip('-').split(milhar)
+            if (decimal and decimal in inteiro) or not (
+                    1 <= len(grupos[0]) <= 3 and all(len(grupo) == 3 for grupo in grupos[1:])):
+                raise ValueError(f"{campo}: número inválido '{valor}'")
+            inteiro = inteiro.replace(milhar, '')
+        return f"{inteiro}.{fracao}" if decimal else inteiro
+    
+    @staticmethod
+    def calcular_caso_lote(linha: int, caso: Dict) -> Dict:
+        """Calcula uma linha do lote; erros de validação/cálculo ficam na própria linha"""
+        try:
+            dados = CalculadoraService.normalizar_caso(caso)
+        except ValueError as e:
+            return {'linha': linha, 'sucesso': False, 'erro': str(e)}
+        
+        valido, erro = CalculadoraService.validar_dados(dados)
+        if not valido:
+            return {'linha': linha, 'sucesso': False, 'erro': erro}
+        
+        resultado = calculadora(dados, incluir_detalhamento=False)
+        if not resultado or 'erro' in resultado:
+            return {'linha': linha, 'sucesso': False, 'erro': resultado.get('erro', 'Erro desconhecido no cálculo')}
+        
+        return {
+            'linha': linha,
+            'sucesso': True,
+            'valor_original': resultado['valor_original'],
+            'indice': resultado['indice'],
+            'data_inicial': resultado['data_inicial'],
+            'data_final': resultado['data_final'],
+            'valor_corrigido': resultado['valor_corrigido'],
+            'valor_juros': resultado['valor_juros'],
+            'valor_honorarios': resultado['valor_honorarios'],
+            'valor_liquido': resultado['valor_liquido']
+        }
+    
+    @staticmethod
+    def calcular_lote(casos: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Calcula os casos um a um, sob demanda (gerador), para que a resposta
+        possa ser enviada em streaming. A correção usa o fator acumulado das
+        séries de índices (O(1) por caso) e não monta o detalhamento mensal.
+        """
+        for linha, caso in enumerate(casos, 1):
+            if not isinstance(caso, dict):
+                yield {'linha': linha, 'sucesso': False, 'erro': 'Caso deve ser um objeto'}
+                continue
+            try:
+                yield CalculadoraService.calcular_caso_lote(linha, caso)
+            except Exception as e:
+                yield {'linha': linha, 'sucesso': False, 'erro': f'Erro ao processar cálculo: {str(e)}'}
+    
+    @staticmethod
+    def ler_casos_arquivo(nome_arquivo: str, conteudo: bytes) -> Iterator[Dict]:
+        """Lê os casos de um CSV (separador , ou ;) ou XLSX com cabeçalho na primeira linha"""
+        nome = (nome_arquivo or '').lower()
+        
+        if nome.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            
+            planilha = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True).active
+            linhas = planilha.iter_rows(values_only=True)
+            cabecalho = [str(c).strip() if c is not None else '' for c in next(linhas, ())]
+            for valores in linhas:
+                if any(v not in (None, '') for v in valores):
+                    yield dict(zip(cabecalho, valores))
+            return
+        
+        if nome.endswith('.csv'):
+            texto = conteudo.decode('utf-8-sig')
+            try:
+                dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=',;')
+            except csv.Error:
+                dialeto = csv.excel
+            for caso in csv.DictReader(io.StringIO(texto), dialect=dialeto):
+                yield {(chave or '').strip(): valor for chave, valor in caso.items()}
+            return
+        
+        raise ValueError('Formato de arquivo não suportado (use .csv ou .xlsx)')
+    
+    @staticmethod
+    def gerar_planilha_lote(resultados: Iterable[Dict]) -> io.BytesIO:
+        """Monta um XLSX (modo write_only) com uma linha por caso calculado"""
+        from openpyxl import Workbook
+        
+        livro = Workbook(write_only=True)
+        planilha = livro.create_sheet('Resultados')
+        planilha.append(list(COLUNAS_RESULTADO_LOTE))
+        for resultado in resultados:
+            planilha.append([resultado.get(coluna) for coluna in COLUNAS_RESULTADO_LOTE])
+        
+        arquivo = io.BytesIO()
+        livro.save(arquivo)
+        arquivo.seek(0)
+        return arquivo
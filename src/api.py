@@ -6,7 +6,9 @@ from pydantic import BaseModel
 from datetime import datetime
 import sys
 sys.path.append("src")
-from database import SessionLocal, Processo
+from database import SessionLeitura
+from models_atualizado import Processo
+from estatisticas_dashboard import estatisticas_dashboard
 
 app = FastAPI(title="TaxMaster CRM API", version="1.0.0")
 
@@ -21,7 +23,7 @@ app.add_middleware(
 
 # Dependency
 def get_db():
-    db = SessionLocal()
+    db = SessionLeitura()
     try:
         yield db
     finally:
@@ -77,11 +79,11 @@ def buscar_processo(numero_processo: str, db: Session = Depends(get_db)):
 
 @app.get("/oportunidades")
 def listar_oportunidades(
-    score_minimo: float = 8.0,
+    score_minimo: float = 70,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
-    """Lista as melhores oportunidades (score alto)"""
+    """Lista as melhores oportunidades (score de 0 a 100; 70 = MUITO_BOM)"""
     processos = db.query(Processo).filter(
         Processo.score_oportunidade >= score_minimo
     ).order_by(Processo.score_oportunidade.desc()).limit(limit).all()
@@ -91,18 +93,14 @@ def listar_oportunidades(
 @app.get("/estatisticas")
 def obter_estatisticas(db: Session = Depends(get_db)):
     """Retorna estatisticas gerais"""
-    total = db.query(Processo).count()
-    valor_total = db.query(func.sum(Processo.valor_atualizado)).scalar() or 0
-    
-    por_tribunal = db.query(
-        Processo.tribunal,
-        func.count(Processo.id).label("total")
-    ).group_by(Processo.tribunal).all()
+    resumo = estatisticas_dashboard.obter_resumo(db)
     
     return {
-        "total_processos": total,
-        "valor_total_estoque": valor_total,
-        "distribuicao_tribunais": {t: c for t, c in por_tribunal}
+        "total_processos": resumo["total_processos"],
+        "valor_total_estoque": resumo["total_valor"],
+        "distribuicao_tribunais": {
+            item.tribunal.value: item.total for item in resumo["por_tribunal"]
+        }
     }
 
 if __name__ == "__main__":
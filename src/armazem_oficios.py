@@ -0,0 +1,149 @@
+﻿"""
+Módulo de Armazenamento de Ofícios
+Repositório de PDFs endereçado pelo conteúdo (SHA-256), com deduplicação
+
+Cada ofício é gravado uma única vez em blobs/ab/cd/<sha256>.pdf (dois níveis
+de diretório pelos primeiros caracteres do hash, para nenhum diretório
+crescer demais). O hash é calculado em blocos de 1 MB enquanto os bytes são
+lidos ou copiados, sem o arquivo inteiro na memória. É o mesmo SHA-256
+gravado em processos.hash_oficio: identifica o arquivo, valida a integridade
+e é o ETag do download.
+
+O mesmo PDF baixado para processos diferentes (ou baixado de novo) aponta
+para o mesmo blob. Arquivos que já estão no mesmo sistema de arquivos entram
+por rename ou hard link, sem cópia.
+"""
+
+import errno
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+DIRETORIO_BLOBS = os.environ.get("TAXMASTER_OFICIOS_BLOBS_DIR", os.path.join("data", "oficios", "blobs"))
+TAMANHO_BLOCO = 1024 * 1024
+EXTENSAO = ".pdf"
+
+PADRAO_HASH = re.compile(r"[0-9a-f]{64}")
+
+
+def hash_arquivo(caminho):
+    """SHA-256 (hexadecimal) do arquivo, lido em blocos de TAMANHO_BLOCO"""
+    sha256 = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b""):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+class ArmazemOficios:
+    """Blobs de ofícios endereçados pelo SHA-256 do conteúdo"""
+
+    def __init__(self, diretorio=DIRETORIO_BLOBS):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._temporarios = self.diretorio / ".tmp"
+        self._temporarios.mkdir(exist_ok=True)
+
+    def caminho(self, hash_hex):
+        """Caminho do blob de um hash (ValueError se não for um SHA-256 hexadecimal)"""
+        if not hash_hex or not PADRAO_HASH.fullmatch(hash_hex):
+            raise ValueError(f"Hash SHA-256 inválido: {hash_hex!r}")
+        return self.diretorio / hash_hex[:2] / hash_hex[2:4] / f"{hash_hex}{EXTENSAO}"
+
+    def contem(self, hash_hex):
+        try:
+            return self.caminho(hash_hex).is_file()
+        except ValueError:
+            return False
+
+    def blobs(self):
+        """Gera (hash, caminho) de todos os blobs armazenados"""
+        for primeiro in sorted(self.diretorio.glob("[0-9a-f][0-9a-f]")):
+            for caminho in sorted(primeiro.glob(f"[0-9a-f][0-9a-f]/*{EXTENSAO}")):
+                if PADRAO_HASH.fullmatch(caminho.stem):
+                    yield caminho.stem, caminho
+
+    def _publicar(self, origem, hash_hex, mover):
+        """Coloca origem no caminho do hash. Retorna False se o blob já existia (deduplicado)."""
+        destino = self.caminho(hash_hex)
+        if destino.exists():
+            if mover:
+                os.unlink(origem)
+            return False
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        if mover:
+            os.replace(origem, destino)
+        else:
+            try:
+                os.link(origem, destino)
+            except FileExistsError:
+                return False
+        return True
+
+    def armazenar_arquivo(self, origem, mover=False):
+        """
+        Armazena um arquivo e retorna o blob correspondente.
+
+        Com mover=True o arquivo de origem é consumido: o hash é calculado numa
+        leitura e o arquivo é renomeado para o blob (ou descartado, se o blob
+        já existe). Sem mover, os bytes são copiados em blocos para um
+        temporário do armazém com o hash calculado durante a cópia. Se a
+        origem está em outro sistema de arquivos, o rename vira cópia.
+
+        Returns:
+            dict: caminho, hash (SHA-256), tamanho em bytes e novo (False quando deduplicado)
+        """
+        origem = Path(origem)
+        if mover:
+            hash_hex = hash_arquivo(origem)
+            tamanho = origem.stat().st_size
+            try:
+                novo = self._publicar(origem, hash_hex, mover=True)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                resultado = self.armazenar_arquivo(origem)
+                os.unlink(origem)
+                return resultado
+            return {"caminho": str(self.caminho(hash_hex)), "hash": hash_hex, "tamanho": tamanho, "novo": novo}
+
+        sha256 = hashlib.sha256()
+        tamanho = 0
+        with open(origem, "rb") as entrada, tempfile.NamedTemporaryFile(
+                dir=self._temporarios, suffix=EXTENSAO, delete=False) as saida:
+            try:
+                for bloco in iter(lambda: entrada.read(TAMANHO_BLOCO), b""):
+                    sha256.update(bloco)
+                    saida.write(bloco)
+                    tamanho += len(bloco)
+            except BaseException:
+                saida.close()
+                os.unlink(saida.name)
+                raise
+
+        hash_hex = sha256.hexdigest()
+        novo = self._publicar(saida.name, hash_hex, mover=True)
+        return {"caminho": str(self.caminho(hash_hex)), "hash": hash_hex, "tamanho": tamanho, "novo": novo}
+
+    def importar_arquivo(self, origem):
+        """
+        Armazena um arquivo existente mantendo a origem: o blob é um hard link
+        para o mesmo conteúdo em disco (cópia se o link não for possível).
+
+        Returns:
+            dict: como armazenar_arquivo
+        """
+        origem = Path(origem)
+        hash_hex = hash_arquivo(origem)
+        try:
+            novo = self._publicar(origem, hash_hex, mover=False)
+        except OSError:
+            # Outro sistema de arquivos ou sem suporte a hard link
+            return self.armazenar_arquivo(origem)
+        return {"caminho": str(self.caminho(hash_hex)), "hash": hash_hex, "tamanho": origem.stat().st_size, "novo": novo}
+
+
+# Instância global
+armazem_oficios = ArmazemOficios()
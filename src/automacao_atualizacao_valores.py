@@ -6,10 +6,14 @@ import sys
 sys.path.append("src")
 
 from database import SessionLocal
-from models import Processo
+from models_atualizado import Processo
+import eventos_processos
 from calculadora_juros import CalculadoraPrecatorio
+from estatisticas_dashboard import estatisticas_dashboard
+from monitor_oficios import monitor_oficios
 from sqlalchemy import text
 from datetime import datetime, date
+import numpy as np
 
 class AtualizadorValores:
     """Atualiza valores automaticamente com juros e correção"""
@@ -104,22 +108,23 @@ class AtualizadorValores:
             resultado = calc.calcular_tudo(tipo_juros='SIMPLES')
             
             # Atualizar no banco
-            self.db.execute(text("""
-                UPDATE processos 
-                SET valor_principal = :valor_principal,
-                    valor_juros = :valor_juros,
-                    valor_correcao_monetaria = :valor_correcao,
-                    valor_atualizado = :valor_total,
-                    data_ultima_atualizacao_valor = :data_atualizacao
-                WHERE id = :id
-            """), {
-                'valor_principal': resultado['valor_principal'],
-                'valor_juros': resultado['valor_juros'],
-                'valor_correcao': resultado['valor_correcao'],
-                'valor_total': resultado['valor_total'],
-                'data_atualizacao': datetime.now(),
-                'id': processo.id
-            })
+            with eventos_processos.rastrear(self.db, processo.id):
+                self.db.execute(text("""
+                    UPDATE processos 
+                    SET valor_principal = :valor_principal,
+                        valor_juros = :valor_juros,
+                        valor_correcao_monetaria = :valor_correcao,
+                        valor_atualizado = :valor_total,
+                        data_ultima_atualizacao_valor = :data_atualizacao
+                    WHERE id = :id
+                """), {
+                    'valor_principal': resultado['valor_principal'],
+                    'valor_juros': resultado['valor_juros'],
+                    'valor_correcao': resultado['valor_correcao'],
+                    'valor_total': resultado['valor_total'],
+                    'data_atualizacao': datetime.now(),
+                    'id': processo.id
+                })
             
             # Salvar no histórico
             self.db.execute(text("""
@@ -157,10 +162,262 @@ class AtualizadorValores:
             print(f"Erro ao atualizar processo: {e}")
             return {'sucesso': False}
 
+    # ========================================================================
+    # MODO LOTE (vetorizado)
+    # ========================================================================
+    
+    def _carregar_colunas(self, tribunal='TODOS'):
+        """Lê (id, valor, data base, taxa, índice) dos processos em arrays NumPy"""
+        sql = """
+            SELECT id, valor_atualizado,
+                   COALESCE(data_base_calculo, data_cadastro) AS data_base,
+                   taxa_juros_mensal, indice_correcao
+            FROM processos
+            WHERE valor_atualizado IS NOT NULL AND valor_atualizado != 0
+        """
+        params = {}
+        if tribunal != 'TODOS':
+            sql += " AND tribunal = :tribunal"
+            params['tribunal'] = tribunal
+        
+        linhas = self.db.execute(text(sql), params).all()
+        
+        ids = np.array([l[0] for l in linhas], dtype=np.int64)
+        valores = np.array([l[1] for l in linhas], dtype=np.float64)
+        datas_base = np.array(
+            [l[2] if l[2] is not None else '2020-01-01' for l in linhas],
+            dtype='datetime64[us]'
+        )
+        # Mesmos padrões de atualizar_processo (0.5% a.m. e IPCA)
+        taxas = np.array([float(l[3] or 0.5) for l in linhas], dtype=np.float64)
+        indices = np.array([l[4] or 'IPCA' for l in linhas], dtype=object)
+        
+        return ids, valores, datas_base, taxas, indices
+    
+    @staticmethod
+    def _somar_meses(datas, meses):
+        """
+        Equivalente vetorizado de data + relativedelta(months=meses):
+        o dia é limitado ao último dia do mês de destino e o horário é mantido.
+        """
+        mes_origem = datas.astype('datetime64[M]')
+        dia = (datas.astype('datetime64[D]') - mes_origem.astype('datetime64[D]')).astype(np.int64)
+        horario = datas - datas.astype('datetime64[D]')
+        
+        mes_destino = mes_origem + meses
+        dias_no_mes = ((mes_destino + 1).astype('datetime64[D]') - mes_destino.astype('datetime64[D]')).astype(np.int64)
+        dia = np.minimum(dia, dias_no_mes - 1)
+        
+        return mes_destino.astype('datetime64[D]') + dia + horario
+    
+    @classmethod
+    def calcular_meses_vetorizado(cls, datas_base, data_final):
+        """
+        Mesmo resultado de CalculadoraPrecatorio.calcular_meses() para cada linha:
+        anos*12 + meses do relativedelta, +1 se sobrar ao menos um dia.
+        (Assume data_final >= data base; ver atualizar_lote.)
+        """
+        final = np.datetime64(data_final, 'us')
+        
+        meses_base = datas_base.astype('datetime64[M]').astype(np.int64)
+        meses_final = final.astype('datetime64[M]').astype(np.int64)
+        meses = meses_final - meses_base
+        
+        candidata = cls._somar_meses(datas_base, meses)
+        passou = candidata > final
+        if passou.any():
+            meses = np.where(passou, meses - 1, meses)
+            candidata = cls._somar_meses(datas_base, meses)
+        
+        dias_restantes = (final - candidata) // np.timedelta64(1, 'D')
+        return meses + (dias_restantes > 0)
+    
+    @staticmethod
+    def calcular_fatores_correcao(valores, datas_base, data_final, indices):
+        """
+        Correção monetária vetorizada pelas séries acumuladas da calculadora.
+        
+        Cada linha custa duas consultas ao produto acumulado (anos cheios)
+        mais os fatores proporcionais das pontas, na mesma ordem de
+        multiplicação de SerieAnual.fator_proporcional_meses, de modo que o
+        resultado é idêntico ao cálculo linha a linha.
+        """
+        series = CalculadoraPrecatorio.SERIES
+        
+        ano_inicial = datas_base.astype('datetime64[Y]').astype(np.int64) + 1970
+        mes_inicial = datas_base.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        ano_final = data_final.year
+        mes_final = data_final.month
+        
+        # Índice desconhecido cai no IPCA, como na calculadora
+        codigos = np.array([i if i in series else 'IPCA' for i in indices], dtype=object)
+        
+        fatores = np.ones(len(valores))
+        if len(valores) == 0:
+            return valores * fatores - valores
+        
+        for nome, serie in series.items():
+            linhas = (codigos == nome) & (ano_inicial <= ano_final)
+            if not linhas.any():
+                continue
+            
+            anos = ano_inicial[linhas]
+            taxas = np.append(serie.taxas, 0.0)
+            acumulado = np.asarray(serie.acumulado)
+            posicao = np.clip(anos - serie.ano_inicial, 0, len(serie.taxas))
+            
+            # Taxa do ano (zero fora da série)
+            dentro = (anos >= serie.ano_inicial) & (anos < serie.ano_inicial + len(serie.taxas))
+            taxa_inicial = np.where(dentro, taxas[posicao], 0.0) * ((12 - mes_inicial[linhas] + 1) / 12)
+            
+            fator = np.ones(len(anos))
+            fator *= (1 + taxa_inicial)
+            
+            # Anos cheios e último ano, só para quem começou antes de ano_final
+            varios_anos = anos < ano_final
+            meio = acumulado[serie.posicao(ano_final)] / acumulado[np.clip(anos + 1 - serie.ano_inicial, 0, len(serie.taxas))]
+            fator = np.where(varios_anos, fator * meio, fator)
+            fator = np.where(varios_anos, fator * (1 + serie.taxa(ano_final) * (mes_final / 12)), fator)
+            
+            fatores[linhas] = fator
+        
+        return valores * fatores - valores
+    
+    def atualizar_lote(self, tribunal='TODOS', tipo_juros='SIMPLES', tamanho_lote=5000, data_final=None):
+        """
+        Atualiza os valores de todos os processos em modo lote.
+        
+        Lê as colunas necessárias em arrays NumPy, calcula meses, juros e
+        correção de forma vetorizada e grava com executemany em transações
+        de tamanho_lote linhas (UPDATE em processos + INSERT em historico_valores).
+        Os valores gravados são os mesmos de atualizar_processo.
+        """
+        try:
+            inicio = datetime.now()
+            self.log("Iniciando atualização de valores (modo lote)...", 'info')
+            
+            data_final = data_final or date.today()
+            final = datetime(data_final.year, data_final.month, data_final.day)
+            
+            ids, valores, datas_base, taxas, indices = self._carregar_colunas(tribunal)
+            total = len(ids)
+            self.log(f"Total de processos para atualizar: {total}", 'info')
+            
+            if total == 0:
+                return self.resultados
+            
+            # Data base futura: relativedelta devolve meses negativos; usa o cálculo linha a linha
+            futuras = datas_base > np.datetime64(final, 'us')
+            
+            meses = self.calcular_meses_vetorizado(datas_base, final)
+            if tipo_juros == 'SIMPLES':
+                juros = valores * (taxas / 100) * meses
+            else:
+                juros = valores * np.power(1 + taxas / 100, meses) - valores
+            correcao = self.calcular_fatores_correcao(valores, datas_base, final, indices)
+            
+            agora = datetime.now()
+            for pos in np.flatnonzero(futuras):
+                calc = CalculadoraPrecatorio(
+                    valor_principal=float(valores[pos]),
+                    data_base=datas_base[pos].astype(datetime),
+                    data_final=final,
+                    taxa_juros_mensal=float(taxas[pos]),
+                    indice_correcao=indices[pos]
+                )
+                meses[pos] = calc.calcular_meses()
+                juros[pos] = calc.calcular_juros_simples() if tipo_juros == 'SIMPLES' else calc.calcular_juros_compostos()
+                correcao[pos] = calc.calcular_correcao_monetaria()
+            
+            for inicio_lote in range(0, total, tamanho_lote):
+                fim_lote = min(inicio_lote + tamanho_lote, total)
+                atualizacoes = []
+                historicos = []
+                
+                for pos in range(inicio_lote, fim_lote):
+                    valor_principal = round(float(valores[pos]), 2)
+                    valor_juros = round(float(juros[pos]), 2)
+                    valor_correcao = round(float(correcao[pos]), 2)
+                    valor_total = round(float(valores[pos]) + valor_juros + valor_correcao, 2)
+                    
+                    atualizacoes.append({
+                        'valor_principal': valor_principal,
+                        'valor_juros': valor_juros,
+                        'valor_correcao': valor_correcao,
+                        'valor_total': valor_total,
+                        'data_atualizacao': agora,
+                        'id': int(ids[pos])
+                    })
+                    historicos.append({
+                        'processo_id': int(ids[pos]),
+                        'data_atualizacao': agora,
+                        'valor_principal': valor_principal,
+                        'valor_juros': valor_juros,
+                        'valor_correcao': valor_correcao,
+                        'valor_total': valor_total,
+                        'taxa_juros': float(taxas[pos]),
+                        'indice_correcao': indices[pos],
+                        'periodo_inicio': datas_base[pos].astype(datetime).date(),
+                        'periodo_fim': data_final,
+                        'usuario': 'Sistema Automático'
+                    })
+                    self.resultados['valor_total_atualizado'] += valor_total
+                
+                try:
+                    self.db.execute(text("""
+                        UPDATE processos 
+                        SET valor_principal = :valor_principal,
+                            valor_juros = :valor_juros,
+                            valor_correcao_monetaria = :valor_correcao,
+                            valor_atualizado = :valor_total,
+                            data_ultima_atualizacao_valor = :data_atualizacao
+                        WHERE id = :id
+                    """), atualizacoes)
+                    
+                    self.db.execute(text("""
+                        INSERT INTO historico_valores 
+                        (processo_id, data_atualizacao, valor_principal, valor_juros, 
+                         valor_correcao, valor_total, taxa_juros, indice_correcao, 
+                         periodo_inicio, periodo_fim, usuario)
+                        VALUES 
+                        (:processo_id, :data_atualizacao, :valor_principal, :valor_juros,
+                         :valor_correcao, :valor_total, :taxa_juros, :indice_correcao,
+                         :periodo_inicio, :periodo_fim, :usuario)
+                    """), historicos)
+                    
+                    self.db.commit()
+                    self.resultados['sucesso'] += len(atualizacoes)
+                except Exception as e:
+                    self.db.rollback()
+                    self.resultados['erros'] += len(atualizacoes)
+                    self.resultados['valor_total_atualizado'] -= sum(a['valor_total'] for a in atualizacoes)
+                    self.log(f"  ✗ Erro no lote {inicio_lote}-{fim_lote}: {str(e)}", 'error')
+                
+                self.resultados['processados'] += len(atualizacoes)
+                self.log(f"[{fim_lote}/{total}] processos gravados", 'info')
+            
+            # UPDATEs em massa não passam pelo ORM: recalcula os agregados do
+            # dashboard e o score de oportunidade (depende do valor atualizado)
+            estatisticas_dashboard.reconstruir(self.db)
+            monitor_oficios.recalcular_scores(self.db)
+            self.db.commit()
+            
+            duracao = (datetime.now() - inicio).total_seconds()
+            self.log(f"Atualização concluída em {duracao:.1f}s! Valor total: R$ {self.resultados['valor_total_atualizado']:,.2f}", 'success')
+            
+            return self.resultados
+            
+        except Exception as e:
+            self.db.rollback()
+            self.log(f"Erro geral: {str(e)}", 'error')
+            return self.resultados
+        finally:
+            self.db.close()
+
 # Teste
 if __name__ == "__main__":
     atualizador = AtualizadorValores()
-    resultado = atualizador.atualizar_todos()
+    resultado = atualizador.atualizar_lote()
     
     print("\n" + "="*70)
     print("RESULTADO DA ATUALIZAÇÃO")
@@ -14,12 +14,16 @@ import time
 from pathlib import Path
 import logging
 from datetime import datetime
-import hashlib
 import sys
 
 sys.path.append("src")
+sys.path.append("robots")
 from database import SessionLocal
-from models_atualizado import Processo, LogBuscaOficio, StatusProcessoEnum
+from models_atualizado import Processo, LogBuscaOficio, StatusProcessoEnum, TribunalEnum, NaturezaEnum
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
+from armazem_oficios import hash_arquivo
+from gerenciador_downloads import gerenciador_downloads
+from buscador_oficio import BuscadorOficioRequisitorio
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +35,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Resultados registrados por commit em processar_lote
+TAMANHO_LOTE_COMMIT = 50
+
 class ConfiguracaoTribunal:
     """Configurações específicas de cada tribunal"""
     
@@ -83,7 +90,8 @@ class AutomacaoOficiosAvancada:
             "total": 0,
             "sucesso": 0,
             "falha": 0,
-            "tempo_total": 0
+            "tempo_total": 0,
+            "tempo_decorrido": 0
         }
     
     def iniciar_driver(self):
@@ -123,10 +131,9 @@ class AutomacaoOficiosAvancada:
         logger.info("Conectado ao banco de dados")
     
     def calcular_hash_arquivo(self, caminho):
-        """Calcula hash MD5 de um arquivo"""
+        """Calcula hash SHA-256 de um arquivo (o mesmo de processos.hash_oficio)"""
         try:
-            with open(caminho, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return hash_arquivo(caminho)
         except:
             return None
     
@@ -193,60 +200,44 @@ class AutomacaoOficiosAvancada:
             elementos = self.driver.find_elements(By.XPATH, "//*[contains(translate(text(), 'ÁÉÍÓÚÂÊÔÃÕÇ', 'aeiouaeoaoc'), 'oficio')]")
             
             if elementos:
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", elementos[0])
-                time.sleep(1)
-                elementos[0].click()
-                time.sleep(10)
-                
-                # Verificar download
-                arquivos_pdf = list(self.downloads_dir.glob("*.pdf"))
+                # Download isolado no diretório da tarefa, gravado pelo hash do conteúdo
+                with gerenciador_downloads.diretorio_tarefa() as diretorio:
+                    gerenciador_downloads.configurar_selenium(self.driver, diretorio)
+                    self.driver.execute_script("arguments[0].scrollIntoView(true);", elementos[0])
+                    elementos[0].click()
+                    
+                    arquivo = gerenciador_downloads.aguardar_arquivo(diretorio)
+                    armazenado = gerenciador_downloads.armazenar_arquivo(arquivo, mover=True) if arquivo else None
                 
-                if arquivos_pdf:
-                    arquivo_mais_recente = max(arquivos_pdf, key=lambda p: p.stat().st_mtime)
+                if armazenado:
+                    # Atualizar processo
+                    processo.tem_oficio = True
+                    processo.caminho_oficio = armazenado["caminho"]
+                    processo.data_busca_oficio = datetime.now()
+                    processo.hash_oficio = armazenado["hash"]
+                    processo.status = StatusProcessoEnum.OFICIO_BAIXADO
+                    
+                    # Registrar log
+                    tempo_execucao = time.time() - tempo_inicio
                     
-                    if time.time() - arquivo_mais_recente.stat().st_mtime < 60:
-                        # Renomear
-                        novo_nome = f"oficio_{processo.numero_processo.replace('/', '_').replace('.', '_')}.pdf"
-                        novo_caminho = self.downloads_dir / novo_nome
-                        
-                        if novo_caminho.exists():
-                            novo_caminho = self.downloads_dir / f"oficio_{processo.numero_processo.replace('/', '_').replace('.', '_')}_{int(time.time())}.pdf"
-                        
-                        arquivo_mais_recente.rename(novo_caminho)
-                        
-                        # Calcular hash
-                        hash_arquivo = self.calcular_hash_arquivo(novo_caminho)
-                        
-                        # Atualizar processo
-                        processo.tem_oficio = True
-                        processo.caminho_oficio = str(novo_caminho)
-                        processo.data_busca_oficio = datetime.now()
-                        processo.hash_oficio = hash_arquivo
-                        processo.status = StatusProcessoEnum.OFICIO_BAIXADO
-                        
-                        # Registrar log
-                        tempo_execucao = time.time() - tempo_inicio
-                        
-                        log = LogBuscaOficio(
-                            processo_id=processo.id,
-                            numero_processo=processo.numero_processo,
-                            tribunal=processo.tribunal.value,
-                            sucesso=True,
-                            tempo_execucao=tempo_execucao,
-                            caminho_oficio=str(novo_caminho),
-                            tamanho_arquivo=novo_caminho.stat().st_size
-                        )
-                        
-                        self.db.add(log)
-                        self.db.commit()
-                        
-                        logger.info(f"Oficio baixado com sucesso: {novo_caminho.name}")
-                        
-                        return {
-                            "sucesso": True,
-                            "caminho": str(novo_caminho),
-                            "tempo": tempo_execucao
-                        }
+                    log = LogBuscaOficio(
+                        processo_id=processo.id,
+                        sucesso=True,
+                        mensagem=f"Oficio baixado: {armazenado['caminho']} ({armazenado['tamanho']} bytes)",
+                        tempo_execucao=tempo_execucao
+                    )
+                    
+                    self.db.add(log)
+                    self.db.commit()
+                    
+                    logger.info(f"Oficio baixado com sucesso: {armazenado['caminho']}")
+                    
+                    return {
+                        "sucesso": True,
+                        "caminho": armazenado["caminho"],
+                        "hash": armazenado["hash"],
+                        "tempo": tempo_execucao
+                    }
             
             raise Exception("Oficio nao encontrado")
             
@@ -258,10 +249,8 @@ class AutomacaoOficiosAvancada:
             # Registrar log de falha
             log = LogBuscaOficio(
                 processo_id=processo.id,
-                numero_processo=processo.numero_processo,
-                tribunal=processo.tribunal.value,
                 sucesso=False,
-                erro=str(e),
+                mensagem=str(e),
                 tempo_execucao=tempo_execucao
             )
             
@@ -275,14 +264,21 @@ class AutomacaoOficiosAvancada:
             }
     
     def processar_lote(self, tribunal="TJSP", limite=None, filtros=None):
-        """Processa um lote de processos"""
+        """
+        Processa um lote de processos.
+        
+        As buscas rodam em paralelo no motor assíncrono dos robôs
+        (BuscadorOficioRequisitorio.buscar_em_andamento, com o limite e o
+        backoff de cada portal). Cada resultado é registrado assim que a busca
+        termina, com um commit a cada TAMANHO_LOTE_COMMIT resultados.
+        """
         logger.info("="*60)
         logger.info("PROCESSAMENTO EM LOTE")
         logger.info("="*60)
         
         # Buscar processos
         query = self.db.query(Processo).filter(
-            Processo.tribunal.has(value=tribunal),
+            Processo.tribunal == TribunalEnum(tribunal),
             Processo.tem_oficio == False
         )
         
@@ -295,7 +291,7 @@ class AutomacaoOficiosAvancada:
                 query = query.filter(Processo.valor_atualizado <= filtros["valor_maximo"])
             
             if filtros.get("natureza"):
-                query = query.filter(Processo.natureza.has(value=filtros["natureza"]))
+                query = query.filter(Processo.natureza == NaturezaEnum(filtros["natureza"]))
             
             if filtros.get("credor_idoso"):
                 query = query.filter(Processo.credor_idoso == True)
@@ -311,32 +307,52 @@ class AutomacaoOficiosAvancada:
             logger.warning("Nenhum processo encontrado")
             return
         
-        # Iniciar driver
-        if not self.driver:
-            self.iniciar_driver()
-        
         # Processar
         self.estatisticas["total"] = len(processos)
+        tempo_inicio = time.time()
         
-        for i, processo in enumerate(processos, 1):
-            logger.info(f"\n[{i}/{len(processos)}] Processando {processo.numero_processo}")
+        buscador = BuscadorOficioRequisitorio()
+        por_numero = {processo.numero_processo: processo for processo in processos}
+        andamento = buscador.buscar_em_andamento(list(por_numero), tribunal)
+        
+        for i, (numero_processo, resultado) in enumerate(andamento, 1):
+            logger.info(f"[{i}/{len(processos)}] {numero_processo}: {resultado['mensagem']}")
             
-            resultado = self.buscar_oficio_tjsp(processo)
+            self._registrar_resultado(por_numero[numero_processo], resultado)
             
             if resultado["sucesso"]:
                 self.estatisticas["sucesso"] += 1
             else:
                 self.estatisticas["falha"] += 1
             
-            self.estatisticas["tempo_total"] += resultado["tempo"]
+            self.estatisticas["tempo_total"] += resultado.get("tempo", 0)
             
-            # Pausa entre processos
-            if i < len(processos):
-                time.sleep(5)
+            if i % TAMANHO_LOTE_COMMIT == 0:
+                self.db.commit()
+        
+        self.db.commit()
+        self.estatisticas["tempo_decorrido"] = time.time() - tempo_inicio
         
         # Resumo
         self._exibir_resumo()
     
+    def _registrar_resultado(self, processo, resultado):
+        """Atualiza o processo e registra o log de uma busca do lote (sem commit)"""
+        processo.data_busca_oficio = datetime.now()
+        
+        if resultado["sucesso"]:
+            processo.tem_oficio = True
+            processo.caminho_oficio = resultado["caminho"]
+            processo.hash_oficio = resultado["hash"]
+            processo.status = StatusProcessoEnum.OFICIO_BAIXADO
+        
+        self.db.add(LogBuscaOficio(
+            processo_id=processo.id,
+            sucesso=resultado["sucesso"],
+            mensagem=resultado["mensagem"],
+            tempo_execucao=resultado.get("tempo")
+        ))
+    
     def _exibir_resumo(self):
         """Exibe resumo das estatísticas"""
         logger.info("\n" + "="*60)
@@ -355,6 +371,11 @@ class AutomacaoOficiosAvancada:
             logger.info(f"Tempo medio por processo: {tempo_medio:.1f}s")
             logger.info(f"Tempo total: {self.estatisticas['tempo_total']:.1f}s")
         
+        if self.estatisticas['tempo_decorrido'] > 0:
+            vazao = self.estatisticas['total'] / self.estatisticas['tempo_decorrido'] * 60
+            logger.info(f"Tempo decorrido (buscas em paralelo): {self.estatisticas['tempo_decorrido']:.1f}s")
+            logger.info(f"Vazao: {vazao:.1f} processos/min")
+        
         logger.info("="*60)
     
     def fechar(self):
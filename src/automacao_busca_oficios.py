@@ -8,6 +8,7 @@ sys.path.append("src")
 from database import SessionLocal
 from models import Processo
 from sqlalchemy import text
+import eventos_processos
 from datetime import datetime
 import time
 import requests
@@ -174,19 +175,20 @@ class BuscadorOficios:
     def atualizar_processo_com_oficio(self, processo, dados_oficio):
         """Atualiza processo com dados do ofício encontrado"""
         try:
-            self.db.execute(text("""
-                UPDATE processos 
-                SET tem_oficio = 1,
-                    numero_oficio = :numero_oficio,
-                    data_expedicao_oficio = :data_expedicao,
-                    valor_oficio = :valor
-                WHERE id = :id
-            """), {
-                'numero_oficio': dados_oficio['numero_oficio'],
-                'data_expedicao': dados_oficio['data_expedicao'],
-                'valor': dados_oficio['valor'],
-                'id': processo.id
-            })
+            with eventos_processos.rastrear(self.db, processo.id):
+                self.db.execute(text("""
+                    UPDATE processos 
+                    SET tem_oficio = 1,
+                        numero_oficio = :numero_oficio,
+                        data_expedicao_oficio = :data_expedicao,
+                        valor_oficio = :valor
+                    WHERE id = :id
+                """), {
+                    'numero_oficio': dados_oficio['numero_oficio'],
+                    'data_expedicao': dados_oficio['data_expedicao'],
+                    'valor': dados_oficio['valor'],
+                    'id': processo.id
+                })
             self.db.commit()
         except Exception as e:
             self.db.rollback()
@@ -1,27 +1,103 @@
 ﻿"""
 Módulo de Automação - Consulta de Status dos Processos
+
+As consultas rodam em um pool de threads: cada tribunal tem a sua fila, um
+limite de consultas simultâneas e um balde de tokens (taxa de requisições
+por segundo com rajada), em vez de um sleep fixo entre processos. O total de
+consultas em andamento também tem um teto (trabalhadores). Só a thread
+principal usa a sessão do banco: as alterações são acumuladas e gravadas em
+lotes, com um commit por lote.
+
+A consulta ao portal é plugável (ConsultaTribunal). Enquanto não há busca
+real, a ConsultaTribunalSimulada faz o papel do portal localmente.
 """
 
 import sys
 sys.path.append("src")
 
-from database import SessionLocal
-from models import Processo
-from sqlalchemy import text
-from datetime import datetime
-import time
+import os
+import queue
 import random
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from contextlib import closing
+from datetime import datetime
+
+from database import SessionLocal
+from balde_tokens import BaldeTokens
+from models_atualizado import Processo, StatusProcessoEnum
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
+from movimentacoes import ingestao_movimentacoes
+
+# Configuração (variáveis de ambiente)
+TRABALHADORES = int(os.environ.get("TAXMASTER_CONSULTA_TRABALHADORES", 32))
+CONCORRENCIA_TRIBUNAL = int(os.environ.get("TAXMASTER_CONSULTA_CONCORRENCIA_TRIBUNAL", 4))
+TAXA_TRIBUNAL = float(os.environ.get("TAXMASTER_CONSULTA_TAXA_TRIBUNAL", 2.0))  # requisições/s
+RAJADA_TRIBUNAL = int(os.environ.get("TAXMASTER_CONSULTA_RAJADA_TRIBUNAL", 4))
+TAMANHO_LOTE = int(os.environ.get("TAXMASTER_CONSULTA_TAMANHO_LOTE", 200))
+
+# Limites específicos por tribunal, sobrepondo os padrões acima. Exemplo:
+# {"TJSP": {"concorrencia": 2, "taxa": 1.0, "rajada": 2}}
+LIMITES_TRIBUNAL = {}
+
+# O que a consulta recebe de cada processo (a sessão do banco não sai da thread principal)
+ProcessoConsulta = namedtuple("ProcessoConsulta", "id numero_processo tribunal status")
+
+
+class ConsultaTribunal:
+    """Interface da consulta de um processo no portal do tribunal"""
+
+    def consultar(self, processo):
+        """
+        Consulta um processo (chamado em paralelo, de várias threads)
+
+        Args:
+            processo: ProcessoConsulta
+
+        Returns:
+            dict: 'status' (StatusProcessoEnum ou o nome; None = sem alteração)
+            e, opcionalmente, 'movimentacoes' (lista de {data, descricao},
+            ingeridas por movimentacoes.ingestao_movimentacoes)
+        """
+        raise NotImplementedError
+
+
+class ConsultaTribunalSimulada(ConsultaTribunal):
+    """Portal falso: latência aleatória e 20% de chance de mudança de status"""
+
+    STATUS_POSSIVEIS = [
+        StatusProcessoEnum.EM_ANALISE, StatusProcessoEnum.VALIDADO, StatusProcessoEnum.OFICIO_BAIXADO,
+        StatusProcessoEnum.PAGO
+    ]
+
+    def __init__(self, latencia=(0.05, 0.3), chance_mudanca=0.2):
+        self.latencia = latencia
+        self.chance_mudanca = chance_mudanca
+
+    def consultar(self, processo):
+        time.sleep(random.uniform(*self.latencia))
+        if random.random() < self.chance_mudanca:
+            return {'status': random.choice(self.STATUS_POSSIVEIS)}
+        return {'status': None}
+
 
 class ConsultadorStatus:
     """Consulta status dos processos nos tribunais"""
     
-    def __init__(self):
+    def __init__(self, consulta=None, trabalhadores=TRABALHADORES, tamanho_lote=TAMANHO_LOTE,
+                 limites_tribunal=None):
         self.db = SessionLocal()
+        self.consulta = consulta or ConsultaTribunalSimulada()
+        self.trabalhadores = trabalhadores
+        self.tamanho_lote = tamanho_lote
+        self.limites_tribunal = dict(LIMITES_TRIBUNAL, **(limites_tribunal or {}))
         self.resultados = {
             'processados': 0,
             'sucesso': 0,
             'erros': 0,
             'atualizacoes': 0,
+            'movimentacoes': 0,
             'logs': []
         }
     
@@ -35,6 +111,13 @@ class ConsultadorStatus:
         })
         print(f"[{timestamp}] {mensagem}")
     
+    def limites(self, tribunal):
+        """(concorrência, balde de tokens) do tribunal"""
+        limites = self.limites_tribunal.get(tribunal, {})
+        concorrencia = limites.get('concorrencia', CONCORRENCIA_TRIBUNAL)
+        balde = BaldeTokens(limites.get('taxa', TAXA_TRIBUNAL), limites.get('rajada', RAJADA_TRIBUNAL))
+        return concorrencia, balde
+    
     def consultar_todos(self, tribunal='TODOS', filtro_processos='TODOS'):
         """Consulta status de todos os processos"""
         try:
@@ -46,76 +129,167 @@ class ConsultadorStatus:
             if tribunal != 'TODOS':
                 query = query.filter(Processo.tribunal == tribunal)
             
-            processos = query.all()
+            processos = {processo.id: processo for processo in query.all()}
             total = len(processos)
             
             self.log(f"Total de processos para consultar: {total}", 'info')
             
-            # Consultar cada processo
-            for i, processo in enumerate(processos, 1):
-                self.resultados['processados'] += 1
-                
-                self.log(f"[{i}/{total}] Consultando: {processo.numero_processo}", 'info')
-                
-                try:
-                    resultado = self.consultar_processo(processo)
+            lote = []
+            consultas = self.consultar_em_paralelo(
+                self._para_consulta(processo) for processo in processos.values()
+            )
+            # closing: se a varredura for interrompida, as threads param de consultar
+            with closing(consultas):
+                for processo_consulta, resultado, erro in consultas:
+                    self.resultados['processados'] += 1
                     
-                    if resultado['atualizado']:
-                        self.resultados['sucesso'] += 1
-                        self.resultados['atualizacoes'] += 1
-                        self.log(f"  ✓ Status atualizado: {resultado['status']}", 'success')
-                    else:
-                        self.log(f"  - Sem alterações", 'info')
+                    if erro is None:
+                        try:
+                            resultado = self._validar_resultado(resultado)
+                        except ValueError as e:
+                            erro = e
                     
-                    # Delay
-                    time.sleep(1)
+                    if erro is not None:
+                        self.resultados['erros'] += 1
+                        self.log(f"  ✗ {processo_consulta.numero_processo}: {erro}", 'error')
+                        continue
                     
-                except Exception as e:
-                    self.resultados['erros'] += 1
-                    self.log(f"  ✗ Erro: {str(e)}", 'error')
+                    self.resultados['sucesso'] += 1
+                    lote.append((processo_consulta, resultado))
+                    
+                    if len(lote) >= self.tamanho_lote:
+                        self._gravar_lote(lote, processos)
+                        lote = []
+                        self.log(f"[{self.resultados['processados']}/{total}] consultados", 'info')
+            
+            self._gravar_lote(lote, processos)
             
             self.log(f"Consulta concluída! Atualizações: {self.resultados['atualizacoes']}", 'success')
             
             return self.resultados
             
         except Exception as e:
+            self.db.rollback()
             self.log(f"Erro geral: {str(e)}", 'error')
             return self.resultados
         finally:
             self.db.close()
     
+    def consultar_em_paralelo(self, processos):
+        """
+        Consulta os processos no pool (fila por tribunal, com os limites de cada um)
+        
+        Args:
+            processos: iterável de ProcessoConsulta
+            
+        Returns:
+            generator: (processo, resultado, erro) na ordem em que as consultas
+            terminam. Fechar o generator antes do fim faz as threads pararem
+            de pegar processos da fila.
+        """
+        filas = defaultdict(deque)
+        for processo in processos:
+            filas[processo.tribunal].append(processo)
+        
+        total = sum(len(fila) for fila in filas.values())
+        concluidos = queue.Queue()
+        em_andamento = threading.BoundedSemaphore(max(self.trabalhadores, 1))
+        parar = threading.Event()
+        
+        def trabalhador(fila, balde):
+            while not parar.is_set():
+                try:
+                    processo = fila.popleft()
+                except IndexError:
+                    return
+                balde.adquirir()
+                if parar.is_set():
+                    return
+                with em_andamento:
+                    try:
+                        concluidos.put((processo, self.consulta.consultar(processo), None))
+                    except Exception as e:
+                        concluidos.put((processo, None, e))
+        
+        threads = []
+        for tribunal, fila in filas.items():
+            concorrencia, balde = self.limites(tribunal)
+            for _ in range(min(max(concorrencia, 1), len(fila))):
+                thread = threading.Thread(target=trabalhador, args=(fila, balde), daemon=True)
+                thread.start()
+                threads.append(thread)
+        
+        try:
+            for _ in range(total):
+                yield concluidos.get()
+        finally:
+            parar.set()
+        
+        for thread in threads:
+            thread.join()
+    
+    def _gravar_lote(self, lote, processos):
+        """
+        Aplica as alterações de um lote de consultas e grava com um commit
+        
+        Args:
+            lote: lista de (ProcessoConsulta, resultado da consulta)
+            processos: {id: Processo} da sessão
+        """
+        movimentacoes = {}
+        for processo_consulta, resultado in lote:
+            status = resultado.get('status')
+            if status is not None:
+                # Compara com o status lido antes da consulta: só os alterados recarregam o Processo
+                if status.name != processo_consulta.status:
+                    processos[processo_consulta.id].status = status
+                    self.resultados['atualizacoes'] += 1
+                    self.log(f"  ✓ {processo_consulta.numero_processo}: {status.value}", 'success')
+            if resultado.get('movimentacoes'):
+                movimentacoes[processo_consulta.id] = resultado['movimentacoes']
+        
+        if movimentacoes:
+            ingeridas = ingestao_movimentacoes.ingerir_lote(self.db, movimentacoes)
+            self.resultados['movimentacoes'] += sum(item['novas'] for item in ingeridas.values())
+        
+        # O flush mantém dashboard_stats (ORM); um commit por lote
+        self.db.commit()
+    
+    @staticmethod
+    def _validar_resultado(resultado):
+        """Resultado da consulta com o status como StatusProcessoEnum (ValueError se inválido)"""
+        if not isinstance(resultado, dict):
+            raise ValueError(f"Resultado inválido: {resultado!r}")
+        status = resultado.get('status')
+        if status is None or isinstance(status, StatusProcessoEnum):
+            return resultado
+        try:
+            return dict(resultado, status=StatusProcessoEnum[status])
+        except (KeyError, TypeError):
+            raise ValueError(f"Status desconhecido: {status!r}") from None
+    
+    @staticmethod
+    def _para_consulta(processo):
+        return ProcessoConsulta(
+            processo.id, processo.numero_processo,
+            getattr(processo.tribunal, 'name', processo.tribunal),
+            getattr(processo.status, 'name', processo.status)
+        )
+    
     def consultar_processo(self, processo):
         """Consulta status de um processo específico"""
         try:
-            # Simular consulta (implementar busca real em produção)
-            status_possiveis = [
-                'Em Análise', 'Validado', 'Ofício Baixado', 
-                'Em Lista de Pagamento', 'Pago'
-            ]
+            processo_consulta = self._para_consulta(processo)
+            resultado = self._validar_resultado(self.consulta.consultar(processo_consulta))
+            atualizacoes = self.resultados['atualizacoes']
+            self._gravar_lote([(processo_consulta, resultado)], {processo.id: processo})
             
-            # 20% de chance de ter mudança de status
-            if random.random() &lt; 0.2:
-                novo_status = random.choice(status_possiveis)
-                
-                # Atualizar no banco
-                self.db.execute(text("""
-                    UPDATE processos 
-                    SET status = :status,
-                        data_atualizacao = :data_atualizacao
-                    WHERE id = :id
-                """), {
-                    'status': novo_status,
-                    'data_atualizacao': datetime.now(),
-                    'id': processo.id
-                })
-                self.db.commit()
-                
+            if self.resultados['atualizacoes'] > atualizacoes:
                 return {
                     'atualizado': True,
-                    'status': novo_status
+                    'status': processo.status.value
                 }
-            else:
-                return {'atualizado': False}
+            return {'atualizado': False}
                 
         except Exception as e:
             self.db.rollback()
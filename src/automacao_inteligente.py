@@ -7,6 +7,7 @@ import time
 from datetime import datetime
 from database import SessionLocal
 from models_atualizado import Processo, LogBuscaOficio
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 
 class AutomacaoInteligente:
     """Sistema de automação de busca de ofícios"""
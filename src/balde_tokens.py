@@ -0,0 +1,40 @@
+﻿"""
+Módulo do Balde de Tokens
+Limitador de taxa compartilhado entre threads: requisições por segundo nas
+consultas aos tribunais, bytes por segundo na verificação dos ofícios
+"""
+
+import threading
+import time
+
+
+class BaldeTokens:
+    """
+    Limitador de taxa (token bucket), seguro entre threads.
+
+    Os tokens se acumulam a `taxa` por segundo até `capacidade` (rajada). Quem
+    chama adquirir() reserva os tokens (um, ou a quantidade pedida) e dorme,
+    fora do lock, até a reserva vencer, então as esperas saem na ordem de
+    chegada e ninguém fica em espera ativa.
+    """
+
+    def __init__(self, taxa, capacidade=1):
+        self.taxa = float(taxa)
+        self.capacidade = max(float(capacidade), 1.0)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self, quantidade=1):
+        """Reserva tokens e retorna quantos segundos esperar até poder usá-los"""
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            self._tokens -= quantidade
+            return -self._tokens / self.taxa if self._tokens < 0 else 0.0
+
+    def adquirir(self, quantidade=1):
+        espera = self.reservar(quantidade)
+        if espera > 0:
+            time.sleep(espera)
@@ -0,0 +1,202 @@
+﻿"""
+Módulo de Busca Textual
+Índices FTS5 (SQLite) para a busca de processos e contatos, mantidos por triggers
+"""
+
+import re
+
+from sqlalchemy import text, select, table, literal_column, or_
+
+from models_atualizado import Processo, Contato
+
+# Tokenizador: minúsculas e sem acentos ("João" casa com "joao")
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+# Caracteres removidos para formar a versão só-dígitos de números e telefones
+SEPARADORES_NUMERICOS = ('.', '-', '/', ' ', '(', ')', '+')
+
+# Tabelas FTS já confirmadas no banco (evita consultar sqlite_master a cada busca)
+_tabelas_fts_verificadas = set()
+
+
+def _sql_digitos(expressao):
+    """Expressão SQL que remove separadores de um campo numérico"""
+    sql = f"COALESCE({expressao}, '')"
+    for separador in SEPARADORES_NUMERICOS:
+        sql = f"REPLACE({sql}, '{separador}', '')"
+    return sql
+
+
+def _sql_digitos_concatenados(prefixo, colunas):
+    return " || ' ' || ".join(_sql_digitos(f"{prefixo}.{coluna}") for coluna in colunas)
+
+
+# Definição dos índices: tabela de origem, colunas texto e colunas numéricas
+INDICES_FTS = {
+    'processos_fts': {
+        'origem': 'processos',
+        'colunas': ('numero_processo', 'processo_principal', 'credor_nome', 'advogado_nome', 'numero_oficio'),
+        'numericas': ('numero_processo', 'processo_principal', 'numero_oficio'),
+    },
+    'contatos_fts': {
+        'origem': 'contatos',
+        'colunas': ('nome', 'email_principal', 'telefone_principal'),
+        'numericas': ('telefone_principal',),
+    },
+}
+
+
+def _comandos_indice(nome, definicao):
+    """DDL da tabela FTS5, das triggers de sincronização e da carga inicial"""
+    origem = definicao['origem']
+    colunas = definicao['colunas']
+    lista_colunas = ', '.join(colunas)
+    valores_new = ', '.join(f"new.{coluna}" for coluna in colunas)
+    valores_origem = ', '.join(f"o.{coluna}" for coluna in colunas)
+    digitos_new = _sql_digitos_concatenados('new', definicao['numericas'])
+    digitos_origem = _sql_digitos_concatenados('o', definicao['numericas'])
+
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {nome} USING fts5(
+            {lista_colunas}, digitos,
+            tokenize = '{TOKENIZADOR}'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {nome}_ai AFTER INSERT ON {origem} BEGIN
+            INSERT INTO {nome} (rowid, {lista_colunas}, digitos)
+            VALUES (new.id, {valores_new}, {digitos_new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {nome}_ad AFTER DELETE ON {origem} BEGIN
+            DELETE FROM {nome} WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {nome}_au AFTER UPDATE OF {lista_colunas} ON {origem} BEGIN
+            DELETE FROM {nome} WHERE rowid = old.id;
+            INSERT INTO {nome} (rowid, {lista_colunas}, digitos)
+            VALUES (new.id, {valores_new}, {digitos_new});
+        END
+        """,
+        f"DELETE FROM {nome}",
+        f"""
+        INSERT INTO {nome} (rowid, {lista_colunas}, digitos)
+        SELECT o.id, {valores_origem}, {digitos_origem} FROM {origem} o
+        """,
+        f"INSERT INTO {nome} ({nome}) VALUES ('optimize')",
+    ]
+
+
+def criar_indices_busca(db):
+    """Cria (ou recria o conteúdo de) os índices FTS5 e suas triggers"""
+    for nome, definicao in INDICES_FTS.items():
+        for comando in _comandos_indice(nome, definicao):
+            db.execute(text(comando))
+    _tabelas_fts_verificadas.clear()
+
+
+def fts_disponivel(db, tabela):
+    """
+    Verifica (uma vez por processo) se o índice FTS foi criado. FTS5 só existe
+    no SQLite: nos demais bancos a busca usa o LIKE
+    """
+    if tabela in _tabelas_fts_verificadas:
+        return True
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+
+    existe = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+        {"nome": tabela}
+    ).first()
+    if existe:
+        _tabelas_fts_verificadas.add(tabela)
+    return bool(existe)
+
+
+def montar_consulta_fts(busca):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5.
+
+    Cada palavra vira um prefixo ("silv"*) e todas precisam aparecer. Se o
+    texto tiver dígitos, também procura a versão só-dígitos na coluna
+    digitos, para que "0001234-56.2024" e "000123456 2024" encontrem o mesmo
+    processo. Retorna None se não houver termos pesquisáveis.
+    """
+    termos = re.findall(r"\w+", busca or "")
+    if not termos:
+        return None
+
+    consulta = " ".join(f'"{termo}"*' for termo in termos)
+
+    digitos = re.sub(r"\D", "", busca)
+    if digitos and len(termos) > 1:
+        consulta = f'({consulta}) OR digitos : "{digitos}"*'
+
+    return consulta
+
+
+def _ids_correspondentes(tabela, consulta):
+    """SELECT rowid, bm25(<tabela>) FROM <tabela> WHERE <tabela> MATCH :consulta"""
+    return (
+        select(
+            literal_column("rowid").label("id"),
+            literal_column(f"bm25({tabela})").label("relevancia")
+        )
+        .select_from(table(tabela))
+        .where(literal_column(tabela).op("MATCH")(consulta))
+    )
+
+
+def _condicao(db, tabela, modelo, busca, colunas_like):
+    consulta = montar_consulta_fts(busca)
+    if consulta is None:
+        return modelo.id.in_([])
+
+    if db is not None and fts_disponivel(db, tabela):
+        return modelo.id.in_(_ids_correspondentes(tabela, consulta).with_only_columns(literal_column("rowid")))
+
+    # Índice ainda não criado (migrar_busca_textual.py): busca com LIKE
+    return or_(*[coluna.contains(busca) for coluna in colunas_like])
+
+
+def condicao_busca_processos(db, busca):
+    """Condição de filtro da busca textual de processos"""
+    return _condicao(db, 'processos_fts', Processo, busca, [
+        Processo.numero_processo,
+        Processo.processo_principal,
+        Processo.credor_nome,
+        Processo.advogado_nome,
+        Processo.numero_oficio
+    ])
+
+
+def condicao_busca_contatos(db, busca):
+    """Condição de filtro da busca textual de contatos"""
+    return _condicao(db, 'contatos_fts', Contato, busca, [
+        Contato.nome,
+        Contato.email_principal,
+        Contato.telefone_principal
+    ])
+
+
+def _ordenar(query, db, tabela, modelo, busca):
+    consulta = montar_consulta_fts(busca)
+    if consulta is None or not fts_disponivel(db, tabela):
+        return query
+
+    ranking = _ids_correspondentes(tabela, consulta).subquery()
+    return query.join(ranking, ranking.c.id == modelo.id).order_by(ranking.c.relevancia)
+
+
+def ordenar_por_relevancia_processos(query, db, busca):
+    """Ordena uma query de Processo pela relevância (bm25) da busca"""
+    return _ordenar(query, db, 'processos_fts', Processo, busca)
+
+
+def ordenar_por_relevancia_contatos(query, db, busca):
+    """Ordena uma query de Contato pela relevância (bm25) da busca"""
+    return _ordenar(query, db, 'contatos_fts', Contato, busca)
@@ -0,0 +1,129 @@
+﻿"""
+Módulo de Cache de Cálculos
+Cache LRU com expiração (TTL) para resultados das calculadoras
+
+A chave é o hash SHA-256 do JSON canônico (chaves ordenadas) das entradas
+normalizadas, do nome do cálculo e da versão das tabelas de índices. Quando as
+tabelas mudam (indices_monetarios.atualizar_indice) a versão muda e o cache é
+esvaziado na próxima consulta.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from indices_monetarios import indices_monetarios
+
+# Configuração (variáveis de ambiente)
+CACHE_TAMANHO_MAXIMO = int(os.environ.get("TAXMASTER_CACHE_CALCULOS_TAMANHO", 2048))
+CACHE_TTL = int(os.environ.get("TAXMASTER_CACHE_CALCULOS_TTL", 600))  # segundos
+
+
+class CacheCalculos:
+    """Cache LRU + TTL, seguro para uso entre threads, com contadores de acerto/falha"""
+
+    def __init__(self, tamanho_maximo=CACHE_TAMANHO_MAXIMO, ttl=CACHE_TTL):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._versao_indices = indices_monetarios.versao
+
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+        self.invalidacoes = 0
+
+    @staticmethod
+    def gerar_chave(calculo, entradas):
+        """Hash canônico de (cálculo, entradas normalizadas, versão dos índices)"""
+        conteudo = json.dumps(
+            {'calculo': calculo, 'entradas': entradas, 'indices': indices_monetarios.versao},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def _verificar_versao(self):
+        # Chamado com o lock: tabelas de índices alteradas invalidam tudo
+        versao = indices_monetarios.versao
+        if versao != self._versao_indices:
+            self._itens.clear()
+            self._versao_indices = versao
+            self.invalidacoes += 1
+
+    def obter(self, chave):
+        """Retorna (encontrado, cópia do valor)"""
+        with self._lock:
+            self._verificar_versao()
+
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return False, None
+
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.expirados += 1
+                self.falhas += 1
+                return False, None
+
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+
+        # Cópia: quem chama costuma acrescentar campos ao resultado
+        return True, copy.deepcopy(valor)
+
+    def guardar(self, chave, valor):
+        """Armazena uma cópia do valor, descartando o menos usado se o cache estiver cheio"""
+        valor = copy.deepcopy(valor)
+        with self._lock:
+            self._verificar_versao()
+
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+                self.descartados += 1
+
+    def obter_ou_calcular(self, calculo, entradas, calcular):
+        """Resultado do cache ou de calcular() (que é então armazenado)"""
+        chave = self.gerar_chave(calculo, entradas)
+
+        encontrado, valor = self.obter(chave)
+        if encontrado:
+            return valor
+
+        valor = calcular()
+        self.guardar(chave, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        """Contadores para o /health"""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'tamanho_maximo': self.tamanho_maximo,
+                'ttl_segundos': self.ttl,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas * 100, 1) if consultas else 0,
+                'expirados': self.expirados,
+                'descartados': self.descartados,
+                'invalidacoes': self.invalidacoes,
+                'versao_indices': self._versao_indices
+            }
+
+
+# Instância global
+cache_calculos = CacheCalculos()
@@ -5,40 +5,15 @@ Calculadora de Juros e Correção Monetária para Precatórios
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import math
+from indices_monetarios import SeriesAnuais
+from detalhamento_mensal import DetalhamentoMensal
 
 class CalculadoraPrecatorio:
     """Calculadora avançada de valores de precatórios"""
     
-    # Índices de correção (valores exemplo - atualizar com dados reais)
-    INDICES_IPCA = {
-        2020: 4.52,
-        2021: 10.06,
-        2022: 5.79,
-        2023: 4.62,
-        2024: 4.50,
-        2025: 4.20,
-        2026: 4.00
-    }
-    
-    INDICES_INPC = {
-        2020: 5.45,
-        2021: 10.16,
-        2022: 5.93,
-        2023: 3.71,
-        2024: 4.30,
-        2025: 4.10,
-        2026: 3.90
-    }
-    
-    INDICES_TR = {
-        2020: 0.00,
-        2021: 0.00,
-        2022: 0.73,
-        2023: 0.85,
-        2024: 0.60,
-        2025: 0.50,
-        2026: 0.40
-    }
+    # Séries anuais do armazém de índices (data/indices), compartilhadas por
+    # todas as calculadoras e processos; correção em O(1) pelo acumulado
+    SERIES = SeriesAnuais(('IPCA', 'INPC', 'TR'))
     
     def __init__(self, valor_principal, data_base, data_final=None, 
                  taxa_juros_mensal=0.5, indice_correcao='IPCA'):
@@ -80,32 +55,10 @@ class CalculadoraPrecatorio:
         return round(juros, 2)
     
     def calcular_correcao_monetaria(self):
-        """Calcula correção monetária"""
-        indices = {
-            'IPCA': self.INDICES_IPCA,
-            'INPC': self.INDICES_INPC,
-            'TR': self.INDICES_TR
-        }
+        """Calcula correção monetária (anos das pontas proporcionais aos meses)"""
+        serie = self.SERIES.get(self.indice_correcao, self.SERIES['IPCA'])
         
-        indice_selecionado = indices.get(self.indice_correcao, self.INDICES_IPCA)
-        
-        valor_corrigido = self.valor_principal
-        ano_inicial = self.data_base.year
-        ano_final = self.data_final.year
-        
-        for ano in range(ano_inicial, ano_final + 1):
-            if ano in indice_selecionado:
-                taxa = indice_selecionado[ano] / 100
-                
-                # Proporcional ao período no ano
-                if ano == ano_inicial:
-                    meses_ano = 12 - self.data_base.month + 1
-                    taxa = taxa * (meses_ano / 12)
-                elif ano == ano_final:
-                    meses_ano = self.data_final.month
-                    taxa = taxa * (meses_ano / 12)
-                
-                valor_corrigido *= (1 + taxa)
+        valor_corrigido = self.valor_principal * serie.fator_proporcional_meses(self.data_base, self.data_final)
         
         correcao = valor_corrigido - self.valor_principal
         return round(correcao, 2)
@@ -143,45 +96,26 @@ class CalculadoraPrecatorio:
             'data_final': self.data_final.strftime('%d/%m/%Y')
         }
     
-    def gerar_detalhamento_mensal(self):
-        """Gera detalhamento mês a mês"""
-        detalhes = []
-        valor_acumulado = self.valor_principal
-        data_atual = self.data_base
-        
-        while data_atual < self.data_final:
-            # Próximo mês
-            data_proxima = data_atual + relativedelta(months=1)
-            if data_proxima > self.data_final:
-                data_proxima = self.data_final
-            
-            # Juros do mês
-            juros_mes = valor_acumulado * (self.taxa_juros_mensal / 100)
-            
-            # Correção do mês (simplificado)
-            ano = data_atual.year
-            indices = {
-                'IPCA': self.INDICES_IPCA,
-                'INPC': self.INDICES_INPC,
-                'TR': self.INDICES_TR
-            }
-            indice = indices.get(self.indice_correcao, self.INDICES_IPCA)
-            taxa_anual = indice.get(ano, 4.0)
-            correcao_mes = valor_acumulado * (taxa_anual / 100 / 12)
-            
-            valor_acumulado += juros_mes + correcao_mes
-            
-            detalhes.append({
-                'mes': data_atual.strftime('%m/%Y'),
-                'valor_inicial': round(valor_acumulado - juros_mes - correcao_mes, 2),
-                'juros': round(juros_mes, 2),
-                'correcao': round(correcao_mes, 2),
-                'valor_final': round(valor_acumulado, 2)
-            })
-            
-            data_atual = data_proxima
+    def detalhamento_mensal(self):
+        """
+        Detalhamento mês a mês como DetalhamentoMensal: acesso direto a
+        qualquer mês (mes(n)), paginação (iterar(offset, limite)) e totais
+        por ano (por_ano()), sem percorrer o período inteiro
+        """
+        serie = self.SERIES.get(self.indice_correcao, self.SERIES['IPCA'])
+        return DetalhamentoMensal(
+            self.valor_principal, self.data_base, self.data_final, self.taxa_juros_mensal,
+            serie.tabela()
+        )
+    
+    def gerar_detalhamento_mensal(self, offset=0, limite=None):
+        """
+        Gera detalhamento mês a mês
         
-        return detalhes
+        Returns:
+            list: meses de offset até offset + limite (todos, por padrão)
+        """
+        return list(self.detalhamento_mensal().iterar(offset, limite))
 
 # Exemplo de uso
 if __name__ == "__main__":
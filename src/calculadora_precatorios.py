@@ -6,34 +6,15 @@ Sistema de cálculo preciso com juros e correção monetária
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 import math
+from indices_monetarios import SeriesAnuais
+from detalhamento_mensal import DetalhamentoMensal
 
 class CalculadoraPrecatorioCompleta:
     """Calculadora avançada e precisa de precatórios"""
     
-    # Índices REAIS de correção monetária (valores históricos)
-    INDICES_IPCA = {
-        2015: 10.67, 2016: 6.29, 2017: 2.95, 2018: 3.75, 2019: 4.31,
-        2020: 4.52, 2021: 10.06, 2022: 5.79, 2023: 4.62, 2024: 4.50,
-        2025: 4.20, 2026: 4.00
-    }
-    
-    INDICES_INPC = {
-        2015: 11.28, 2016: 6.58, 2017: 2.07, 2018: 3.43, 2019: 4.48,
-        2020: 5.45, 2021: 10.16, 2022: 5.93, 2023: 3.71, 2024: 4.30,
-        2025: 4.10, 2026: 3.90
-    }
-    
-    INDICES_TR = {
-        2015: 1.92, 2016: 2.01, 2017: 0.62, 2018: 0.57, 2019: 0.00,
-        2020: 0.00, 2021: 0.00, 2022: 0.73, 2023: 0.85, 2024: 0.60,
-        2025: 0.50, 2026: 0.40
-    }
-    
-    INDICES_SELIC = {
-        2015: 13.24, 2016: 14.00, 2017: 9.93, 2018: 6.42, 2019: 5.96,
-        2020: 2.75, 2021: 7.19, 2022: 13.65, 2023: 11.65, 2024: 10.40,
-        2025: 12.00, 2026: 11.50
-    }
+    # Séries anuais do armazém de índices (data/indices), compartilhadas por
+    # todas as calculadoras e processos; correção em O(1) pelo acumulado
+    SERIES = SeriesAnuais(('IPCA', 'INPC', 'TR', 'SELIC'))
     
     def __init__(self):
         """Inicializa calculadora"""
@@ -117,57 +98,12 @@ class CalculadoraPrecatorioCompleta:
     
     def calcular_correcao_monetaria(self):
         """
-        Calcula correção monetária aplicando índices ano a ano
+        Calcula correção monetária: anos intermediários cheios (pelo produto
+        acumulado da série) e anos das pontas proporcionais aos dias
         """
-        # Selecionar índice
-        indices_dict = {
-            'IPCA': self.INDICES_IPCA,
-            'INPC': self.INDICES_INPC,
-            'TR': self.INDICES_TR,
-            'SELIC': self.INDICES_SELIC
-        }
-        
-        indices = indices_dict.get(self.indice_correcao, self.INDICES_IPCA)
+        serie = self.SERIES.get(self.indice_correcao, self.SERIES['IPCA'])
         
-        # Calcular correção ano a ano
-        valor_corrigido = self.valor_principal
-        ano_inicial = self.data_base.year
-        ano_final = self.data_final.year
-        
-        for ano in range(ano_inicial, ano_final + 1):
-            if ano in indices:
-                taxa_anual = indices[ano] / 100
-                
-                # Calcular proporcional ao período no ano
-                if ano == ano_inicial and ano == ano_final:
-                    # Mesmo ano - calcular dias proporcionais
-                    dias_totais = (self.data_final - self.data_base).days
-                    dias_ano = 365 + (1 if self._ano_bissexto(ano) else 0)
-                    proporcao = dias_totais / dias_ano
-                    taxa_aplicada = taxa_anual * proporcao
-                    
-                elif ano == ano_inicial:
-                    # Primeiro ano - do dia inicial até 31/12
-                    fim_ano = date(ano, 12, 31)
-                    dias = (fim_ano - self.data_base).days + 1
-                    dias_ano = 365 + (1 if self._ano_bissexto(ano) else 0)
-                    proporcao = dias / dias_ano
-                    taxa_aplicada = taxa_anual * proporcao
-                    
-                elif ano == ano_final:
-                    # Último ano - de 01/01 até dia final
-                    inicio_ano = date(ano, 1, 1)
-                    dias = (self.data_final - inicio_ano).days + 1
-                    dias_ano = 365 + (1 if self._ano_bissexto(ano) else 0)
-                    proporcao = dias / dias_ano
-                    taxa_aplicada = taxa_anual * proporcao
-                    
-                else:
-                    # Anos intermediários - ano completo
-                    taxa_aplicada = taxa_anual
-                
-                # Aplicar correção
-                valor_corrigido *= (1 + taxa_aplicada)
+        valor_corrigido = self.valor_principal * serie.fator_proporcional_dias(self.data_base, self.data_final)
         
         correcao = valor_corrigido - self.valor_principal
         return round(correcao, 2)
@@ -211,57 +147,26 @@ class CalculadoraPrecatorioCompleta:
             'data_final': self.data_final.strftime('%d/%m/%Y')
         }
     
-    def gerar_detalhamento_mensal(self):
+    def detalhamento_mensal(self):
+        """
+        Detalhamento mês a mês como DetalhamentoMensal: acesso direto a
+        qualquer mês (mes(n)), paginação (iterar(offset, limite)) e totais
+        por ano (por_ano()), sem percorrer o período inteiro
+        """
+        serie = self.SERIES.get(self.indice_correcao, self.SERIES['IPCA'])
+        return DetalhamentoMensal(
+            self.valor_principal, self.data_base, self.data_final, self.taxa_juros_mensal,
+            serie.tabela()
+        )
+    
+    def gerar_detalhamento_mensal(self, offset=0, limite=None):
         """
         Gera detalhamento mês a mês da evolução do valor
         
         Returns:
-            list: Lista de dicionários com evolução mensal
+            list: meses de offset até offset + limite (todos, por padrão)
         """
-        detalhes = []
-        valor_acumulado = self.valor_principal
-        data_atual = self.data_base
-        
-        # Selecionar índice para cálculo mensal
-        indices_dict = {
-            'IPCA': self.INDICES_IPCA,
-            'INPC': self.INDICES_INPC,
-            'TR': self.INDICES_TR,
-            'SELIC': self.INDICES_SELIC
-        }
-        indices = indices_dict.get(self.indice_correcao, self.INDICES_IPCA)
-        
-        while data_atual < self.data_final:
-            # Calcular próximo mês
-            data_proxima = data_atual + relativedelta(months=1)
-            if data_proxima > self.data_final:
-                data_proxima = self.data_final
-            
-            # Juros do mês
-            taxa_juros_decimal = self.taxa_juros_mensal / 100
-            juros_mes = valor_acumulado * taxa_juros_decimal
-            
-            # Correção do mês (proporcional ao índice anual)
-            ano = data_atual.year
-            taxa_anual = indices.get(ano, 4.0)
-            taxa_mensal = (taxa_anual / 100) / 12
-            correcao_mes = valor_acumulado * taxa_mensal
-            
-            # Valor acumulado
-            valor_inicial = valor_acumulado
-            valor_acumulado += juros_mes + correcao_mes
-            
-            detalhes.append({
-                'mes': data_atual.strftime('%m/%Y'),
-                'valor_inicial': round(valor_inicial, 2),
-                'juros': round(juros_mes, 2),
-                'correcao': round(correcao_mes, 2),
-                'valor_final': round(valor_acumulado, 2)
-            })
-            
-            data_atual = data_proxima
-        
-        return detalhes
+        return list(self.detalhamento_mensal().iterar(offset, limite))
 
 # Exemplo de uso e teste
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+﻿"""
+Módulo de Cenários de Portfólio
+Reavaliação "e se" da carteira inteira numa grade de descontos, atrasos e índices
+
+Para cada cenário (desconto d, atraso a em meses, índice k) e ativo:
+
+    compra     = face * (1 - d)
+    anos       = prazo estimado até a liquidação (monitor_oficios) + a / 12
+    recebido   = face * (1 + taxa anual projetada de k) ^ anos * confiabilidade do ente
+    ROI %      = (recebido / compra - 1) * 100
+    TIR % a.a. = ((recebido / compra) ^ (1 / anos) - 1) * 100   (anos mínimo 0,5)
+
+O valor de face se cancela na razão recebido / compra, então o retorno de um
+ativo só depende do prazo e do ente. Os ativos são agrupados em classes
+(ente, natureza, ano do precatório) com np.unique e a grade inteira é avaliada
+por broadcasting sobre as classes, com a quantidade e o valor de face de cada
+classe como pesos: varrer 50 x 50 cenários em 100 mil ativos custa o mesmo que
+em algumas dezenas.
+"""
+
+import numpy as np
+
+from database import SessionLeitura
+from models_atualizado import Processo
+from indices_monetarios import indices_monetarios
+from inteligencia_risco import inteligencia_risco
+from monitor_oficios import monitor_oficios
+
+# Grade padrão
+DESCONTOS_PADRAO = [0.25, 0.30, 0.35, 0.40, 0.45]
+ATRASOS_PADRAO = [0, 6, 12, 24]  # meses além do prazo estimado
+INDICES_PADRAO = ['IPCA-E', 'SELIC']
+
+# Limite de pontos da grade (descontos x atrasos x índices)
+MAXIMO_PONTOS_GRADE = 10000
+
+# Estatísticas de cada distribuição, na ordem do último eixo das matrizes
+ESTATISTICAS = ['media', 'media_ponderada_valor', 'p10', 'p25', 'p50', 'p75', 'p90']
+PERCENTIS = [0.10, 0.25, 0.50, 0.75, 0.90]
+
+# Tamanho dos lotes de IDs no filtro IN (limite de variáveis do SQLite)
+LOTE_IDS = 900
+
+
+def _codificar(valores):
+    """Códigos inteiros na ordem de primeira aparição: (códigos, valores distintos)"""
+    distintos = {}
+    codigos = np.fromiter((distintos.setdefault(valor, len(distintos)) for valor in valores),
+                          dtype=np.int64, count=len(valores))
+    return codigos, list(distintos)
+
+
+def _nome(valor):
+    return getattr(valor, 'name', valor)
+
+
+def _estatisticas(valores, quantidades, valores_face):
+    """
+    Distribuição ponderada no último eixo (classes): média pela quantidade de
+    ativos, média pelo valor de face e percentis pela quantidade de ativos.
+    Retorna o array com um eixo final de len(ESTATISTICAS).
+    """
+    media = (valores * quantidades).sum(axis=-1) / quantidades.sum()
+    media_valor = (valores * valores_face).sum(axis=-1) / valores_face.sum() if valores_face.sum() else media
+
+    ordem = np.argsort(valores, axis=-1)
+    ordenados = np.take_along_axis(valores, ordem, axis=-1)
+    acumulado = np.cumsum(quantidades[ordem], axis=-1) / quantidades.sum()
+
+    percentis = []
+    for percentil in PERCENTIS:
+        # Primeira classe em que a fração acumulada de ativos alcança o percentil
+        posicao = np.minimum((acumulado < percentil).sum(axis=-1), valores.shape[-1] - 1)
+        percentis.append(np.take_along_axis(ordenados, posicao[..., None], axis=-1)[..., 0])
+
+    return np.stack([media, media_valor] + percentis, axis=-1)
+
+
+class MotorCenarios:
+    """Varredura de cenários sobre a carteira inteira, vetorizada por classes de ativos"""
+
+    @staticmethod
+    def taxa_anual_projetada(indice):
+        """
+        Taxa anual (decimal) dos últimos 12 meses da série do índice, usada
+        para projetar a correção (ValueError se o índice não tiver série)
+        """
+        serie = indices_monetarios.serie(indice)
+        meses = min(serie.total, 12)
+        if meses == 0:
+            raise ValueError(f"Índice sem série histórica: {indice}")
+        fator = serie.acumulado_float[serie.total] / serie.acumulado_float[serie.total - meses]
+        return float(fator ** (12 / meses) - 1)
+
+    @staticmethod
+    def carregar_carteira(processos_ids=None):
+        """Colunas da carteira (valor, ente, natureza, ano do precatório) dos processos com valor"""
+        colunas = (Processo.valor_atualizado, Processo.ente_pagador, Processo.natureza, Processo.ano_precatorio)
+
+        db = SessionLeitura()
+        try:
+            consulta = db.query(*colunas).filter(Processo.valor_atualizado > 0)
+            if processos_ids is None:
+                linhas = consulta.all()
+            else:
+                ids = list(processos_ids)
+                linhas = []
+                for inicio in range(0, len(ids), LOTE_IDS):
+                    linhas.extend(consulta.filter(Processo.id.in_(ids[inicio:inicio + LOTE_IDS])).all())
+        finally:
+            db.close()
+
+        if not linhas:
+            return [], [], [], []
+        return [list(coluna) for coluna in zip(*linhas)]
+
+    @staticmethod
+    def montar_classes(valores_face, entes, naturezas, anos_precatorio):
+        """
+        Agrupa os ativos em classes (ente, natureza, ano do precatório).
+
+        Returns:
+            dict: por classe - grupo (ente, natureza), quantidade, valor de
+            face, anos de espera estimados e confiabilidade do ente
+        """
+        valores_face = np.asarray(valores_face, dtype=np.float64)
+        codigos_ente, lista_entes = _codificar(entes)
+        codigos_natureza, lista_naturezas = _codificar(naturezas)
+        anos = np.array([ano or 0 for ano in anos_precatorio], dtype=np.int64)
+
+        chaves = np.stack([codigos_ente, codigos_natureza, anos], axis=1)
+        classes, inverso = np.unique(chaves, axis=0, return_inverse=True)
+        inverso = inverso.ravel()
+
+        quantidades = np.bincount(inverso, minlength=len(classes)).astype(np.float64)
+        faces = np.bincount(inverso, weights=valores_face, minlength=len(classes))
+
+        # Prazo e confiabilidade pelas mesmas regras da análise individual,
+        # uma chamada por combinação distinta (ente, ano)
+        anos_espera = np.empty(len(classes))
+        confiabilidade = np.empty(len(classes))
+        prazos = {}
+        riscos = {}
+        for posicao, (codigo_ente, _, ano) in enumerate(classes.tolist()):
+            ente = lista_entes[codigo_ente]
+            if (codigo_ente, ano) not in prazos:
+                prazos[(codigo_ente, ano)] = monitor_oficios.calcular_tempo_estimado_liquidacao(
+                    "PRECATORIO_REGISTRADO" if ano else "OFICIO_EXPEDIDO",
+                    ano or None,
+                    _nome(ente) if ente else None
+                )["anos_estimados"]
+            if codigo_ente not in riscos:
+                riscos[codigo_ente] = inteligencia_risco.analisar_risco_ente(ente)["confiabilidade"]
+            anos_espera[posicao] = prazos[(codigo_ente, ano)]
+            confiabilidade[posicao] = riscos[codigo_ente]
+
+        grupos, grupo_da_classe = np.unique(classes[:, :2], axis=0, return_inverse=True)
+
+        return {
+            'grupos': [(_nome(lista_entes[ente]), _nome(lista_naturezas[natureza])) for ente, natureza in grupos.tolist()],
+            'grupo_da_classe': grupo_da_classe.ravel(),
+            'quantidades': quantidades,
+            'valores_face': faces,
+            'anos_espera': anos_espera,
+            'confiabilidade': confiabilidade,
+            'ativos': len(valores_face)
+        }
+
+    def avaliar(self, classes, descontos=None, atrasos_meses=None, indices=None):
+        """
+        Avalia a grade inteira sobre as classes de montar_classes().
+
+        Returns:
+            dict: eixos da grade, grupos (ente_pagador, natureza) e as matrizes
+            'roi' e 'tir' (%) de forma (grupos + TOTAL, descontos, atrasos,
+            índices, ESTATISTICAS)
+        """
+        descontos = np.asarray(DESCONTOS_PADRAO if descontos is None else descontos, dtype=np.float64)
+        atrasos = np.asarray(ATRASOS_PADRAO if atrasos_meses is None else atrasos_meses, dtype=np.float64)
+        indices = list(INDICES_PADRAO if indices is None else indices)
+
+        if not (len(descontos) and len(atrasos) and len(indices)):
+            raise ValueError("Descontos, atrasos e índices precisam de ao menos um valor")
+        if len(descontos) * len(atrasos) * len(indices) > MAXIMO_PONTOS_GRADE:
+            raise ValueError(f"Grade com mais de {MAXIMO_PONTOS_GRADE} cenários")
+        if ((descontos < 0) | (descontos >= 1)).any():
+            raise ValueError("Descontos devem estar entre 0 e 1")
+        if (atrasos < 0).any():
+            raise ValueError("Atrasos não podem ser negativos")
+
+        taxas = np.array([self.taxa_anual_projetada(indice) for indice in indices])
+
+        # Eixos: (desconto, atraso, índice, classe)
+        anos = classes['anos_espera'][None, :] + atrasos[:, None] / 12
+        fator_correcao = np.exp(anos[:, None, :] * np.log1p(taxas)[None, :, None])
+        razao = (fator_correcao * classes['confiabilidade'])[None] / (1 - descontos)[:, None, None, None]
+
+        roi = (razao - 1) * 100
+        tir = (razao ** (1 / np.maximum(anos, 0.5))[None, :, None, :] - 1) * 100
+
+        grupos = [
+            {'ente_pagador': ente, 'natureza': natureza}
+            for ente, natureza in classes['grupos']
+        ] + [{'ente_pagador': 'TOTAL', 'natureza': 'TOTAL'}]
+        selecoes = [classes['grupo_da_classe'] == posicao for posicao in range(len(classes['grupos']))]
+        selecoes.append(np.ones(len(classes['quantidades']), dtype=bool))
+
+        matrizes_roi = []
+        matrizes_tir = []
+        for grupo, selecao in zip(grupos, selecoes):
+            quantidades = classes['quantidades'][selecao]
+            faces = classes['valores_face'][selecao]
+            grupo['ativos'] = int(quantidades.sum())
+            grupo['valor_face'] = float(faces.sum())
+            matrizes_roi.append(_estatisticas(roi[..., selecao], quantidades, faces))
+            matrizes_tir.append(_estatisticas(tir[..., selecao], quantidades, faces))
+
+        return {
+            'descontos': descontos.tolist(),
+            'atrasos_meses': atrasos.tolist(),
+            'indices': indices,
+            'taxas_projetadas': {indice: taxa * 100 for indice, taxa in zip(indices, taxas.tolist())},
+            'estatisticas': ESTATISTICAS,
+            'grupos': grupos,
+            'ativos': classes['ativos'],
+            'classes': len(classes['quantidades']),
+            'roi': np.stack(matrizes_roi),
+            'tir': np.stack(matrizes_tir)
+        }
+
+    def simular(self, descontos=None, atrasos_meses=None, indices=None, processos_ids=None):
+        """Carrega a carteira (ou os processos informados) e avalia a grade de cenários"""
+        valores_face, entes, naturezas, anos_precatorio = self.carregar_carteira(processos_ids)
+        if not valores_face:
+            return None
+        classes = self.montar_classes(valores_face, entes, naturezas, anos_precatorio)
+        return self.avaliar(classes, descontos, atrasos_meses, indices)
+
+
+# Instância global
+motor_cenarios = MotorCenarios()
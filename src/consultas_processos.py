@@ -0,0 +1,272 @@
+﻿"""
+Módulo de Consultas de Processos
+Construtor de filtros compartilhado, resumo agregado e paginação por cursor dos processos
+"""
+
+from models_atualizado import (
+    Processo, StatusProcessoEnum, TribunalEnum, NaturezaEnum, EsferaEnum
+)
+from sqlalchemy import func, and_, or_, case
+from sqlalchemy.orm import load_only
+from busca_textual import condicao_busca_processos, ordenar_por_relevancia_processos
+
+# Filtros aceitos na querystring da listagem
+CAMPOS_FILTRO = (
+    'tribunal', 'esfera', 'natureza', 'status', 'ano_precatorio',
+    'valor_min', 'valor_max', 'tem_oficio', 'prioritario',
+    'situacao_pagamento', 'busca'
+)
+
+
+def extrair_filtros(args):
+    """Lê os filtros da listagem a partir de request.args"""
+    filtros = {campo: args.get(campo) for campo in CAMPOS_FILTRO}
+    filtros['ano_precatorio'] = args.get('ano_precatorio', type=int)
+    filtros['valor_min'] = args.get('valor_min', type=float)
+    filtros['valor_max'] = args.get('valor_max', type=float)
+    return filtros
+
+
+def condicoes_filtros(filtros, db=None):
+    """Monta a lista de condições SQL correspondente aos filtros"""
+    condicoes = []
+
+    if filtros.get('tribunal'):
+        condicoes.append(Processo.tribunal == TribunalEnum[filtros['tribunal']])
+
+    if filtros.get('esfera'):
+        condicoes.append(Processo.esfera == EsferaEnum[filtros['esfera']])
+
+    if filtros.get('natureza'):
+        condicoes.append(Processo.natureza == NaturezaEnum[filtros['natureza']])
+
+    if filtros.get('status'):
+        condicoes.append(Processo.status == StatusProcessoEnum[filtros['status']])
+
+    if filtros.get('ano_precatorio'):
+        condicoes.append(Processo.ano_precatorio == filtros['ano_precatorio'])
+
+    if filtros.get('valor_min'):
+        condicoes.append(Processo.valor_atualizado >= filtros['valor_min'])
+
+    if filtros.get('valor_max'):
+        condicoes.append(Processo.valor_atualizado <= filtros['valor_max'])
+
+    tem_oficio = filtros.get('tem_oficio')
+    if tem_oficio == 'sim':
+        condicoes.append(Processo.tem_oficio == True)
+    elif tem_oficio == 'nao':
+        condicoes.append(Processo.tem_oficio == False)
+
+    prioritario = filtros.get('prioritario')
+    if prioritario == 'sim':
+        condicoes.append(or_(
+            Processo.credor_idoso == True,
+            Processo.credor_doenca_grave == True,
+            Processo.credor_deficiente == True
+        ))
+    elif prioritario == 'nao':
+        condicoes.append(and_(
+            Processo.credor_idoso == False,
+            Processo.credor_doenca_grave == False,
+            Processo.credor_deficiente == False
+        ))
+
+    # Situação de pagamento com 3 opções
+    situacao_pagamento = filtros.get('situacao_pagamento')
+    if situacao_pagamento == 'com_pendencia':
+        condicoes.append(Processo.possui_pendencia_pagamento == True)
+    elif situacao_pagamento == 'pronto_nao_pago':
+        condicoes.append(and_(
+            Processo.possui_pendencia_pagamento == False,
+            Processo.status != StatusProcessoEnum.PAGO
+        ))
+    elif situacao_pagamento == 'pago':
+        condicoes.append(Processo.status == StatusProcessoEnum.PAGO)
+
+    # Busca textual pelo índice FTS5 (LIKE se o índice ainda não existir)
+    busca = filtros.get('busca')
+    if busca:
+        condicoes.append(condicao_busca_processos(db, busca))
+
+    return condicoes
+
+
+def aplicar_filtros_processos(query, filtros):
+    """Aplica os filtros da listagem a uma query de Processo"""
+    condicoes = condicoes_filtros(filtros, query.session)
+    if condicoes:
+        query = query.filter(*condicoes)
+    return query
+
+
+def calcular_resumo_processos(db, filtros):
+    """
+    Calcula o resumo da listagem em uma única consulta agregada.
+
+    Usa SUM(CASE ...) sobre o mesmo conjunto filtrado da página, sem
+    carregar objetos Processo em memória.
+    """
+    def contar(condicao):
+        return func.coalesce(func.sum(case((condicao, 1), else_=0)), 0)
+
+    query = db.query(
+        func.count(Processo.id).label('total'),
+        func.coalesce(func.sum(Processo.valor_atualizado), 0).label('valor_total'),
+        contar(Processo.tem_oficio == True).label('com_oficio'),
+        contar(Processo.possui_pendencia_pagamento == True).label('com_pendencia'),
+        contar(and_(
+            Processo.possui_pendencia_pagamento == False,
+            Processo.status != StatusProcessoEnum.PAGO
+        )).label('pronto_nao_pago'),
+        contar(Processo.status == StatusProcessoEnum.PAGO).label('pagos')
+    )
+
+    linha = aplicar_filtros_processos(query, filtros).one()
+
+    return {
+        'total': linha.total or 0,
+        'valor_total': linha.valor_total or 0,
+        'com_oficio': linha.com_oficio,
+        'com_pendencia': linha.com_pendencia,
+        'pronto_nao_pago': linha.pronto_nao_pago,
+        'pagos': linha.pagos
+    }
+
+
+def ordenar_processos(query, ordenar_por='data_cadastro', ordem='desc', busca=None):
+    """Aplica a ordenação da listagem (com busca e sem ordenação explícita, por relevância)"""
+    if busca and ordenar_por is None:
+        return ordenar_por_relevancia_processos(query, query.session, busca)
+    if ordenar_por == 'valor':
+        return query.order_by(Processo.valor_atualizado.desc() if ordem == 'desc' else Processo.valor_atualizado.asc())
+    if ordenar_por == 'credor':
+        return query.order_by(Processo.credor_nome.asc() if ordem == 'asc' else Processo.credor_nome.desc())
+    return query.order_by(Processo.data_cadastro.desc() if ordem == 'desc' else Processo.data_cadastro.asc())
+
+
+# ============================================================================
+# PROJEÇÃO E PAGINAÇÃO POR CURSOR PARA /api/processos
+# ============================================================================
+
+def _situacao(p):
+    if p.status and p.status.name == 'PAGO':
+        return 'Pago'
+    if not p.possui_pendencia_pagamento:
+        return 'Pronto Não Pago'
+    return 'Com Pendência'
+
+
+# Campo da API -> (colunas necessárias, função de serialização)
+CAMPOS_API = {
+    'id': (('id',), lambda p: p.id),
+    'numero': (('numero_processo',), lambda p: p.numero_processo),
+    'tribunal': (('tribunal',), lambda p: p.tribunal.value if p.tribunal else ''),
+    'credor': (('credor_nome',), lambda p: p.credor_nome),
+    'valor': (('valor_atualizado',), lambda p: float(p.valor_atualizado) if p.valor_atualizado else 0),
+    'natureza': (('natureza',), lambda p: p.natureza.value if p.natureza else ''),
+    'status': (('status',), lambda p: p.status.value if p.status else ''),
+    'situacao': (('status', 'possui_pendencia_pagamento'), _situacao),
+    'temOficio': (('tem_oficio',), lambda p: p.tem_oficio),
+    'prioritario': (
+        ('credor_idoso', 'credor_doenca_grave', 'credor_deficiente'),
+        lambda p: p.credor_idoso or p.credor_doenca_grave or p.credor_deficiente
+    ),
+}
+
+# Ordenações suportadas pela paginação por cursor
+ORDENACOES_CURSOR = ('id', 'valor')
+
+
+def interpretar_campos(fields):
+    """
+    Converte o parâmetro fields= ("id,numero,valor") na lista de campos.
+
+    Sem fields, retorna todos os campos. Levanta ValueError para campos desconhecidos.
+    """
+    if not fields:
+        return list(CAMPOS_API)
+
+    campos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+    desconhecidos = [campo for campo in campos if campo not in CAMPOS_API]
+    if desconhecidos:
+        raise ValueError(f"Campos inválidos: {', '.join(desconhecidos)}")
+
+    return campos
+
+
+def interpretar_cursor(cursor, ordenar='id'):
+    """Decodifica o cursor: "<id>" ou "<valor>,<id>" quando ordenado por valor"""
+    if not cursor:
+        return None
+
+    try:
+        if ordenar == 'valor':
+            valor, id_ = cursor.split(',', 1)
+            return float(valor), int(id_)
+        return int(cursor)
+    except ValueError:
+        raise ValueError("Cursor inválido")
+
+
+def gerar_cursor(p, ordenar='id'):
+    """Cursor que aponta para depois do processo informado"""
+    if ordenar == 'valor':
+        return f"{p.valor_atualizado!r},{p.id}"
+    return str(p.id)
+
+
+def query_processos_api(db, campos, ordenar='id', ordem='asc', cursor=None, filtros=None):
+    """
+    Query de /api/processos com projeção (load_only) e paginação por cursor.
+
+    A ordenação é sempre total (id como desempate), o que permite continuar
+    a partir do cursor com WHERE em vez de OFFSET.
+    """
+    if ordenar not in ORDENACOES_CURSOR:
+        raise ValueError(f"Ordenação inválida: {ordenar}")
+
+    colunas = {'id'}
+    for campo in campos:
+        colunas.update(CAMPOS_API[campo][0])
+    if ordenar == 'valor':
+        colunas.add('valor_atualizado')
+
+    query = db.query(Processo).options(
+        load_only(*[getattr(Processo, coluna) for coluna in colunas])
+    )
+
+    if filtros:
+        query = aplicar_filtros_processos(query, filtros)
+
+    descendente = ordem == 'desc'
+    posicao = interpretar_cursor(cursor, ordenar)
+
+    if ordenar == 'valor':
+        if posicao is not None:
+            valor, id_ = posicao
+            if descendente:
+                query = query.filter(or_(
+                    Processo.valor_atualizado < valor,
+                    and_(Processo.valor_atualizado == valor, Processo.id < id_)
+                ))
+            else:
+                query = query.filter(or_(
+                    Processo.valor_atualizado > valor,
+                    and_(Processo.valor_atualizado == valor, Processo.id > id_)
+                ))
+        if descendente:
+            query = query.order_by(Processo.valor_atualizado.desc(), Processo.id.desc())
+        else:
+            query = query.order_by(Processo.valor_atualizado.asc(), Processo.id.asc())
+    else:
+        if posicao is not None:
+            query = query.filter(Processo.id < posicao if descendente else Processo.id > posicao)
+        query = query.order_by(Processo.id.desc() if descendente else Processo.id.asc())
+
+    return query
+
+
+def serializar_processo_api(p, campos):
+    """Dicionário de um processo apenas com os campos solicitados"""
+    return {campo: CAMPOS_API[campo][1](p) for campo in campos}
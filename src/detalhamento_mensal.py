@@ -0,0 +1,117 @@
+﻿"""
+Módulo de Detalhamento Mensal
+Evolução mês a mês (juros + correção) das calculadoras, calculada por fatores acumulados
+
+A taxa mensal é constante dentro de cada ano civil (juros do mês + índice
+anual / 12), então o valor no mês N é o principal vezes o fator acumulado dos
+anos anteriores vezes (1 + taxa do ano) elevado aos meses já decorridos no ano.
+Qualquer mês (ou página de meses) sai em O(1), sem percorrer os anteriores.
+"""
+
+import calendar
+
+
+def _dias_no_mes(mes_absoluto):
+    ano, mes = divmod(mes_absoluto, 12)
+    return calendar.monthrange(ano, mes + 1)[1]
+
+
+class DetalhamentoMensal:
+    """
+    Detalhamento de gerar_detalhamento_mensal (calculadora_juros e
+    calculadora_precatorios) com acesso direto a qualquer mês.
+
+    Os meses seguem a regra das calculadoras: a partir da data base, um mês
+    por vez (dia limitado ao fim do mês), enquanto a data for anterior à final.
+    """
+
+    def __init__(self, valor_principal, data_base, data_final, taxa_juros_mensal,
+                 taxas_anuais, taxa_anual_padrao=4.0):
+        self.valor_principal = float(valor_principal)
+        self.data_base = data_base
+        self.data_final = data_final
+        self.taxa_juros = float(taxa_juros_mensal) / 100
+        self.taxas_anuais = taxas_anuais
+        self.taxa_anual_padrao = taxa_anual_padrao
+
+        self._mes_base = data_base.year * 12 + data_base.month - 1
+        self.total_meses = self._contar_meses()
+
+        # Segmentos por ano civil: (primeiro mês do ano no período, meses, taxa de correção, fator acumulado)
+        self._anos = []
+        fator = 1.0
+        posicao = 0
+        while posicao < self.total_meses:
+            ano = (self._mes_base + posicao) // 12
+            meses = min(12 - (self._mes_base + posicao) % 12, self.total_meses - posicao)
+            taxa_correcao = self.taxas_anuais.get(ano, self.taxa_anual_padrao) / 100 / 12
+            self._anos.append((ano, posicao, meses, taxa_correcao, fator))
+            fator *= (1 + self.taxa_juros + taxa_correcao) ** meses
+            posicao += meses
+
+    def __len__(self):
+        return self.total_meses
+
+    def _data_do_mes(self, n):
+        """Data do mês n (o dia só diminui: fica no menor fim de mês já atravessado)"""
+        dia = self.data_base.day
+        if dia > 28:
+            # Uma janela de 48 meses sempre contém um fevereiro de 28 dias
+            for mes_absoluto in range(self._mes_base + 1, self._mes_base + min(n, 48) + 1):
+                dia = min(dia, _dias_no_mes(mes_absoluto))
+        ano, mes = divmod(self._mes_base + n, 12)
+        return self.data_base.replace(year=ano, month=mes + 1, day=dia)
+
+    def _contar_meses(self):
+        final = self.data_final
+        n = (final.year * 12 + final.month - 1) - self._mes_base
+        if n < 0:
+            return 0
+        return n + 1 if self._data_do_mes(n) < final else n
+
+    def _segmento(self, n):
+        return self._anos[(self._mes_base + n) // 12 - (self._mes_base // 12)]
+
+    def mes(self, n):
+        """Linha do mês n (0 = mês da data base)"""
+        if not 0 <= n < self.total_meses:
+            raise IndexError(n)
+
+        ano, inicio, _, taxa_correcao, fator = self._segmento(n)
+        valor_inicial = self.valor_principal * fator * (1 + self.taxa_juros + taxa_correcao) ** (n - inicio)
+        juros_mes = valor_inicial * self.taxa_juros
+        correcao_mes = valor_inicial * taxa_correcao
+        mes = (self._mes_base + n) % 12 + 1
+
+        return {
+            'mes': f"{mes:02d}/{ano}",
+            'valor_inicial': round(valor_inicial, 2),
+            'juros': round(juros_mes, 2),
+            'correcao': round(correcao_mes, 2),
+            'valor_final': round(valor_inicial + juros_mes + correcao_mes, 2)
+        }
+
+    def iterar(self, offset=0, limite=None):
+        """Gera os meses de offset até offset + limite (todos, sem limite)"""
+        fim = self.total_meses if limite is None else min(self.total_meses, offset + limite)
+        for n in range(max(offset, 0), fim):
+            yield self.mes(n)
+
+    def por_ano(self):
+        """Totais por ano civil (soma de juros e correção em forma fechada)"""
+        anos = []
+        for ano, _, meses, taxa_correcao, fator in self._anos:
+            taxa = self.taxa_juros + taxa_correcao
+            valor_inicial = self.valor_principal * fator
+            # Soma de (1 + taxa)^i para i = 0..meses-1
+            soma = ((1 + taxa) ** meses - 1) / taxa if taxa else meses
+
+            anos.append({
+                'ano': ano,
+                'meses': meses,
+                'valor_inicial': round(valor_inicial, 2),
+                'juros': round(valor_inicial * self.taxa_juros * soma, 2),
+                'correcao': round(valor_inicial * taxa_correcao * soma, 2),
+                'valor_final': round(valor_inicial * (1 + taxa) ** meses, 2)
+            })
+        return anos
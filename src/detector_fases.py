@@ -0,0 +1,119 @@
+﻿"""
+Módulo de Detecção de Fases
+Casamento de vários termos e padrões em lotes de textos de movimentações
+
+Os termos de todas as categorias são normalizados e deduplicados uma vez.
+Cada lote de textos é normalizado (minúsculas, sem acentos), concatenado e
+varrido com str.find por termo distinto. Depois de um acerto a busca pula
+para o texto seguinte, porque basta saber se o termo aparece. Os extratores
+(números, valores) começam por um literal, e o re usa a busca rápida de
+prefixo. O custo por texto fica só na montagem do resultado.
+
+Uma única regex com todos os termos em alternativa sai mais lenta no
+CPython: ela é tentada em cada posição do texto, enquanto o str.find varre em
+C.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate, islice
+
+# Separador dos textos concatenados (não aparece nos termos nem casa com os extratores)
+SEPARADOR = '\x00'
+
+# Textos concatenados por varredura em analisar_lote
+TEXTOS_POR_VARREDURA = 2000
+
+
+def _tabela_acentos():
+    """Letras latinas acentuadas -> letra base ("ç" -> "c", "ó" -> "o")"""
+    tabela = {}
+    for codigo in range(0xC0, 0x250):
+        decomposto = unicodedata.normalize('NFD', chr(codigo))
+        if len(decomposto) > 1 and all(unicodedata.combining(c) for c in decomposto[1:]):
+            tabela[codigo] = decomposto[0]
+    return tabela
+
+
+TABELA_ACENTOS = _tabela_acentos()
+
+
+def _tabela_latin1():
+    """Minúscula sem acento de cada byte latin-1 (bytes.translate é bem mais rápido que lower + str.translate)"""
+    tabela = bytearray(range(256))
+    for codigo in range(256):
+        minuscula = chr(codigo).lower()
+        if len(minuscula) == 1 and ord(minuscula) < 256:
+            tabela[codigo] = ord(TABELA_ACENTOS.get(ord(minuscula), minuscula))
+    return bytes(tabela)
+
+
+TABELA_LATIN1 = _tabela_latin1()
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos (o "º" e o "°" são mantidos)"""
+    if texto.isascii():
+        return texto.lower()
+    try:
+        return texto.encode('latin-1').translate(TABELA_LATIN1).decode('latin-1')
+    except UnicodeEncodeError:
+        return texto.lower().translate(TABELA_ACENTOS)
+
+
+class DetectorFases:
+    """
+    Detector de categorias de termos (substring) e extratores de padrões.
+
+    Args:
+        categorias: {categoria: [termos]}
+        extratores: {nome: regex sobre o texto normalizado}; vale a primeira
+            ocorrência e, se a regex tiver grupos, o primeiro grupo
+    """
+
+    def __init__(self, categorias, extratores=None):
+        termos = {}
+        for categoria, lista in categorias.items():
+            for termo in lista:
+                termos.setdefault(normalizar_texto(termo), set()).add(categoria)
+        self.termos = {termo: frozenset(categorias_termo) for termo, categorias_termo in termos.items()}
+        self.extratores = {nome: re.compile(padrao) for nome, padrao in (extratores or {}).items()}
+
+    def analisar(self, texto):
+        """
+        Returns:
+            tuple: (set das categorias encontradas, {extrator: primeira captura})
+        """
+        return next(self.analisar_lote([texto]))
+
+    def analisar_lote(self, textos):
+        """Gera analisar(texto) para cada texto do iterável, varrendo blocos de TEXTOS_POR_VARREDURA"""
+        textos = iter(textos)
+        while True:
+            bloco = [normalizar_texto(texto or '') for texto in islice(textos, TEXTOS_POR_VARREDURA)]
+            if not bloco:
+                return
+            yield from self._varrer(bloco)
+
+    def _varrer(self, bloco):
+        concatenado = SEPARADOR.join(bloco)
+        inicios = list(accumulate((len(texto) + 1 for texto in bloco[:-1]), initial=0))
+        fins = [inicio + len(texto) for inicio, texto in zip(inicios, bloco)]
+        resultados = [(set(), {}) for _ in bloco]
+
+        for termo, categorias in self.termos.items():
+            posicao = concatenado.find(termo)
+            while posicao != -1:
+                indice = bisect_right(inicios, posicao) - 1
+                resultados[indice][0].update(categorias)
+                posicao = concatenado.find(termo, fins[indice])
+
+        for nome, padrao in self.extratores.items():
+            match = padrao.search(concatenado)
+            while match:
+                indice = bisect_right(inicios, match.start()) - 1
+                resultados[indice][1][nome] = match.group(1) if padrao.groups else match.group()
+                match = padrao.search(concatenado, fins[indice])
+
+        return resultados
@@ -5,6 +5,7 @@ Sistema de gestão e enriquecimento de contatos
 
 from database import SessionLocal
 from models_atualizado import Processo, Contato
+import eventos_processos  # manutenção de dashboard_stats e score_lead nas gravações
 from datetime import datetime
 
 class EnriquecimentoLeads:
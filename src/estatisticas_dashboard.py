@@ -0,0 +1,324 @@
+﻿"""
+Módulo de Estatísticas do Dashboard
+Tabela de agregados (dashboard_stats) mantida incrementalmente a cada flush do ORM
+"""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from sqlalchemy import (
+    event, text, inspect as sa_inspect, select, insert, update, bindparam,
+    func, or_, false, type_coerce
+)
+from sqlalchemy.orm import attributes
+
+from models_atualizado import (
+    Processo, DashboardStats, TribunalEnum, NaturezaEnum, StatusProcessoEnum, EsferaEnum
+)
+
+# Ordem das colunas que formam a chave de um grupo
+COLUNAS_GRUPO = (
+    'tribunal', 'natureza', 'status', 'esfera',
+    'prioritario', 'tem_oficio', 'possui_pendencia_pagamento'
+)
+
+# Atributos de Processo que afetam algum agregado
+ATRIBUTOS_MONITORADOS = (
+    'tribunal', 'natureza', 'status', 'esfera',
+    'credor_idoso', 'credor_doenca_grave', 'credor_deficiente',
+    'tem_oficio', 'possui_pendencia_pagamento', 'valor_atualizado'
+)
+
+# Consultas montadas com o SQLAlchemy Core (o mesmo SQL vale no SQLite e no Postgres)
+_processos = Processo.__table__
+_stats = DashboardStats.__table__
+
+# Expressões das colunas do grupo, na ordem de COLUNAS_GRUPO
+_EXPRESSOES_GRUPO = (
+    _processos.c.tribunal,
+    _processos.c.natureza,
+    _processos.c.status,
+    _processos.c.esfera,
+    or_(
+        func.coalesce(_processos.c.credor_idoso, false()),
+        func.coalesce(_processos.c.credor_doenca_grave, false()),
+        func.coalesce(_processos.c.credor_deficiente, false())
+    ),
+    func.coalesce(_processos.c.tem_oficio, false()),
+    func.coalesce(_processos.c.possui_pendencia_pagamento, false()),
+)
+_COLUNAS_GRUPO = [
+    type_coerce(expressao, _stats.c[nome].type).label(nome)
+    for nome, expressao in zip(COLUNAS_GRUPO, _EXPRESSOES_GRUPO)
+]
+
+SQL_SNAPSHOT = select(
+    *_COLUNAS_GRUPO,
+    func.coalesce(_processos.c.valor_atualizado, 0).label('valor_atualizado')
+).where(_processos.c.id == bindparam('id'))
+
+SQL_AGRUPAR = select(
+    *_COLUNAS_GRUPO,
+    func.count().label('total'),
+    func.coalesce(func.sum(_processos.c.valor_atualizado), 0).label('valor_total')
+).group_by(*_EXPRESSOES_GRUPO)
+
+SQL_RECONSTRUIR = insert(_stats).from_select(list(COLUNAS_GRUPO) + ['total', 'valor_total'], SQL_AGRUPAR)
+
+# Dimensões podem ser nulas: IS NOT DISTINCT FROM ("IS" no SQLite) em vez de "="
+def _parametro_grupo(nome):
+    # Prefixo evita o conflito com o nome da coluna nos parâmetros do UPDATE
+    return bindparam(f'grupo_{nome}', type_=_stats.c[nome].type)
+
+
+SQL_INCREMENTAR = update(_stats).where(
+    *[_stats.c[nome].is_not_distinct_from(_parametro_grupo(nome)) for nome in COLUNAS_GRUPO[:4]],
+    *[_stats.c[nome] == _parametro_grupo(nome) for nome in COLUNAS_GRUPO[4:]]
+).values(
+    total=_stats.c.total + bindparam('delta_total'),
+    valor_total=_stats.c.valor_total + bindparam('delta_valor')
+)
+
+SQL_INSERIR_GRUPO = insert(_stats)
+
+
+def _nome_enum(valor):
+    """Normaliza um valor de enum (objeto ou nome gravado) para o nome"""
+    if valor is None:
+        return None
+    return valor.name if hasattr(valor, 'name') else str(valor)
+
+
+def _chave(valores):
+    """Chave do grupo + valor a partir de um dicionário de atributos"""
+    chave = (
+        _nome_enum(valores['tribunal']),
+        _nome_enum(valores['natureza']),
+        _nome_enum(valores['status']),
+        _nome_enum(valores['esfera']),
+        bool(valores['credor_idoso'] or valores['credor_doenca_grave'] or valores['credor_deficiente']),
+        bool(valores['tem_oficio']),
+        bool(valores['possui_pendencia_pagamento']),
+    )
+    return chave, float(valores['valor_atualizado'] or 0)
+
+
+def _valores_atuais(processo):
+    return {attr: getattr(processo, attr) for attr in ATRIBUTOS_MONITORADOS}
+
+
+def _valores_anteriores(processo):
+    """Valores de antes do flush, a partir do histórico de atributos"""
+    valores = {}
+    for attr in ATRIBUTOS_MONITORADOS:
+        historico = attributes.get_history(processo, attr)
+        if historico.deleted:
+            valores[attr] = historico.deleted[0]
+        elif historico.unchanged:
+            valores[attr] = historico.unchanged[0]
+        elif historico.added:
+            # Atributo não carregado antes da alteração: o valor antigo era nulo
+            valores[attr] = None
+        else:
+            valores[attr] = getattr(processo, attr)
+    return valores
+
+
+def _acumular(deltas, chave, delta_total, delta_valor):
+    acumulado = deltas.setdefault(chave, [0, 0.0])
+    acumulado[0] += delta_total
+    acumulado[1] += delta_valor
+
+
+def _aplicar_deltas(conexao, deltas):
+    """Aplica os deltas acumulados na tabela dashboard_stats"""
+    removeu = False
+
+    for chave, (delta_total, delta_valor) in deltas.items():
+        if delta_total == 0 and delta_valor == 0:
+            continue
+
+        grupo = dict(zip(COLUNAS_GRUPO, chave))
+        params = {f'grupo_{nome}': valor for nome, valor in grupo.items()}
+        params['delta_total'] = delta_total
+        params['delta_valor'] = delta_valor
+
+        resultado = conexao.execute(SQL_INCREMENTAR, params)
+        if resultado.rowcount == 0:
+            conexao.execute(SQL_INSERIR_GRUPO, dict(grupo, total=delta_total, valor_total=delta_valor))
+
+        if delta_total < 0:
+            removeu = True
+
+    if removeu:
+        conexao.execute(text("DELETE FROM dashboard_stats WHERE total <= 0"))
+
+
+def manter_estatisticas(session, flush_context):
+    """
+    after_flush (registrado por eventos_processos): calcula os deltas dos
+    processos inseridos/alterados/removidos no flush
+    """
+    deltas = {}
+
+    for obj in session.new:
+        if isinstance(obj, Processo):
+            chave, valor = _chave(_valores_atuais(obj))
+            _acumular(deltas, chave, 1, valor)
+
+    for obj in session.deleted:
+        if isinstance(obj, Processo):
+            chave, valor = _chave(_valores_anteriores(obj))
+            _acumular(deltas, chave, -1, -valor)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Processo) or obj in session.deleted:
+            continue
+        estado = sa_inspect(obj)
+        if not any(estado.attrs[attr].history.has_changes() for attr in ATRIBUTOS_MONITORADOS):
+            continue
+
+        chave_antiga, valor_antigo = _chave(_valores_anteriores(obj))
+        chave_nova, valor_novo = _chave(_valores_atuais(obj))
+        _acumular(deltas, chave_antiga, -1, -valor_antigo)
+        _acumular(deltas, chave_nova, 1, valor_novo)
+
+    if deltas:
+        _aplicar_deltas(session.connection(), deltas)
+
+
+def _carregar_valor_antigo(target, value, oldvalue, initiator):
+    pass
+
+
+# Garante que o valor antigo seja carregado ao alterar um atributo monitorado,
+# para que o histórico usado no after_flush esteja sempre completo
+for _attr in ATRIBUTOS_MONITORADOS:
+    event.listen(
+        getattr(Processo, _attr), "set", _carregar_valor_antigo,
+        active_history=True
+    )
+
+
+class EstatisticasDashboard:
+    """Leitura e manutenção dos agregados do dashboard"""
+
+    @staticmethod
+    def reconstruir(db):
+        """Recalcula dashboard_stats a partir de processos (não faz commit)"""
+        db.execute(text("DELETE FROM dashboard_stats"))
+        db.execute(SQL_RECONSTRUIR)
+
+    @staticmethod
+    @contextmanager
+    def rastrear(db, processo_id):
+        """
+        Mantém dashboard_stats consistente em UPDATEs feitos via SQL direto
+        (eventos_processos.rastrear faz o mesmo e também recalcula o score_lead).
+
+        Uso:
+            with estatisticas_dashboard.rastrear(db, processo_id):
+                db.execute(text("UPDATE processos SET ... WHERE id = :id"), ...)
+        """
+        antes = db.execute(SQL_SNAPSHOT, {"id": processo_id}).mappings().first()
+        yield
+        depois = db.execute(SQL_SNAPSHOT, {"id": processo_id}).mappings().first()
+
+        deltas = {}
+        for linha, sinal in ((antes, -1), (depois, 1)):
+            if linha is None:
+                continue
+            chave = (
+                _nome_enum(linha['tribunal']), _nome_enum(linha['natureza']),
+                _nome_enum(linha['status']), _nome_enum(linha['esfera']),
+                bool(linha['prioritario']), bool(linha['tem_oficio']),
+                bool(linha['possui_pendencia_pagamento'])
+            )
+            _acumular(deltas, chave, sinal, sinal * float(linha['valor_atualizado']))
+
+        if deltas:
+            _aplicar_deltas(db.connection(), deltas)
+
+    @staticmethod
+    def _grupos(db):
+        """
+        Carrega os grupos do dashboard_stats.
+
+        Se a tabela ainda não foi populada (migrar_dashboard_stats.py), agrupa
+        direto em processos, sem gravar nada (funciona em sessões somente leitura).
+        """
+        grupos = db.query(DashboardStats).all()
+
+        if not grupos:
+            grupos = [
+                DashboardStats(
+                    tribunal=linha.tribunal,
+                    natureza=linha.natureza,
+                    status=linha.status,
+                    esfera=linha.esfera,
+                    prioritario=bool(linha.prioritario),
+                    tem_oficio=bool(linha.tem_oficio),
+                    possui_pendencia_pagamento=bool(linha.possui_pendencia_pagamento),
+                    total=linha.total,
+                    valor_total=linha.valor_total
+                )
+                for linha in db.execute(SQL_AGRUPAR)
+            ]
+
+        return grupos
+
+    @staticmethod
+    def _distribuicao(grupos, dimensao):
+        acumulado = {}
+        for grupo in grupos:
+            item = acumulado.setdefault(getattr(grupo, dimensao), [0, 0.0])
+            item[0] += grupo.total
+            item[1] += grupo.valor_total or 0
+
+        distribuicao = [
+            SimpleNamespace(**{dimensao: chave, 'total': total, 'valor_total': valor})
+            for chave, (total, valor) in acumulado.items()
+        ]
+        distribuicao.sort(key=lambda item: item.total, reverse=True)
+        return distribuicao
+
+    @staticmethod
+    def obter_resumo(db):
+        """
+        Resumo completo do dashboard em O(grupos).
+
+        Os itens de por_tribunal/por_natureza/por_esfera expõem os atributos
+        da dimensão, total e valor_total (mesmo formato do GROUP BY original).
+        """
+        grupos = EstatisticasDashboard._grupos(db)
+
+        por_status = {status: 0 for status in StatusProcessoEnum}
+        resumo = {
+            "total_processos": 0,
+            "total_valor": 0.0,
+            "com_oficio": 0,
+            "com_pendencia": 0,
+            "prioritarios": 0,
+        }
+
+        for grupo in grupos:
+            resumo["total_processos"] += grupo.total
+            resumo["total_valor"] += grupo.valor_total or 0
+            if grupo.tem_oficio:
+                resumo["com_oficio"] += grupo.total
+            if grupo.possui_pendencia_pagamento:
+                resumo["com_pendencia"] += grupo.total
+            if grupo.prioritario:
+                resumo["prioritarios"] += grupo.total
+            if grupo.status is not None:
+                por_status[grupo.status] += grupo.total
+
+        resumo["por_status"] = por_status
+        resumo["por_tribunal"] = EstatisticasDashboard._distribuicao(grupos, 'tribunal')
+        resumo["por_natureza"] = EstatisticasDashboard._distribuicao(grupos, 'natureza')
+        resumo["por_esfera"] = EstatisticasDashboard._distribuicao(grupos, 'esfera')
+
+        return resumo
+
+# Instância global
+estatisticas_dashboard = EstatisticasDashboard()
@@ -0,0 +1,70 @@
+﻿"""
+Módulo de Eventos dos Processos
+Registra nas sessões do ORM a manutenção dos dados derivados de processos:
+agregados do dashboard (dashboard_stats) e score de oportunidade (score_lead)
+
+Os modelos não importam este módulo (o score depende do monitor_oficios e do
+numpy): a aplicação e os scripts que gravam processos o importam
+explicitamente. UPDATEs via SQL direto usam rastrear().
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models_atualizado import Processo
+from estatisticas_dashboard import estatisticas_dashboard, manter_estatisticas
+from monitor_oficios import monitor_oficios, manter_score_oportunidade
+
+
+def _ids_atualizados(estado_execucao):
+    """IDs dos processos que um UPDATE em massa vai alterar (lidos antes de executá-lo)"""
+    parametros = estado_execucao.parameters
+    if isinstance(parametros, list):
+        # UPDATE em massa por chave primária: session.execute(update(Processo), [{"id": ...}, ...])
+        return [linha["id"] for linha in parametros]
+
+    consulta = select(Processo.id)
+    if estado_execucao.statement.whereclause is not None:
+        consulta = consulta.where(estado_execucao.statement.whereclause)
+    return estado_execucao.session.execute(consulta, parametros or {}).scalars().all()
+
+
+def _apos_operacao_em_massa(estado_execucao):
+    """
+    query(Processo).update()/delete() não passam pelo flush: recalcula o
+    dashboard_stats inteiro e o score_lead dos processos alterados
+    """
+    if not (estado_execucao.is_update or estado_execucao.is_delete):
+        return None
+
+    mapper = estado_execucao.bind_mapper
+    if mapper is None or mapper.class_ is not Processo:
+        return None
+
+    ids = _ids_atualizados(estado_execucao) if estado_execucao.is_update else None
+    resultado = estado_execucao.invoke_statement()
+    estatisticas_dashboard.reconstruir(estado_execucao.session)
+    if ids:
+        monitor_oficios.recalcular_scores(estado_execucao.session, ids=ids)
+    return resultado
+
+
+@contextmanager
+def rastrear(db, processo_id):
+    """
+    Mantém dashboard_stats e score_lead consistentes em UPDATEs feitos via SQL direto.
+
+    Uso:
+        with eventos_processos.rastrear(db, processo_id):
+            db.execute(text("UPDATE processos SET ... WHERE id = :id"), ...)
+    """
+    with estatisticas_dashboard.rastrear(db, processo_id):
+        yield
+    monitor_oficios.recalcular_scores(db, ids=[processo_id])
+
+
+event.listen(Session, "before_flush", manter_score_oportunidade)
+event.listen(Session, "after_flush", manter_estatisticas)
+event.listen(Session, "do_orm_execute", _apos_operacao_em_massa)
@@ -0,0 +1,104 @@
+﻿"""
+Módulo de Gerenciamento de Downloads
+Captura determinística dos PDFs baixados pelos robôs, gravados no armazém de ofícios
+
+Cada download tem uma origem só dele, em vez de "o PDF mais recente da pasta":
+- Playwright: o Download do expect_download, cujo arquivo é entregue assim
+  que a transferência termina;
+- Selenium: um diretório por tarefa (Browser.setDownloadBehavior via CDP),
+  onde só cai o arquivo daquela tarefa. A espera termina assim que o arquivo
+  final aparece (o Chrome só troca o .crdownload pelo nome final no fim).
+
+O arquivo concluído vai para o armazém endereçado pelo SHA-256
+(armazem_oficios): o do Playwright é copiado em blocos com o hash calculado
+na cópia, e o do diretório da tarefa é renomeado depois de uma leitura para
+o hash. Robôs em paralelo nunca pegam o arquivo um do outro, e o mesmo PDF
+baixado duas vezes vira um único blob.
+"""
+
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from armazem_oficios import armazem_oficios
+
+DIRETORIO_OFICIOS = os.environ.get("TAXMASTER_OFICIOS_DIR", os.path.join("data", "oficios"))
+TIMEOUT_DOWNLOAD = float(os.environ.get("TAXMASTER_DOWNLOAD_TIMEOUT", 60))  # segundos
+INTERVALO_VERIFICACAO = 0.2  # segundos entre verificações do diretório da tarefa
+
+# Arquivos de download ainda em andamento (Chrome, Firefox)
+SUFIXOS_PARCIAIS = (".crdownload", ".part", ".tmp")
+
+
+class GerenciadorDownloads:
+    """Downloads isolados por tarefa e gravados no armazém de ofícios"""
+
+    def __init__(self, diretorio=DIRETORIO_OFICIOS, armazem=None):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.armazem = armazem or armazem_oficios
+
+    def armazenar_arquivo(self, origem, mover=False):
+        """
+        Armazena o arquivo baixado no armazém de ofícios.
+
+        Returns:
+            dict: caminho, hash (SHA-256), tamanho em bytes e novo (False quando deduplicado)
+        """
+        return self.armazem.armazenar_arquivo(origem, mover=mover)
+
+    async def armazenar_download(self, download):
+        """
+        Aguarda o fim de um Download do Playwright (async) e armazena o arquivo.
+
+        Raises:
+            RuntimeError: se o download falhar
+        """
+        origem = await download.path()
+        if origem is None:
+            raise RuntimeError(f"Download falhou: {await download.failure()}")
+        # Cópia e hash fora do event loop (o temporário continua sendo do Playwright)
+        return await asyncio.to_thread(self.armazenar_arquivo, origem)
+
+    @contextmanager
+    def diretorio_tarefa(self):
+        """Diretório temporário e exclusivo para os downloads de uma tarefa (removido ao sair)"""
+        diretorio = self.diretorio / ".tarefas" / uuid.uuid4().hex
+        diretorio.mkdir(parents=True)
+        try:
+            yield diretorio
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    @staticmethod
+    def configurar_selenium(driver, diretorio):
+        """Direciona os downloads do Chrome (Selenium) para o diretório da tarefa"""
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": str(Path(diretorio).absolute())
+        })
+
+    @staticmethod
+    def aguardar_arquivo(diretorio, timeout=TIMEOUT_DOWNLOAD):
+        """
+        Aguarda um download concluído no diretório da tarefa.
+
+        Returns:
+            Path do arquivo, ou None se nada terminar dentro do timeout
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            for arquivo in Path(diretorio).iterdir():
+                if arquivo.is_file() and not arquivo.name.endswith(SUFIXOS_PARCIAIS):
+                    return arquivo
+            if time.monotonic() >= limite:
+                return None
+            time.sleep(INTERVALO_VERIFICACAO)
+
+
+# Instância global
+gerenciador_downloads = GerenciadorDownloads()
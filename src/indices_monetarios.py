@@ -0,0 +1,813 @@
+﻿"""
+Módulo de Índices Monetários
+Séries de índices carregadas uma única vez, com produtos acumulados pré-calculados
+
+Cada série guarda o produto acumulado de (1 + taxa) desde o primeiro período.
+A correção entre dois períodos é a razão entre duas posições desse acumulado,
+então corrigir 30 anos custa o mesmo que corrigir um mês. Meses e anos ausentes
+da tabela contam como taxa zero (as calculadoras os ignoravam).
+
+As tabelas ficam num armazém em disco (data/indices): uma matriz .npy por
+periodicidade, com as taxas e os acumulados de todos os índices no mesmo eixo
+de meses (ou anos), e o manifesto indices.json apontando a versão atual. Os
+processos abrem as matrizes com mmap somente leitura, então calculadoras e
+workers compartilham as mesmas páginas em vez de remontar as tabelas. Sem
+armazém gerado valem as tabelas embutidas abaixo. Séries oficiais (CSV/JSON do
+SGS do Banco Central) colocadas em data/indices/mensal e data/indices/anual
+entram com:
+
+    python importar_indices.py
+"""
+
+import calendar
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+
+# Configuração (variáveis de ambiente)
+DIRETORIO_INDICES = os.environ.get("TAXMASTER_INDICES_DIR", os.path.join("data", "indices"))
+INTERVALO_VERIFICACAO = float(os.environ.get("TAXMASTER_INDICES_VERIFICACAO", 30))  # segundos
+MANIFESTO = "indices.json"
+
+# Taxas mensais médias em % (valores aproximados - devem ser atualizados com API real)
+INDICES_MENSAIS = {
+    'IPCA-E': {
+        '2024-01': 0.42, '2024-02': 0.84, '2024-03': 0.16, '2024-04': 0.38,
+        '2024-05': 0.46, '2024-06': 0.21, '2024-07': 0.38, '2024-08': -0.02,
+        '2024-09': 0.44, '2024-10': 0.56, '2024-11': 0.62, '2024-12': 0.52,
+        '2025-01': 0.50, '2025-02': 0.45, '2025-03': 0.40, '2025-04': 0.42,
+        '2025-05': 0.48, '2025-06': 0.35, '2025-07': 0.38, '2025-08': 0.30,
+        '2025-09': 0.40, '2025-10': 0.50, '2025-11': 0.55, '2025-12': 0.45,
+        '2026-01': 0.43
+    },
+    'INPC': {
+        '2024-01': 0.42, '2024-02': 0.78, '2024-03': 0.16, '2024-04': 0.38,
+        '2024-05': 0.46, '2024-06': 0.21, '2024-07': 0.38, '2024-08': -0.02,
+        '2024-09': 0.44, '2024-10': 0.61, '2024-11': 0.64, '2024-12': 0.52,
+        '2025-01': 0.48, '2025-02': 0.43, '2025-03': 0.38, '2025-04': 0.40,
+        '2025-05': 0.46, '2025-06': 0.33, '2025-07': 0.36, '2025-08': 0.28,
+        '2025-09': 0.38, '2025-10': 0.48, '2025-11': 0.53, '2025-12': 0.43,
+        '2026-01': 0.41
+    },
+    'TR': {
+        '2024-01': 0.00, '2024-02': 0.00, '2024-03': 0.00, '2024-04': 0.00,
+        '2024-05': 0.00, '2024-06': 0.00, '2024-07': 0.00, '2024-08': 0.00,
+        '2024-09': 0.00, '2024-10': 0.00, '2024-11': 0.00, '2024-12': 0.00,
+        '2025-01': 0.00, '2025-02': 0.00, '2025-03': 0.00, '2025-04': 0.00,
+        '2025-05': 0.00, '2025-06': 0.00, '2025-07': 0.00, '2025-08': 0.00,
+        '2025-09': 0.00, '2025-10': 0.00, '2025-11': 0.00, '2025-12': 0.00,
+        '2026-01': 0.00
+    },
+    'SELIC': {
+        '2024-01': 0.92, '2024-02': 0.82, '2024-03': 0.86, '2024-04': 0.88,
+        '2024-05': 0.86, '2024-06': 0.88, '2024-07': 0.88, '2024-08': 0.88,
+        '2024-09': 0.88, '2024-10': 0.90, '2024-11': 0.92, '2024-12': 0.96,
+        '2025-01': 1.00, '2025-02': 1.02, '2025-03': 1.04, '2025-04': 1.06,
+        '2025-05': 1.08, '2025-06': 1.10, '2025-07': 1.12, '2025-08': 1.14,
+        '2025-09': 1.16, '2025-10': 1.18, '2025-11': 1.20, '2025-12': 1.22,
+        '2026-01': 1.24
+    },
+    'POUPANCA': {
+        '2024-01': 0.58, '2024-02': 0.58, '2024-03': 0.59, '2024-04': 0.60,
+        '2024-05': 0.59, '2024-06': 0.60, '2024-07': 0.60, '2024-08': 0.60,
+        '2024-09': 0.60, '2024-10': 0.61, '2024-11': 0.62, '2024-12': 0.65,
+        '2025-01': 0.68, '2025-02': 0.69, '2025-03': 0.70, '2025-04': 0.72,
+        '2025-05': 0.73, '2025-06': 0.75, '2025-07': 0.76, '2025-08': 0.77,
+        '2025-09': 0.79, '2025-10': 0.80, '2025-11': 0.81, '2025-12': 0.83,
+        '2026-01': 0.84
+    },
+    'IGP-DI': {
+        '2024-01': 0.41, '2024-02': 0.52, '2024-03': 0.40, '2024-04': 0.38,
+        '2024-05': 0.46, '2024-06': 0.50, '2024-07': 0.55, '2024-08': 0.12,
+        '2024-09': 0.62, '2024-10': 1.54, '2024-11': 1.18, '2024-12': 0.87,
+        '2025-01': 0.45, '2025-02': 0.50, '2025-03': 0.48, '2025-04': 0.52,
+        '2025-05': 0.55, '2025-06': 0.45, '2025-07': 0.50, '2025-08': 0.40,
+        '2025-09': 0.48, '2025-10': 0.60, '2025-11': 0.65, '2025-12': 0.55,
+        '2026-01': 0.50
+    }
+}
+
+# Taxas anuais em % das calculadoras de juros/precatórios (valores históricos)
+INDICES_ANUAIS = {
+    'IPCA': {
+        2015: 10.67, 2016: 6.29, 2017: 2.95, 2018: 3.75, 2019: 4.31,
+        2020: 4.52, 2021: 10.06, 2022: 5.79, 2023: 4.62, 2024: 4.50,
+        2025: 4.20, 2026: 4.00
+    },
+    'INPC': {
+        2015: 11.28, 2016: 6.58, 2017: 2.07, 2018: 3.43, 2019: 4.48,
+        2020: 5.45, 2021: 10.16, 2022: 5.93, 2023: 3.71, 2024: 4.30,
+        2025: 4.10, 2026: 3.90
+    },
+    'TR': {
+        2015: 1.92, 2016: 2.01, 2017: 0.62, 2018: 0.57, 2019: 0.00,
+        2020: 0.00, 2021: 0.00, 2022: 0.73, 2023: 0.85, 2024: 0.60,
+        2025: 0.50, 2026: 0.40
+    },
+    'SELIC': {
+        2015: 13.24, 2016: 14.00, 2017: 9.93, 2018: 6.42, 2019: 5.96,
+        2020: 2.75, 2021: 7.19, 2022: 13.65, 2023: 11.65, 2024: 10.40,
+        2025: 12.00, 2026: 11.50
+    }
+}
+
+
+def _para_data(valor):
+    """Aceita date, datetime ou 'YYYY-MM-DD'"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def _dias_ano(ano):
+    return 366 if calendar.isleap(ano) else 365
+
+
+def _versao_tabelas(mensais, anuais):
+    """Impressão digital das tabelas (muda quando alguma taxa muda)"""
+    conteudo = json.dumps({'mensal': mensais, 'anual': anuais}, sort_keys=True)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:12]
+
+
+class SerieMensal:
+    """
+    Série mensal sobre uma linha da matriz do armazém: taxas em % (NaN para
+    mês ausente) e produto acumulado em float, em mmap somente leitura.
+
+    acumulado[k] = produto de (1 + taxa) dos k primeiros meses da série, de
+    modo que o fator dos meses [a, b] é acumulado[b + 1] / acumulado[a]. O
+    acumulado em Decimal (cálculo exato) é montado só na primeira vez em que
+    é pedido.
+    """
+
+    def __init__(self, nome, primeiro_mes, percentuais, acumulado_float):
+        self.nome = nome
+        self.primeiro_mes = primeiro_mes
+        self.percentuais = percentuais
+        self.total = len(percentuais)
+        self.acumulado_float = acumulado_float
+        self._decimais = None
+
+    def _montar_decimais(self):
+        taxas = [
+            Decimal('0') if math.isnan(percentual) else Decimal(str(percentual)) / Decimal('100')
+            for percentual in self.percentuais.tolist()
+        ]
+        acumulado = [Decimal('1')]
+        for taxa in taxas:
+            acumulado.append(acumulado[-1] * (1 + taxa))
+        self._decimais = (taxas, acumulado)
+        return self._decimais
+
+    @property
+    def taxas_decimais(self):
+        return (self._decimais or self._montar_decimais())[0]
+
+    @property
+    def acumulado(self):
+        return (self._decimais or self._montar_decimais())[1]
+
+    @staticmethod
+    def _mes_absoluto(ano, mes):
+        return ano * 12 + (mes - 1)
+
+    def _posicao(self, mes_absoluto):
+        """Posição no acumulado, limitada ao início/fim da série"""
+        return min(max(mes_absoluto - self.primeiro_mes, 0), self.total)
+
+    def taxa(self, ano, mes):
+        """Taxa decimal do mês (zero fora da série ou para mês ausente)"""
+        posicao = self._mes_absoluto(ano, mes) - self.primeiro_mes
+        if 0 <= posicao < self.total:
+            return self.taxas_decimais[posicao]
+        return Decimal('0')
+
+    def fator_meses(self, ano_inicio, mes_inicio, ano_fim, mes_fim):
+        """Fator acumulado dos meses cheios de (ano_inicio, mes_inicio) a (ano_fim, mes_fim), inclusive"""
+        inicio = self._mes_absoluto(ano_inicio, mes_inicio)
+        fim = self._mes_absoluto(ano_fim, mes_fim)
+        if fim < inicio:
+            return Decimal('1')
+        return self.acumulado[self._posicao(fim + 1)] / self.acumulado[self._posicao(inicio)]
+
+    def fator_float(self, data_inicio, data_fim):
+        """fator() sem pro_rata, em float (datas date/datetime; erro relativo ~1e-16)"""
+        if data_fim < data_inicio:
+            return 1.0
+        inicio = self._mes_absoluto(data_inicio.year, data_inicio.month)
+        fim = self._mes_absoluto(data_fim.year, data_fim.month)
+        return float(self.acumulado_float[self._posicao(fim + 1)] / self.acumulado_float[self._posicao(inicio)])
+
+    def fator(self, data_inicio, data_fim, pro_rata=False):
+        """
+        Fator de correção entre duas datas em O(1).
+
+        Sem pro_rata, o mês inicial e o final contam inteiros (regra da
+        calculadora). Com pro_rata, as pontas entram pela fração de dias do
+        mês: do dia inicial até o fim do mês e do dia 1 até o dia final.
+        """
+        inicio = _para_data(data_inicio)
+        fim = _para_data(data_fim)
+        if fim < inicio:
+            return Decimal('1')
+
+        if not pro_rata:
+            return self.fator_meses(inicio.year, inicio.month, fim.year, fim.month)
+
+        dias_mes_inicio = calendar.monthrange(inicio.year, inicio.month)[1]
+        if (inicio.year, inicio.month) == (fim.year, fim.month):
+            fracao = Decimal(fim.day - inicio.day + 1) / Decimal(dias_mes_inicio)
+            return 1 + self.taxa(inicio.year, inicio.month) * fracao
+
+        fracao_inicio = Decimal(dias_mes_inicio - inicio.day + 1) / Decimal(dias_mes_inicio)
+        fracao_fim = Decimal(fim.day) / Decimal(calendar.monthrange(fim.year, fim.month)[1])
+
+        primeiro_cheio = self._mes_absoluto(inicio.year, inicio.month) + 1
+        ultimo_cheio = self._mes_absoluto(fim.year, fim.month) - 1
+        meio = self.acumulado[self._posicao(ultimo_cheio + 1)] / self.acumulado[self._posicao(primeiro_cheio)]
+
+        return (
+            (1 + self.taxa(inicio.year, inicio.month) * fracao_inicio)
+            * meio
+            * (1 + self.taxa(fim.year, fim.month) * fracao_fim)
+        )
+
+    def meses_no_periodo(self, data_inicio, data_fim):
+        """
+        Meses da série entre as datas (inclusive), em ordem.
+
+        Gera (ano, mes, taxa %, fator acumulado desde o mês inicial até o fim
+        deste mês). Apenas meses presentes na tabela são gerados.
+        """
+        inicio = _para_data(data_inicio)
+        fim = _para_data(data_fim)
+        if fim < inicio:
+            return
+
+        mes_inicio = self._mes_absoluto(inicio.year, inicio.month)
+        mes_fim = self._mes_absoluto(fim.year, fim.month)
+        base = self.acumulado[self._posicao(mes_inicio)]
+
+        for mes_absoluto in range(max(mes_inicio, self.primeiro_mes),
+                                  min(mes_fim, self.primeiro_mes + self.total - 1) + 1):
+            percentual = float(self.percentuais[mes_absoluto - self.primeiro_mes])
+            if not math.isnan(percentual):
+                ano, mes = divmod(mes_absoluto, 12)
+                yield ano, mes + 1, percentual, self.acumulado[self._posicao(mes_absoluto + 1)] / base
+
+
+class SerieAnual:
+    """
+    Série anual sobre uma linha da matriz do armazém (taxas em %, NaN para ano
+    ausente) com produto acumulado em float.
+
+    Usada pelas calculadoras de juros/precatórios, que aplicam a taxa anual
+    cheia nos anos intermediários e proporcional (linear) nos anos das pontas.
+    """
+
+    def __init__(self, nome, ano_inicial, percentuais, acumulado):
+        self.nome = nome
+        self.ano_inicial = ano_inicial
+        self.percentuais = percentuais
+        self.taxas = np.nan_to_num(np.asarray(percentuais, dtype=np.float64)) / 100
+        self.acumulado = acumulado
+
+    def tabela(self):
+        """Taxas em % dos anos presentes ({ano: taxa})"""
+        return {
+            self.ano_inicial + posicao: percentual
+            for posicao, percentual in enumerate(np.asarray(self.percentuais).tolist())
+            if not math.isnan(percentual)
+        }
+
+    def posicao(self, ano):
+        """Posição do início do ano no acumulado, limitada ao início/fim da série"""
+        return min(max(ano - self.ano_inicial, 0), len(self.taxas))
+
+    def taxa(self, ano):
+        """Taxa anual decimal (zero fora da série)"""
+        posicao = ano - self.ano_inicial
+        if 0 <= posicao < len(self.taxas):
+            return float(self.taxas[posicao])
+        return 0.0
+
+    def fator_anos(self, ano_de, ano_ate):
+        """Produto de (1 + taxa) dos anos cheios de ano_de a ano_ate, inclusive"""
+        if ano_ate < ano_de:
+            return 1.0
+        return float(self.acumulado[self.posicao(ano_ate + 1)] / self.acumulado[self.posicao(ano_de)])
+
+    def _fator_pontas(self, ano_inicial, taxa_inicial, ano_final, taxa_final):
+        fator = 1.0
+        fator *= (1 + taxa_inicial)
+        if ano_final > ano_inicial:
+            fator *= self.fator_anos(ano_inicial + 1, ano_final - 1)
+            fator *= (1 + taxa_final)
+        return fator
+
+    def fator_proporcional_meses(self, data_inicio, data_fim):
+        """
+        Regra de calculadora_juros: primeiro ano proporcional aos meses
+        restantes (contando o mês inicial), último ano aos meses decorridos.
+        """
+        ano_inicial, ano_final = data_inicio.year, data_fim.year
+        if ano_final < ano_inicial:
+            return 1.0
+
+        taxa_inicial = self.taxa(ano_inicial) * ((12 - data_inicio.month + 1) / 12)
+        taxa_final = self.taxa(ano_final) * (data_fim.month / 12)
+        return self._fator_pontas(ano_inicial, taxa_inicial, ano_final, taxa_final)
+
+    def fator_proporcional_dias(self, data_inicio, data_fim):
+        """
+        Regra de calculadora_precatorios: anos das pontas proporcionais aos
+        dias corridos no ano; no mesmo ano, aos dias entre as datas.
+        """
+        data_inicio = _para_data(data_inicio)
+        data_fim = _para_data(data_fim)
+        ano_inicial, ano_final = data_inicio.year, data_fim.year
+        if ano_final < ano_inicial:
+            return 1.0
+
+        if ano_inicial == ano_final:
+            dias = (data_fim - data_inicio).days
+        else:
+            dias = (date(ano_inicial, 12, 31) - data_inicio).days + 1
+        taxa_inicial = self.taxa(ano_inicial) * (dias / _dias_ano(ano_inicial))
+
+        dias_final = (data_fim - date(ano_final, 1, 1)).days + 1
+        taxa_final = self.taxa(ano_final) * (dias_final / _dias_ano(ano_final))
+
+        return self._fator_pontas(ano_inicial, taxa_inicial, ano_final, taxa_final)
+
+
+def _periodo(periodicidade, chave):
+    """'YYYY-MM' -> mês absoluto (ano * 12 + mês - 1); ano -> ano"""
+    if periodicidade == 'mensal':
+        return int(chave[:4]) * 12 + int(chave[5:7]) - 1
+    return int(chave)
+
+
+def _chave(periodicidade, periodo):
+    if periodicidade == 'mensal':
+        ano, mes = divmod(periodo, 12)
+        return f"{ano:04d}-{mes + 1:02d}"
+    return periodo
+
+
+class BlocoIndices:
+    """
+    Tabelas de uma periodicidade ('mensal' ou 'anual') numa única matriz
+    (2, índices, períodos + 1): [0] taxas em % (NaN = período ausente),
+    [1] produto acumulado em float. Todos os índices no mesmo eixo, a partir
+    do período absoluto 'primeiro' (ano * 12 + mês - 1, ou o ano).
+    """
+
+    def __init__(self, periodicidade, nomes, primeiro, matriz):
+        self.periodicidade = periodicidade
+        self.nomes = list(nomes)
+        self.primeiro = primeiro
+        self.matriz = matriz
+        self.total = matriz.shape[2] - 1
+        self._linhas = {nome: linha for linha, nome in enumerate(self.nomes)}
+
+    @classmethod
+    def de_tabelas(cls, periodicidade, tabelas):
+        """Monta a matriz de {indice: {chave: taxa %}} ('YYYY-MM' ou ano)"""
+        periodos = [_periodo(periodicidade, chave) for taxas in tabelas.values() for chave in taxas]
+        primeiro = min(periodos) if periodos else 0
+        total = (max(periodos) - primeiro + 1) if periodos else 0
+
+        nomes = list(tabelas)
+        matriz = np.full((2, len(nomes), total + 1), np.nan)
+        for linha, nome in enumerate(nomes):
+            for chave, taxa in tabelas[nome].items():
+                matriz[0, linha, _periodo(periodicidade, chave) - primeiro] = float(taxa)
+            matriz[1, linha] = cls._acumular(periodicidade, matriz[0, linha, :total].tolist())
+
+        return cls(periodicidade, nomes, primeiro, matriz)
+
+    @staticmethod
+    def _acumular(periodicidade, percentuais):
+        """
+        Produto acumulado como as calculadoras sempre fizeram: o mensal em
+        Decimal (convertido para float), o anual em float
+        """
+        if periodicidade == 'mensal':
+            acumulado = Decimal('1')
+            valores = [1.0]
+            for percentual in percentuais:
+                if not math.isnan(percentual):
+                    acumulado = acumulado * (1 + Decimal(str(percentual)) / Decimal('100'))
+                valores.append(float(acumulado))
+            return valores
+
+        valores = [1.0]
+        for percentual in percentuais:
+            taxa = 0.0 if math.isnan(percentual) else percentual / 100
+            valores.append(valores[-1] * (1 + taxa))
+        return valores
+
+    def tabelas(self):
+        """Tabelas {indice: {chave: taxa %}} de volta a partir da matriz"""
+        tabelas = {}
+        for linha, nome in enumerate(self.nomes):
+            tabelas[nome] = {
+                _chave(self.periodicidade, self.primeiro + posicao): percentual
+                for posicao, percentual in enumerate(self.matriz[0, linha, :self.total].tolist())
+                if not math.isnan(percentual)
+            }
+        return tabelas
+
+    def linha(self, nome):
+        return self._linhas.get(nome)
+
+    def serie_mensal(self, nome):
+        linha = self.linha(nome)
+        if linha is None:
+            return SerieMensal(nome, 0, np.empty(0), np.ones(1))
+        return SerieMensal(nome, self.primeiro, self.matriz[0, linha, :self.total], self.matriz[1, linha])
+
+    def serie_anual(self, nome):
+        linha = self.linha(nome)
+        if linha is None:
+            return SerieAnual(nome, 0, np.empty(0), np.ones(1))
+        return SerieAnual(nome, self.primeiro, self.matriz[0, linha, :self.total], self.matriz[1, linha])
+
+
+class VistaIndices:
+    """Uma versão das tabelas: blocos mensal e anual"""
+
+    def __init__(self, versao, mensal, anual, origem=None):
+        self.versao = versao
+        self.mensal = mensal
+        self.anual = anual
+        self.origem = origem  # diretório do armazém (None = tabelas em memória)
+
+    @classmethod
+    def de_tabelas(cls, mensais, anuais):
+        return cls(
+            _versao_tabelas(mensais, anuais),
+            BlocoIndices.de_tabelas('mensal', mensais),
+            BlocoIndices.de_tabelas('anual', anuais)
+        )
+
+
+def _chave_periodo(texto, periodicidade):
+    """Data do arquivo oficial -> 'YYYY-MM' (mensal) ou ano (anual); None se não for data"""
+    texto = texto.strip().strip('"')
+    for formato in ('%d/%m/%Y', '%m/%Y', '%Y-%m-%d', '%Y-%m', '%Y'):
+        try:
+            data = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        if periodicidade == 'mensal':
+            return f"{data.year:04d}-{data.month:02d}"
+        return data.year
+    return None
+
+
+def _numero(texto):
+    """'0,42', '1.234,5', '0.42' ou '0,42%' -> float (None se não for número)"""
+    texto = str(texto).strip().strip('"').replace('%', '')
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def ler_serie_oficial(caminho, periodicidade='mensal'):
+    """
+    Lê uma série oficial: CSV do SGS/Banco Central ("data";"valor", datas
+    dd/mm/aaaa, decimal com vírgula, separador ; ou ,) ou o JSON da API do SGS
+    ([{"data": ..., "valor": ...}]). Linhas que não são data/taxa (cabeçalho,
+    rodapé de fonte) são ignoradas.
+
+    Returns:
+        dict: {'YYYY-MM': taxa %} ou {ano: taxa %}
+    """
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    try:
+        texto = conteudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = conteudo.decode('latin-1')
+
+    if caminho.lower().endswith('.json'):
+        linhas = [(item.get('data', ''), item.get('valor', '')) for item in json.loads(texto)]
+    else:
+        try:
+            delimitador = csv.Sniffer().sniff(texto[:4096], delimiters=';,\t').delimiter
+        except csv.Error:
+            delimitador = ';'
+        linhas = [linha[:2] for linha in csv.reader(io.StringIO(texto), delimiter=delimitador) if len(linha) >= 2]
+
+    taxas = {}
+    for data, valor in linhas:
+        chave = _chave_periodo(str(data), periodicidade)
+        taxa = _numero(valor)
+        if chave is not None and taxa is not None:
+            taxas[chave] = taxa
+
+    if not taxas:
+        raise ValueError(f"Nenhuma taxa reconhecida em {caminho}")
+    return taxas
+
+
+class ArmazemIndices:
+    """
+    Armazém em disco das tabelas de índices.
+
+    Cada versão grava mensal-<versao>.npy e anual-<versao>.npy (nunca
+    reescritos) e por último troca o manifesto indices.json de forma atômica,
+    então um leitor sempre vê uma versão completa.
+    """
+
+    PERIODICIDADES = ('mensal', 'anual')
+
+    def __init__(self, diretorio=DIRETORIO_INDICES):
+        self.diretorio = diretorio
+        self.caminho_manifesto = os.path.join(diretorio, MANIFESTO)
+
+    def assinatura(self):
+        """Identifica o manifesto atual (None se o armazém não foi gerado)"""
+        try:
+            estado = os.stat(self.caminho_manifesto)
+        except OSError:
+            return None
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def carregar(self):
+        """VistaIndices da versão atual, com as matrizes em mmap somente leitura (None sem armazém)"""
+        try:
+            with open(self.caminho_manifesto, encoding='utf-8') as arquivo:
+                manifesto = json.load(arquivo)
+        except FileNotFoundError:
+            return None
+
+        blocos = {}
+        for periodicidade in self.PERIODICIDADES:
+            info = manifesto[periodicidade]
+            matriz = np.load(os.path.join(self.diretorio, info['arquivo']), mmap_mode='r')
+            blocos[periodicidade] = BlocoIndices(periodicidade, info['indices'], info['primeiro'], matriz)
+
+        return VistaIndices(manifesto['versao'], blocos['mensal'], blocos['anual'], origem=self.diretorio)
+
+    def gravar(self, mensais, anuais):
+        """Grava uma nova versão e a torna a atual. Retorna a versão."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        vista = VistaIndices.de_tabelas(mensais, anuais)
+
+        manifesto = {'versao': vista.versao, 'gerado_em': datetime.now().isoformat(timespec='seconds')}
+        for bloco in (vista.mensal, vista.anual):
+            nome = f"{bloco.periodicidade}-{vista.versao}.npy"
+            temporario = os.path.join(self.diretorio, nome + '.tmp')
+            with open(temporario, 'wb') as arquivo:
+                np.save(arquivo, bloco.matriz)
+            os.replace(temporario, os.path.join(self.diretorio, nome))
+            manifesto[bloco.periodicidade] = {'arquivo': nome, 'indices': bloco.nomes, 'primeiro': bloco.primeiro}
+
+        temporario = self.caminho_manifesto + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_manifesto)
+
+        self._remover_versoes_antigas(manifesto)
+        return vista.versao
+
+    def _remover_versoes_antigas(self, manifesto):
+        atuais = {manifesto[periodicidade]['arquivo'] for periodicidade in self.PERIODICIDADES}
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.npy') and nome.startswith(self.PERIODICIDADES) and nome not in atuais:
+                try:
+                    os.remove(os.path.join(self.diretorio, nome))
+                except OSError:
+                    pass  # ainda mapeado por algum processo (Windows); sai na próxima importação
+
+    def importar(self):
+        """
+        Tabelas embutidas + séries oficiais de <diretorio>/mensal e
+        <diretorio>/anual (o nome do arquivo é o índice: IPCA-E.csv, SELIC.json).
+        As taxas dos arquivos substituem as embutidas mês a mês (ou ano a ano).
+
+        Returns:
+            tuple: (versão gravada, [(periodicidade, indice, taxas importadas)])
+        """
+        tabelas = {
+            'mensal': {indice: dict(taxas) for indice, taxas in INDICES_MENSAIS.items()},
+            'anual': {indice: dict(taxas) for indice, taxas in INDICES_ANUAIS.items()}
+        }
+
+        importados = []
+        for periodicidade in self.PERIODICIDADES:
+            pasta = os.path.join(self.diretorio, periodicidade)
+            if not os.path.isdir(pasta):
+                continue
+            for nome_arquivo in sorted(os.listdir(pasta)):
+                indice, extensao = os.path.splitext(nome_arquivo)
+                if extensao.lower() not in ('.csv', '.json'):
+                    continue
+                taxas = ler_serie_oficial(os.path.join(pasta, nome_arquivo), periodicidade)
+                tabelas[periodicidade].setdefault(indice.upper(), {}).update(taxas)
+                importados.append((periodicidade, indice.upper(), len(taxas)))
+
+        versao = self.gravar(tabelas['mensal'], tabelas['anual'])
+        return versao, importados
+
+
+class IndicesMonetarios:
+    """
+    Séries compartilhadas, montadas uma vez por processo sobre a versão atual
+    do armazém (ou sobre as tabelas embutidas, se o armazém não existir).
+
+    O manifesto é conferido a cada INTERVALO_VERIFICACAO segundos: uma nova
+    importação é adotada sem reiniciar o processo.
+    """
+
+    def __init__(self, tabelas=None, tabelas_anuais=None, armazem=None):
+        self._tabelas = dict(tabelas if tabelas is not None else INDICES_MENSAIS)
+        self._tabelas_anuais = dict(tabelas_anuais if tabelas_anuais is not None else INDICES_ANUAIS)
+        self._armazem = armazem
+        self._assinatura = None
+        self._proxima_verificacao = 0.0
+        self._vista = None
+        self._series = {}
+        self._series_anuais = {}
+        self._matrizes = {}
+        self._lock = threading.RLock()
+
+    def _aplicar(self, vista, assinatura):
+        # Chamado com o lock
+        self._vista = vista
+        self._assinatura = assinatura
+        self._series = {}
+        self._series_anuais = {}
+        self._matrizes = {}
+
+    def _carregar(self):
+        # Chamado com o lock
+        self._proxima_verificacao = time.monotonic() + INTERVALO_VERIFICACAO
+        assinatura = self._armazem.assinatura() if self._armazem is not None else None
+        if self._vista is not None and assinatura == self._assinatura:
+            return
+
+        vista = None
+        if assinatura is not None:
+            try:
+                vista = self._armazem.carregar()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[AVISO] Armazém de índices ilegível ({e}); mantendo a versão {getattr(self._vista, 'versao', 'embutida')}")
+                if self._vista is not None:
+                    return
+        if vista is None:
+            vista = VistaIndices.de_tabelas(self._tabelas, self._tabelas_anuais)
+        self._aplicar(vista, assinatura)
+
+    def _vista_atual(self):
+        if self._vista is None or (self._armazem is not None and time.monotonic() >= self._proxima_verificacao):
+            with self._lock:
+                if self._vista is None or time.monotonic() >= self._proxima_verificacao:
+                    self._carregar()
+        return self._vista
+
+    def recarregar(self):
+        """Confere o armazém agora (após uma importação no mesmo processo)"""
+        with self._lock:
+            self._proxima_verificacao = 0.0
+            self._carregar()
+        return self._vista.versao
+
+    @property
+    def versao(self):
+        return self._vista_atual().versao
+
+    def atualizar_indice(self, indice, taxas):
+        """
+        Substitui a tabela mensal de um índice ({'YYYY-MM': taxa %}) neste
+        processo. Vale até a próxima importação no armazém.
+        """
+        with self._lock:
+            vista = self._vista_atual()
+            mensais = vista.mensal.tabelas()
+            mensais[indice] = dict(taxas)
+            self._aplicar(VistaIndices.de_tabelas(mensais, vista.anual.tabelas()), self._assinatura)
+
+    def serie(self, indice):
+        """SerieMensal do índice (série vazia, sem correção, se não existir)"""
+        vista = self._vista_atual()
+        series = self._series
+        serie = series.get(indice)
+        if serie is None:
+            with self._lock:
+                serie = series.get(indice)
+                if serie is None:
+                    serie = vista.mensal.serie_mensal(indice)
+                    series[indice] = serie
+        return serie
+
+    def serie_anual(self, indice):
+        """SerieAnual do índice (série vazia, sem correção, se não existir)"""
+        vista = self._vista_atual()
+        series = self._series_anuais
+        serie = series.get(indice)
+        if serie is None:
+            with self._lock:
+                serie = series.get(indice)
+                if serie is None:
+                    serie = vista.anual.serie_anual(indice)
+                    series[indice] = serie
+        return serie
+
+    def matriz_acumulada(self, indices):
+        """
+        Acumulados (float) de vários índices alinhados no mesmo eixo de meses:
+        uma linha por índice, uma coluna por mês. Vem direto do bloco mensal
+        (índice desconhecido = linha de uns). Retorna (primeiro mês absoluto,
+        meses, matriz).
+        """
+        vista = self._vista_atual()
+        chave = (tuple(indices), vista.versao)
+        matrizes = self._matrizes
+        matriz = matrizes.get(chave)
+        if matriz is not None:
+            return matriz
+
+        bloco = vista.mensal
+        linhas = [bloco.linha(indice) for indice in indices]
+        if None in linhas:
+            uns = np.ones(bloco.total + 1)
+            valores = np.array([uns if linha is None else bloco.matriz[1, linha] for linha in linhas])
+        else:
+            valores = np.asarray(bloco.matriz[1, linhas])
+
+        matriz = (bloco.primeiro, bloco.total, valores)
+        matrizes[chave] = matriz
+        return matriz
+
+    def fatores_float(self, indices, data_inicio, data_fim):
+        """
+        fator_float() de vários índices de uma vez: duas colunas da matriz
+        acumulada, uma divisão vetorial (mesmo resultado, índice a índice)
+        """
+        if data_fim < data_inicio:
+            return [1.0] * len(indices)
+
+        primeiro, total, matriz = self.matriz_acumulada(indices)
+        inicio = data_inicio.year * 12 + data_inicio.month - 1 - primeiro
+        fim = data_fim.year * 12 + data_fim.month - primeiro
+        inicio = min(max(inicio, 0), total)
+        fim = min(max(fim, 0), total)
+        return (matriz[:, fim] / matriz[:, inicio]).tolist()
+
+    def indices_disponiveis(self):
+        return list(self._vista_atual().mensal.nomes)
+
+    def fator(self, indice, data_inicio, data_fim, pro_rata=False):
+        """Fator de correção do índice entre duas datas"""
+        return self.serie(indice).fator(data_inicio, data_fim, pro_rata=pro_rata)
+
+    def corrigir(self, valor, indice, data_inicio, data_fim, pro_rata=False):
+        """Valor corrigido (Decimal) pelo índice entre duas datas"""
+        return Decimal(str(valor)) * self.fator(indice, data_inicio, data_fim, pro_rata=pro_rata)
+
+
+class SeriesAnuais(Mapping):
+    """
+    {indice: SerieAnual} das calculadoras anuais, resolvido na versão atual
+    das tabelas a cada acesso (não guarda cópia própria)
+    """
+
+    def __init__(self, indices):
+        self.indices = tuple(indices)
+
+    def __getitem__(self, indice):
+        if indice not in self.indices:
+            raise KeyError(indice)
+        return indices_monetarios.serie_anual(indice)
+
+    def __contains__(self, indice):
+        return indice in self.indices
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+
+# Instância global
+indices_monetarios = IndicesMonetarios(armazem=ArmazemIndices(DIRETORIO_INDICES))
@@ -4,8 +4,9 @@ Sistema avançado de scoring e classificação de ativos
 """
 
 from datetime import datetime
-from database import SessionLocal
+from database import SessionEscopo
 from models_atualizado import Processo
+from monitor_oficios import monitor_oficios
 import statistics
 
 class InteligenciaRisco:
@@ -22,8 +23,15 @@ class InteligenciaRisco:
         "INSS": {"taxa_cumprimento": 0.92, "atraso_medio_dias": 150}
     }
     
-    def __init__(self):
-        self.db = SessionLocal()
+    # Desconto típico do mercado na compra (30-50% para precatórios). Para
+    # comparar vários descontos, atrasos e índices na carteira inteira use
+    # cenarios_portfolio.motor_cenarios
+    DESCONTO_MERCADO = 0.35
+    
+    @property
+    def db(self):
+        """Sessão da thread/requisição atual (liberada com SessionEscopo.remove())"""
+        return SessionEscopo()
     
     def analisar_risco_ente(self, ente_pagador):
         """
@@ -60,18 +68,20 @@ class InteligenciaRisco:
             "confiabilidade": taxa
         }
     
-    def calcular_roi_estimado(self, processo, taxa_desconto=0.15):
+    def calcular_roi_estimado(self, processo, taxa_desconto=0.15, desconto_mercado=None):
         """
         Calcula ROI estimado considerando desconto e tempo
         
         Args:
             processo: Objeto Processo
             taxa_desconto: Taxa de desconto anual (padrão 15%)
+            desconto_mercado: Desconto na compra (padrão DESCONTO_MERCADO)
             
         Returns:
             dict: Análise de ROI
         """
-        from monitor_oficios import monitor_oficios
+        if desconto_mercado is None:
+            desconto_mercado = self.DESCONTO_MERCADO
         
         # Calcular tempo estimado
         tempo_est = monitor_oficios.calcular_tempo_estimado_liquidacao(
@@ -85,8 +95,7 @@ class InteligenciaRisco:
         # Valor de face
         valor_face = processo.valor_atualizado
         
-        # Valor com desconto típico do mercado (30-50% para precatórios)
-        desconto_mercado = 0.35  # 35% de desconto médio
+        # Valor com desconto de mercado
         valor_compra_estimado = valor_face * (1 - desconto_mercado)
         
         # ROI bruto
@@ -124,12 +133,13 @@ class InteligenciaRisco:
         else:
             return "BAIXO"
     
-    def gerar_analise_portfolio(self, processos_ids):
+    def gerar_analise_portfolio(self, processos_ids, desconto_mercado=None):
         """
         Gera análise de portfólio para múltiplos processos
         
         Args:
             processos_ids: Lista de IDs de processos
+            desconto_mercado: Desconto na compra (padrão DESCONTO_MERCADO)
             
         Returns:
             dict: Análise consolidada
@@ -141,7 +151,7 @@ class InteligenciaRisco:
         
         analises = []
         for processo in processos:
-            roi_info = self.calcular_roi_estimado(processo)
+            roi_info = self.calcular_roi_estimado(processo, desconto_mercado=desconto_mercado)
             risco_info = self.analisar_risco_ente(processo.ente_pagador)
             
             analises.append({
@@ -192,9 +202,5 @@ class InteligenciaRisco:
         else:
             return "REGULAR - Considerar diversificação"
     
-    def __del__(self):
-        if hasattr(self, 'db'):
-            self.db.close()
-
 # Instância global
 inteligencia_risco = InteligenciaRisco()
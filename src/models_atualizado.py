@@ -3,8 +3,8 @@ Atualização do modelo para incluir esfera do precatório
 """
 
 import enum
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Text, Enum as SQLEnum, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Text, Enum as SQLEnum, ForeignKey, Index
+from sqlalchemy.orm import relationship, synonym
 from database import Base
 from datetime import datetime
 
@@ -145,7 +145,7 @@ class Processo(Base):
     numero_oficio = Column(String(50))
     caminho_oficio = Column(String(500))
     data_busca_oficio = Column(DateTime)
-    hash_oficio = Column(String(64))
+    hash_oficio = Column(String(64), index=True)  # SHA-256 do PDF no armazém de ofícios
     
     # Pagamento
     possui_pendencia_pagamento = Column(Boolean, default=True, index=True)
@@ -160,7 +160,11 @@ class Processo(Base):
     # Observações
     observacoes = Column(Text)
     tags = Column(String(500))
-    score_lead = Column(Integer, default=0)
+    
+    # Score de oportunidade (0-100) do MonitorOficiosRequisitorios, mantido
+    # a cada flush e pela varredura noturna (recalcular_scores.py)
+    score_lead = Column(Integer, default=0, index=True)
+    score_oportunidade = synonym("score_lead")
     
     def __repr__(self):
         return f"<Processo {self.numero_processo}>"
@@ -193,3 +197,30 @@ class Contato(Base):
     data_cadastro = Column(DateTime, default=datetime.now)
     
     processo = relationship("Processo", backref="contatos")
+
+class DashboardStats(Base):
+    """Agregados do dashboard por combinação de dimensões (mantido incrementalmente)"""
+    __tablename__ = "dashboard_stats"
+    
+    id = Column(Integer, primary_key=True)
+    
+    # Dimensões
+    tribunal = Column(SQLEnum(TribunalEnum))
+    natureza = Column(SQLEnum(NaturezaEnum))
+    status = Column(SQLEnum(StatusProcessoEnum))
+    esfera = Column(SQLEnum(EsferaEnum))
+    prioritario = Column(Boolean, default=False)
+    tem_oficio = Column(Boolean, default=False)
+    possui_pendencia_pagamento = Column(Boolean, default=False)
+    
+    # Métricas
+    total = Column(Integer, default=0, nullable=False)
+    valor_total = Column(Float, default=0, nullable=False)
+    
+    __table_args__ = (
+        Index(
+            "ix_dashboard_stats_grupo",
+            "tribunal", "natureza", "status", "esfera",
+            "prioritario", "tem_oficio", "possui_pendencia_pagamento"
+        ),
+    )
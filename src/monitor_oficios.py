@@ -4,10 +4,19 @@ Sistema avançado de rastreamento e análise de ofícios
 """
 
 from datetime import datetime, timedelta
-from database import SessionLocal
-from models_atualizado import Processo, LogBuscaOficio
-from sqlalchemy import func, and_, or_
-import re
+from database import SessionEscopo
+from models_atualizado import Processo, LogBuscaOficio, EntePagadorEnum, NaturezaEnum
+from detector_fases import DetectorFases
+from sqlalchemy import func, and_, or_, case, text, inspect as sa_inspect
+import numpy as np
+
+
+def _nome_enum(valor):
+    """Nome do enum: a coluna aceita o objeto ou o nome gravado ('ALIMENTAR')"""
+    if valor is None:
+        return None
+    return valor.name if hasattr(valor, 'name') else str(valor)
+
 
 class MonitorOficiosRequisitorios:
     """Sistema de monitoramento de ofícios requisitórios"""
@@ -70,8 +79,65 @@ class MonitorOficiosRequisitorios:
         "liberado para pagamento"
     ]
     
-    def __init__(self):
-        self.db = SessionLocal()
+    # Tempos médios por fase (em dias)
+    TEMPOS_FASE = {
+        "OFICIO_EXPEDIDO": 180,  # 6 meses até registro
+        "EM_CONFERENCIA": 150,
+        "AGUARDANDO_ASSINATURA": 120,
+        "OFICIO_ENVIADO": 90,
+        "PRECATORIO_REGISTRADO": 730,  # 2 anos (média)
+        "EM_LISTA_PAGAMENTO": 180,  # 6 meses
+        "RPV_EXPEDIDO": 60  # 2 meses (RPV é mais rápido)
+    }
+    
+    # Ajuste do tempo por ente devedor
+    FATOR_ENTE = {
+        "UNIAO": 1.5,  # União demora mais
+        "ESTADO_SP": 1.2,
+        "ESTADO_RJ": 1.3,
+        "PREFEITURA_SP": 1.1,
+        "INSS": 1.4
+    }
+    
+    # Categorias do score e da maturidade (códigos do pontuar_lote = posição na lista)
+    CLASSIFICACOES_SCORE = ["EXCELENTE", "MUITO_BOM", "BOM", "REGULAR", "BAIXO"]
+    MATURIDADES = ["IMEDIATA", "CURTO_PRAZO", "MEDIO_PRAZO", "LONGO_PRAZO"]
+    
+    # Colunas lidas pelo relatório de inteligência (em vez do Processo inteiro)
+    COLUNAS_SCORE = (
+        Processo.id, Processo.valor_atualizado, Processo.data_expedicao_oficio, Processo.tem_oficio,
+        Processo.ente_pagador, Processo.natureza, Processo.ano_precatorio,
+        Processo.credor_idoso, Processo.credor_doenca_grave, Processo.credor_deficiente
+    )
+    
+    TOP_OPORTUNIDADES = 50
+    
+    # Tamanho dos lotes de IDs no filtro IN (limite de variáveis do SQLite)
+    LOTE_IDS = 900
+    
+    # Termos das fases e extratores de números/valores (texto normalizado: minúsculas, sem acentos)
+    DETECTOR_FASES = DetectorFases(
+        {
+            "RPV": TERMOS_RPV,
+            "REGISTRO": TERMOS_REGISTRO,
+            "PAGAMENTO": TERMOS_PAGAMENTO,
+            "ENVIO": TERMOS_ENVIO,
+            "ASSINATURA": TERMOS_ASSINATURA,
+            "CONFERENCIA": TERMOS_CONFERENCIA,
+            "EXPEDICAO": TERMOS_EXPEDICAO,
+            "RETIFICACAO": TERMOS_RETIFICACAO
+        },
+        {
+            "numero_precatorio": r'precatorio\s+n[ºo°]?\s*(\d+[-/]\d+)',
+            "numero_oficio": r'oficio\s+(?:requisitorio\s+)?n[ºo°]?\s*([\d./-]+)',
+            "valor": r'r\$\s*([\d.,]+)'
+        }
+    )
+    
+    @property
+    def db(self):
+        """Sessão da thread/requisição atual (liberada com SessionEscopo.remove())"""
+        return SessionEscopo()
     
     def identificar_fase_oficio(self, movimentacoes_texto):
         """
@@ -83,8 +149,23 @@ class MonitorOficiosRequisitorios:
         Returns:
             dict: Fase identificada e detalhes
         """
-        texto_lower = movimentacoes_texto.lower()
+        return self._montar_fase(*self.DETECTOR_FASES.analisar(movimentacoes_texto))
+    
+    def identificar_fases_lote(self, textos):
+        """
+        Identifica a fase de vários textos de movimentações (um por processo)
         
+        Args:
+            textos: Iterável de textos das movimentações
+            
+        Returns:
+            generator: Um resultado de identificar_fase_oficio por texto, na mesma ordem
+        """
+        for categorias, capturas in self.DETECTOR_FASES.analisar_lote(textos):
+            yield self._montar_fase(categorias, capturas)
+    
+    def _montar_fase(self, categorias, capturas):
+        """Resultado de identificar_fase_oficio a partir das categorias e capturas do detector"""
         resultado = {
             "fase": "DESCONHECIDA",
             "subfase": None,
@@ -97,64 +178,59 @@ class MonitorOficiosRequisitorios:
         }
         
         # Verificar RPV primeiro (prioridade)
-        if any(termo in texto_lower for termo in self.TERMOS_RPV):
+        if "RPV" in categorias:
             resultado["fase"] = "RPV_EXPEDIDO"
             resultado["tipo_credito"] = "RPV"
             resultado["detalhes"].append("Requisição de Pequeno Valor identificada")
         
         # Verificar registro/precatório
-        elif any(termo in texto_lower for termo in self.TERMOS_REGISTRO):
+        elif "REGISTRO" in categorias:
             resultado["fase"] = "PRECATORIO_REGISTRADO"
             resultado["tipo_credito"] = "PRECATORIO"
             
-            # Tentar extrair número do precatório
-            match_precatorio = re.search(r'precatório\s+n[ºo°]?\s*(\d+[-/]\d+)', texto_lower)
-            if match_precatorio:
-                resultado["numero_precatorio"] = match_precatorio.group(1)
+            if capturas.get("numero_precatorio"):
+                resultado["numero_precatorio"] = capturas["numero_precatorio"]
                 resultado["detalhes"].append(f"Precatório nº {resultado['numero_precatorio']}")
         
         # Verificar pagamento
-        elif any(termo in texto_lower for termo in self.TERMOS_PAGAMENTO):
+        elif "PAGAMENTO" in categorias:
             resultado["fase"] = "EM_LISTA_PAGAMENTO"
             resultado["detalhes"].append("Incluído em lista de pagamento")
         
         # Verificar envio
-        elif any(termo in texto_lower for termo in self.TERMOS_ENVIO):
+        elif "ENVIO" in categorias:
             resultado["fase"] = "OFICIO_ENVIADO"
             resultado["subfase"] = "TRAMITACAO"
             resultado["detalhes"].append("Ofício enviado ao tribunal")
         
         # Verificar assinatura
-        elif any(termo in texto_lower for termo in self.TERMOS_ASSINATURA):
+        elif "ASSINATURA" in categorias:
             resultado["fase"] = "AGUARDANDO_ASSINATURA"
             resultado["detalhes"].append("Ofício aguardando assinatura")
         
         # Verificar conferência
-        elif any(termo in texto_lower for termo in self.TERMOS_CONFERENCIA):
+        elif "CONFERENCIA" in categorias:
             resultado["fase"] = "EM_CONFERENCIA"
             resultado["detalhes"].append("Ofício em conferência")
         
         # Verificar expedição
-        elif any(termo in texto_lower for termo in self.TERMOS_EXPEDICAO):
+        elif "EXPEDICAO" in categorias:
             resultado["fase"] = "OFICIO_EXPEDIDO"
             
-            # Tentar extrair número do ofício
-            match_oficio = re.search(r'of[íi]cio\s+(?:requisit[óo]rio\s+)?n[ºo°]?\s*([\d./-]+)', texto_lower)
-            if match_oficio:
-                resultado["numero_oficio"] = match_oficio.group(1)
+            if capturas.get("numero_oficio"):
+                resultado["numero_oficio"] = capturas["numero_oficio"]
                 resultado["detalhes"].append(f"Ofício nº {resultado['numero_oficio']}")
         
         # Verificar retificação
-        if any(termo in texto_lower for termo in self.TERMOS_RETIFICACAO):
+        if "RETIFICACAO" in categorias:
             resultado["detalhes"].append("ATENÇÃO: Ofício retificado - verificar valores")
         
-        # Tentar extrair valor
-        match_valor = re.search(r'R\$\s*([\d.,]+)', texto_lower)
-        if match_valor:
-            valor_str = match_valor.group(1).replace('.', '').replace(',', '.')
+        # Valor (primeiro R$ do texto)
+        if capturas.get("valor"):
+            valor_str = capturas["valor"].replace('.', '').replace(',', '.')
             try:
                 resultado["valor_identificado"] = float(valor_str)
-            except:
+            except ValueError:
                 pass
         
         return resultado
@@ -173,31 +249,11 @@ class MonitorOficiosRequisitorios:
         """
         hoje = datetime.now().date()
         
-        # Tempos médios por fase (em dias)
-        TEMPOS_FASE = {
-            "OFICIO_EXPEDIDO": 180,  # 6 meses até registro
-            "EM_CONFERENCIA": 150,
-            "AGUARDANDO_ASSINATURA": 120,
-            "OFICIO_ENVIADO": 90,
-            "PRECATORIO_REGISTRADO": 730,  # 2 anos (média)
-            "EM_LISTA_PAGAMENTO": 180,  # 6 meses
-            "RPV_EXPEDIDO": 60  # 2 meses (RPV é mais rápido)
-        }
-        
-        # Ajuste por ente devedor
-        FATOR_ENTE = {
-            "UNIAO": 1.5,  # União demora mais
-            "ESTADO_SP": 1.2,
-            "ESTADO_RJ": 1.3,
-            "PREFEITURA_SP": 1.1,
-            "INSS": 1.4
-        }
-        
-        dias_base = TEMPOS_FASE.get(fase, 365)
+        dias_base = self.TEMPOS_FASE.get(fase, 365)
         
         # Aplicar fator do ente
         if ente_devedor:
-            fator = FATOR_ENTE.get(ente_devedor, 1.0)
+            fator = self.FATOR_ENTE.get(ente_devedor, 1.0)
             dias_base = int(dias_base * fator)
         
         # Se já é precatório registrado, calcular pela ordem cronológica
@@ -337,82 +393,246 @@ class MonitorOficiosRequisitorios:
         else:
             return "BAIXO"
     
-    def gerar_relatorio_inteligencia(self, filtros=None):
+    def _pontos_ente(self, ente):
+        """Pontos do ente devedor no score (mesma regra de calcular_score_oportunidade)"""
+        ente = _nome_enum(ente)
+        if not ente:
+            return 0
+        if "UNIAO" in ente or "INSS" in ente:
+            return 20
+        if "ESTADO" in ente:
+            return 15
+        return 10
+    
+    def _pontos_natureza(self, natureza):
+        natureza = _nome_enum(natureza)
+        if not natureza:
+            return 0
+        if natureza == "ALIMENTAR":
+            return 15
+        if natureza == "TRIBUTARIO":
+            return 12
+        return 10
+    
+    @staticmethod
+    def _codificar(valores):
+        """Códigos inteiros por valor distinto: (array de códigos, lista de distintos)"""
+        distintos = {}
+        codigos = [distintos.setdefault(valor, len(distintos)) for valor in valores]
+        return np.array(codigos, dtype=np.int64), list(distintos)
+    
+    def pontuar_lote(self, colunas, hoje=None):
         """
-        Gera relatório de inteligência com oportunidades priorizadas
+        Score, classificação, maturidade e tempo estimado de muitos processos de
+        uma vez, com as regras de calcular_score_oportunidade,
+        classificar_maturidade e calcular_tempo_estimado_liquidacao em
+        expressões vetorizadas (ente e natureza: uma consulta por valor distinto).
         
         Args:
-            filtros: Dicionário com filtros (valor_min, ente, natureza, etc)
+            colunas: dict de sequências com as colunas de COLUNAS_SCORE
+                     (valor_atualizado, data_expedicao_oficio, tem_oficio, ...)
+            hoje: data de referência (padrão: hoje)
             
         Returns:
-            dict: Relatório completo
+            dict: arrays score, classificacao (posição em CLASSIFICACOES_SCORE),
+                  maturidade (posição em MATURIDADES) e tempo_estimado_meses
         """
-        query = self.db.query(Processo).filter(Processo.tem_oficio == True)
+        hoje = hoje or datetime.now().date()
+        
+        valores = np.asarray(colunas["valor_atualizado"], dtype=np.float64)
+        
+        # 1. Valor
+        score = np.select(
+            [valores >= 5000000, valores >= 1000000, valores >= 500000, valores >= 100000],
+            [30, 25, 20, 15], default=10
+        )
+        
+        # 2. Maturidade (dias desde a expedição; sem data = longo prazo)
+        expedicao = np.array(colunas["data_expedicao_oficio"], dtype="datetime64[D]")
+        com_data = ~np.isnat(expedicao)
+        dias = np.where(com_data, (np.datetime64(hoje, "D") - expedicao).astype(np.int64), 0)
+        tem_oficio = np.array([bool(valor) for valor in colunas["tem_oficio"]], dtype=bool)
+        maturidade = np.select(
+            [com_data & tem_oficio & (dias > 730), com_data & (dias > 365), com_data & (dias > 180)],
+            [0, 1, 2], default=3
+        )
+        score += np.array([25, 20, 15, 10])[maturidade]
+        
+        # 3 e 4. Ente devedor e natureza (pontos por valor distinto)
+        codigos_ente, entes = self._codificar(colunas["ente_pagador"])
+        codigos_natureza, naturezas = self._codificar(colunas["natureza"])
+        score += np.array([self._pontos_ente(ente) for ente in entes], dtype=np.int64)[codigos_ente]
+        score += np.array([self._pontos_natureza(natureza) for natureza in naturezas], dtype=np.int64)[codigos_natureza]
+        
+        # 5. Prioridade legal
+        idoso = np.array([bool(valor) for valor in colunas["credor_idoso"]], dtype=bool)
+        doenca = np.array([bool(valor) for valor in colunas["credor_doenca_grave"]], dtype=bool)
+        deficiente = np.array([bool(valor) for valor in colunas["credor_deficiente"]], dtype=bool)
+        score += np.select([idoso & doenca, idoso | doenca | deficiente], [10, 7], default=5)
+        
+        score = np.minimum(score, 100)
+        classificacao = np.select([score >= 85, score >= 70, score >= 55, score >= 40], [0, 1, 2, 3], default=4)
+        
+        # Tempo estimado: precatório registrado pela ordem cronológica (ano),
+        # senão ofício expedido ajustado pelo ente
+        anos = np.array([ano or 0 for ano in colunas["ano_precatorio"]], dtype=np.int64)
+        fator_ente = np.array([self.FATOR_ENTE.get(_nome_enum(ente), 1.0) if ente else 1.0 for ente in entes])
+        dias_expedido = (self.TEMPOS_FASE["OFICIO_EXPEDIDO"] * fator_ente[codigos_ente]).astype(np.int64)
+        dias_estimados = np.where(anos != 0, np.maximum(365, (5 - (hoje.year - anos)) * 365), dias_expedido)
         
-        # Aplicar filtros
+        return {
+            "score": score,
+            "classificacao": classificacao,
+            "maturidade": maturidade,
+            "tempo_estimado_meses": np.round(dias_estimados / 30).astype(np.int64)
+        }
+    
+    def _filtrar_relatorio(self, query, filtros):
+        """Filtros do relatório de inteligência (valor_min, ente, natureza, maturidade)"""
         if filtros:
             if filtros.get('valor_min'):
                 query = query.filter(Processo.valor_atualizado >= filtros['valor_min'])
             
             if filtros.get('ente_pagador'):
-                from models_atualizado import EntePagadorEnum
                 query = query.filter(Processo.ente_pagador == EntePagadorEnum[filtros['ente_pagador']])
             
             if filtros.get('natureza'):
-                from models_atualizado import NaturezaEnum
                 query = query.filter(Processo.natureza == NaturezaEnum[filtros['natureza']])
             
             if filtros.get('maturidade_min_dias'):
                 data_limite = datetime.now().date() - timedelta(days=filtros['maturidade_min_dias'])
                 query = query.filter(Processo.data_expedicao_oficio <= data_limite)
+        return query
+    
+    @classmethod
+    def _colunas(cls, processos):
+        """Colunas de COLUNAS_SCORE (para pontuar_lote) a partir de objetos Processo"""
+        return {coluna.key: [getattr(processo, coluna.key) for processo in processos] for coluna in cls.COLUNAS_SCORE}
+    
+    def recalcular_scores(self, db, hoje=None, tamanho_lote=5000, ids=None):
+        """
+        Varredura do score_lead de todos os processos (rodar uma vez por dia)
+        ou só dos processos em ids (depois de UPDATEs via SQL direto).
         
-        processos = query.all()
+        A maturidade avança com o tempo sem que o processo mude, e UPDATEs em
+        massa não passam pelo flush: os scores são recalculados em lote e só
+        as linhas cujo score mudou são gravadas. O commit fica com quem chama.
         
-        # Calcular scores e classificar
-        oportunidades = []
-        for processo in processos:
-            score_info = self.calcular_score_oportunidade(processo)
-            maturidade = self.classificar_maturidade(processo)
-            tempo_estimado = self.calcular_tempo_estimado_liquidacao(
-                "PRECATORIO_REGISTRADO" if processo.ano_precatorio else "OFICIO_EXPEDIDO",
-                processo.ano_precatorio,
-                processo.ente_pagador.name if processo.ente_pagador else None
+        Returns:
+            int: processos com score atualizado
+        """
+        consulta = db.query(Processo.score_lead, *self.COLUNAS_SCORE)
+        if ids is None:
+            linhas = consulta.all()
+        else:
+            ids = list(ids)
+            linhas = []
+            for inicio in range(0, len(ids), self.LOTE_IDS):
+                linhas.extend(consulta.filter(Processo.id.in_(ids[inicio:inicio + self.LOTE_IDS])).all())
+        if not linhas:
+            return 0
+        
+        nomes = [coluna.key for coluna in self.COLUNAS_SCORE]
+        colunas = dict(zip(nomes, list(zip(*linhas))[1:]))
+        gravados = np.array([-1 if score is None else score for score in (linha[0] for linha in linhas)])
+        scores = self.pontuar_lote(colunas, hoje)["score"]
+        
+        mudaram = np.flatnonzero(scores != gravados).tolist()
+        for inicio in range(0, len(mudaram), tamanho_lote):
+            db.execute(
+                text("UPDATE processos SET score_lead = :score WHERE id = :id"),
+                [{"score": int(scores[pos]), "id": colunas["id"][pos]} for pos in mudaram[inicio:inicio + tamanho_lote]]
             )
+        return len(mudaram)
+    
+    def gerar_relatorio_inteligencia(self, filtros=None):
+        """
+        Gera relatório de inteligência com oportunidades priorizadas
+        
+        Usa o score persistido (score_lead, indexado): o topo é um ORDER BY
+        ... LIMIT e a distribuição/totais saem de um GROUP BY por faixa de
+        score. Maturidade e tempo estimado são calculados só para o topo.
+        
+        Args:
+            filtros: Dicionário com filtros (valor_min, ente, natureza, etc)
             
+        Returns:
+            dict: Relatório completo
+        """
+        agora = datetime.now()
+        score = func.coalesce(Processo.score_lead, 0)
+        
+        topo = self._filtrar_relatorio(
+            self.db.query(Processo).filter(Processo.tem_oficio == True), filtros
+        ).order_by(Processo.score_lead.desc(), Processo.id).limit(self.TOP_OPORTUNIDADES).all()
+        
+        lote = self.pontuar_lote(self._colunas(topo), agora.date())
+        oportunidades = []
+        for posicao, processo in enumerate(topo):
             oportunidades.append({
                 "processo": processo,
-                "score": score_info["score"],
-                "classificacao": score_info["classificacao"],
-                "maturidade": maturidade,
-                "tempo_estimado_meses": tempo_estimado["meses_estimados"],
-                "detalhes_score": score_info["detalhes"]
+                "score": processo.score_lead or 0,
+                "classificacao": self._classificar_score(processo.score_lead or 0),
+                "maturidade": self.MATURIDADES[lote["maturidade"][posicao]],
+                "tempo_estimado_meses": int(lote["tempo_estimado_meses"][posicao]),
+                "detalhes_score": self.calcular_score_oportunidade(processo)["detalhes"]
             })
         
-        # Ordenar por score
-        oportunidades.sort(key=lambda x: x["score"], reverse=True)
-        
-        # Estatísticas
-        total_valor = sum(op["processo"].valor_atualizado for op in oportunidades)
-        valor_excelente = sum(op["processo"].valor_atualizado for op in oportunidades if op["classificacao"] == "EXCELENTE")
+        # Distribuição e valores por classificação num GROUP BY só
+        faixa = case(
+            (score >= 85, "EXCELENTE"),
+            (score >= 70, "MUITO_BOM"),
+            (score >= 55, "BOM"),
+            (score >= 40, "REGULAR"),
+            else_="BAIXO"
+        )
+        grupos = self._filtrar_relatorio(
+            self.db.query(faixa, func.count(Processo.id), func.coalesce(func.sum(Processo.valor_atualizado), 0))
+            .filter(Processo.tem_oficio == True), filtros
+        ).group_by(faixa).all()
+        
+        distribuicao = dict.fromkeys(self.CLASSIFICACOES_SCORE, 0)
+        valores = dict.fromkeys(self.CLASSIFICACOES_SCORE, 0.0)
+        for classificacao, quantidade, valor in grupos:
+            distribuicao[classificacao] = quantidade
+            valores[classificacao] = float(valor)
         
         return {
-            "total_oportunidades": len(oportunidades),
-            "valor_total": total_valor,
-            "valor_oportunidades_excelentes": valor_excelente,
-            "oportunidades": oportunidades[:50],  # Top 50
-            "distribuicao_scores": {
-                "EXCELENTE": len([o for o in oportunidades if o["classificacao"] == "EXCELENTE"]),
-                "MUITO_BOM": len([o for o in oportunidades if o["classificacao"] == "MUITO_BOM"]),
-                "BOM": len([o for o in oportunidades if o["classificacao"] == "BOM"]),
-                "REGULAR": len([o for o in oportunidades if o["classificacao"] == "REGULAR"]),
-                "BAIXO": len([o for o in oportunidades if o["classificacao"] == "BAIXO"])
-            },
-            "data_geracao": datetime.now()
+            "total_oportunidades": sum(distribuicao.values()),
+            "valor_total": sum(valores.values()),
+            "valor_oportunidades_excelentes": valores["EXCELENTE"],
+            "oportunidades": oportunidades,
+            "distribuicao_scores": distribuicao,
+            "data_geracao": agora
         }
     
-    def __del__(self):
-        if hasattr(self, 'db'):
-            self.db.close()
-
 # Instância global
 monitor_oficios = MonitorOficiosRequisitorios()
+
+# Entradas do score: processo novo ou com alguma delas alterada tem o score_lead recalculado
+ATRIBUTOS_SCORE = (
+    'valor_atualizado', 'ente_pagador', 'natureza', 'ano_precatorio', 'data_expedicao_oficio', 'tem_oficio',
+    'credor_idoso', 'credor_doenca_grave', 'credor_deficiente'
+)
+
+
+def manter_score_oportunidade(session, flush_context, instancias):
+    """
+    before_flush (registrado por eventos_processos): recalcula o score_lead,
+    em lote, só dos processos cujas entradas mudaram
+    """
+    processos = [obj for obj in session.new if isinstance(obj, Processo)]
+    for obj in session.dirty:
+        if not isinstance(obj, Processo) or obj in session.deleted:
+            continue
+        estado = sa_inspect(obj)
+        if any(estado.attrs[attr].history.has_changes() for attr in ATRIBUTOS_SCORE):
+            processos.append(obj)
+    
+    if not processos:
+        return
+    
+    scores = monitor_oficios.pontuar_lote(MonitorOficiosRequisitorios._colunas(processos))["score"]
+    for processo, score in zip(processos, scores.tolist()):
+        if processo.score_lead != score:
+            processo.score_lead = score
@@ -0,0 +1,278 @@
+﻿"""
+Módulo de Movimentações
+Ingestão incremental das movimentações processuais e avanço da fase do ofício
+
+Cada processo guarda uma marca d'água: a data da última movimentação
+ingerida (data_ultima_movimentacao) e o hash da sequência daquele dia
+(hash_ultima_movimentacao), calculado sobre os hashes das movimentações do
+dia. Em uma nova consulta entram só:
+
+    - as movimentações com data posterior à marca;
+    - as do dia da marca que ainda não estão gravadas. O banco só é
+      consultado quando o hash da sequência do dia mudou.
+
+Movimentações com data anterior à marca são ignoradas. A fase do ofício é
+identificada só no delta (monitor_oficios.identificar_fases_lote). Quando
+ela avança em relação ao status_oficio do processo, o status é atualizado e
+a mudança é registrada em atualizacoes_oficio.
+"""
+
+import hashlib
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import text, table, column
+
+from database import insert_dialeto
+from monitor_oficios import monitor_oficios
+
+# Tamanho dos lotes de IDs no filtro IN (limite de variáveis do SQLite)
+LOTE_IDS = 900
+
+# Tabela movimentacoes (criada por migrar_movimentacoes.py, sem modelo ORM)
+TABELA_MOVIMENTACOES = table(
+    "movimentacoes",
+    column("processo_id"), column("data_movimentacao"), column("descricao"),
+    column("hash_sequencia"), column("data_cadastro")
+)
+
+# Ordem de avanço do status_oficio (ordem do StatusOficioEnum, sem RETIFICADO,
+# que não é um avanço)
+ORDEM_STATUS_OFICIO = [
+    "NAO_EXPEDIDO", "EM_ELABORACAO", "AGUARDANDO_ASSINATURA", "ASSINADO", "EXPEDIDO",
+    "ENVIADO_TRIBUNAL", "RECEBIDO_TRIBUNAL", "EM_CONFERENCIA", "REGISTRADO",
+    "INSCRITO_ORCAMENTO", "EM_LISTA_PAGAMENTO", "PAGO"
+]
+
+# Fase do monitor_oficios -> status_oficio
+STATUS_POR_FASE = {
+    "OFICIO_EXPEDIDO": "EXPEDIDO",
+    "RPV_EXPEDIDO": "EXPEDIDO",
+    "AGUARDANDO_ASSINATURA": "AGUARDANDO_ASSINATURA",
+    "OFICIO_ENVIADO": "ENVIADO_TRIBUNAL",
+    "EM_CONFERENCIA": "EM_CONFERENCIA",
+    "PRECATORIO_REGISTRADO": "REGISTRADO",
+    "EM_LISTA_PAGAMENTO": "EM_LISTA_PAGAMENTO"
+}
+
+
+def _data(valor):
+    """date a partir de date, datetime, 'dd/mm/aaaa' ou 'aaaa-mm-dd'"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    valor = str(valor).strip()
+    if valor[2:3] == '/':
+        return date(int(valor[6:10]), int(valor[3:5]), int(valor[:2]))
+    return date.fromisoformat(valor[:10])
+
+
+def _hash_sequencia(hashes):
+    """Hash da sequência de um dia (independe da ordem em que o tribunal lista)"""
+    return hashlib.sha256('|'.join(sorted(hashes)).encode('utf-8')).hexdigest()
+
+
+class IngestaoMovimentacoes:
+    """Ingestão incremental de movimentações com marca d'água por processo"""
+
+    @staticmethod
+    def preparar(movimentacoes, a_partir_de=None):
+        """
+        Normaliza as movimentações de uma consulta.
+
+        Args:
+            movimentacoes: iterável de dicts {'data', 'descricao'} ou tuplas
+                (data, descricao), em qualquer ordem
+            a_partir_de: descarta as anteriores a esta data (antes de
+                normalizar o texto e calcular o hash)
+
+        Returns:
+            list: (data, descricao, hash) em ordem de data. O hash de cada
+            movimentação cobre a data, o texto com os espaços colapsados e a
+            ocorrência do mesmo texto no dia, então movimentações iguais no
+            mesmo dia não se confundem.
+
+        Raises:
+            ValueError: movimentação que não é dict/tupla nesse formato, ou data inválida
+        """
+        ocorrencias = Counter()
+        preparadas = []
+        for movimentacao in movimentacoes:
+            if isinstance(movimentacao, dict) and 'data' in movimentacao and 'descricao' in movimentacao:
+                data, descricao = movimentacao['data'], movimentacao['descricao']
+            elif isinstance(movimentacao, (list, tuple)) and len(movimentacao) == 2:
+                data, descricao = movimentacao
+            else:
+                raise ValueError(f"esperado {{data, descricao}} ou (data, descricao): {movimentacao!r}")
+            data = _data(data)
+            if a_partir_de is not None and data < a_partir_de:
+                continue
+            descricao = ' '.join(str(descricao or '').split())
+            if not descricao:
+                continue
+
+            ocorrencias[(data, descricao)] += 1
+            conteudo = f"{data.isoformat()}|{ocorrencias[(data, descricao)]}|{descricao}"
+            preparadas.append((data, descricao, hashlib.sha256(conteudo.encode('utf-8')).hexdigest()))
+
+        preparadas.sort(key=lambda movimentacao: movimentacao[0])
+        return preparadas
+
+    @staticmethod
+    def _carregar_marcas(db, processos_ids):
+        marcas = {}
+        for inicio in range(0, len(processos_ids), LOTE_IDS):
+            lote = processos_ids[inicio:inicio + LOTE_IDS]
+            parametros = {f"id{posicao}": processo_id for posicao, processo_id in enumerate(lote)}
+            linhas = db.execute(text(f"""
+                SELECT id, data_ultima_movimentacao, hash_ultima_movimentacao, status_oficio
+                FROM processos
+                WHERE id IN ({', '.join(':' + nome for nome in parametros)})
+            """), parametros).fetchall()
+            for processo_id, data_marca, hash_marca, status_oficio in linhas:
+                marcas[processo_id] = (_data(data_marca) if data_marca else None, hash_marca, status_oficio)
+        return marcas
+
+    def calcular_delta(self, db, processo_id, preparadas, data_marca, hash_marca):
+        """Movimentações preparadas ainda não ingeridas (posteriores à marca d'água)"""
+        if data_marca is None:
+            return preparadas
+
+        do_dia = [movimentacao for movimentacao in preparadas if movimentacao[0] == data_marca]
+        posteriores = [movimentacao for movimentacao in preparadas if movimentacao[0] > data_marca]
+
+        if do_dia and _hash_sequencia(movimentacao[2] for movimentacao in do_dia) != hash_marca:
+            gravados = {
+                linha[0] for linha in db.execute(text("""
+                    SELECT hash_sequencia FROM movimentacoes
+                    WHERE processo_id = :processo_id AND data_movimentacao = :data
+                """), {"processo_id": processo_id, "data": data_marca})
+            }
+            posteriores = [movimentacao for movimentacao in do_dia if movimentacao[2] not in gravados] + posteriores
+
+        return posteriores
+
+    def ingerir_lote(self, db, movimentacoes_por_processo):
+        """
+        Ingere as movimentações de vários processos (o commit fica com quem chama)
+
+        Args:
+            movimentacoes_por_processo: {processo_id: movimentações da consulta}
+
+        Returns:
+            dict: {processo_id: {'novas', 'fase', 'status_anterior',
+            'status_novo', 'avancou'}} dos processos encontrados
+        """
+        marcas = self._carregar_marcas(db, list(movimentacoes_por_processo))
+
+        # Só as movimentações a partir do dia da marca são normalizadas e hasheadas
+        preparadas = {
+            processo_id: self.preparar(movimentacoes_por_processo[processo_id], a_partir_de=data_marca)
+            for processo_id, (data_marca, _, _) in marcas.items()
+        }
+
+        agora = datetime.now()
+        deltas = {}
+        novas = []
+        for processo_id, (data_marca, hash_marca, _) in marcas.items():
+            delta = self.calcular_delta(db, processo_id, preparadas[processo_id], data_marca, hash_marca)
+            if not delta:
+                continue
+            deltas[processo_id] = delta
+            novas.extend(
+                {"processo_id": processo_id, "data_movimentacao": data, "descricao": descricao,
+                 "hash_sequencia": hash_movimentacao, "data_cadastro": agora}
+                for data, descricao, hash_movimentacao in delta
+            )
+
+        if novas:
+            # Repetidas (mesmo hash_sequencia) são ignoradas pelo índice único
+            db.execute(insert_dialeto(db, TABELA_MOVIMENTACOES).on_conflict_do_nothing(), novas)
+
+            # Nova marca: último dia do delta e a sequência completa desse dia
+            db.execute(text("""
+                UPDATE processos
+                SET data_ultima_movimentacao = :data, hash_ultima_movimentacao = :hash
+                WHERE id = :id
+            """), [
+                {
+                    "id": processo_id,
+                    "data": delta[-1][0],
+                    "hash": _hash_sequencia(
+                        movimentacao[2] for movimentacao in preparadas[processo_id] if movimentacao[0] == delta[-1][0]
+                    )
+                }
+                for processo_id, delta in deltas.items()
+            ])
+
+        # Fase identificada só no texto das movimentações novas
+        textos = ('\n'.join(descricao for _, descricao, _ in delta) for delta in deltas.values())
+        fases = dict(zip(deltas, monitor_oficios.identificar_fases_lote(textos)))
+
+        resultados = {}
+        for processo_id, (_, _, status_anterior) in marcas.items():
+            fase = fases.get(processo_id)
+            status_novo = STATUS_POR_FASE.get(fase["fase"]) if fase else None
+            avancou = status_novo is not None and self._posicao(status_novo) > self._posicao(status_anterior)
+
+            if avancou:
+                self._registrar_avanco(db, processo_id, status_anterior, status_novo, fase, agora)
+
+            resultados[processo_id] = {
+                "novas": len(deltas.get(processo_id, ())),
+                "fase": fase["fase"] if fase else None,
+                "status_anterior": status_anterior,
+                "status_novo": status_novo if avancou else status_anterior,
+                "avancou": avancou
+            }
+
+        return resultados
+
+    def ingerir(self, db, processo_id, movimentacoes):
+        """Ingere as movimentações de um processo (resultado de ingerir_lote ou None se não existir)"""
+        return self.ingerir_lote(db, {processo_id: movimentacoes}).get(processo_id)
+
+    @staticmethod
+    def _posicao(status):
+        return ORDEM_STATUS_OFICIO.index(status) if status in ORDEM_STATUS_OFICIO else 0
+
+    @staticmethod
+    def _registrar_avanco(db, processo_id, status_anterior, status_novo, fase, agora):
+        """Atualiza o status_oficio e registra a mudança no histórico (como em app.atualizar_oficio)"""
+        db.execute(text("""
+            INSERT INTO atualizacoes_oficio
+            (processo_id, data_atualizacao, status_anterior, status_novo,
+             descricao, valor_atualizado, numero_oficio, numero_precatorio,
+             origem, usuario, validado)
+            VALUES
+            (:processo_id, :data_atualizacao, :status_anterior, :status_novo,
+             :descricao, :valor_atualizado, :numero_oficio, :numero_precatorio,
+             'AUTOMATICA', 'Sistema', 0)
+        """), {
+            "processo_id": processo_id,
+            "data_atualizacao": agora,
+            "status_anterior": status_anterior,
+            "status_novo": status_novo,
+            "descricao": "; ".join(fase["detalhes"]) or f"Fase identificada nas movimentações: {fase['fase']}",
+            "valor_atualizado": fase["valor_identificado"],
+            "numero_oficio": fase["numero_oficio"],
+            "numero_precatorio": fase["numero_precatorio"]
+        })
+
+        db.execute(text("""
+            UPDATE processos
+            SET status_oficio = :status_novo,
+                data_ultima_atualizacao_oficio = :data_atualizacao,
+                numero_oficio = COALESCE(:numero_oficio, numero_oficio)
+            WHERE id = :id
+        """), {
+            "status_novo": status_novo,
+            "data_atualizacao": agora,
+            "numero_oficio": fase["numero_oficio"],
+            "id": processo_id
+        })
+
+
+# Instância global
+ingestao_movimentacoes = IngestaoMovimentacoes()
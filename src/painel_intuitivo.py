@@ -3,8 +3,9 @@ Módulo de Painel Intuitivo
 Widgets e componentes interativos para o dashboard
 """
 
-from database import SessionLocal
+from database import SessionLeitura
 from models_atualizado import Processo, LogBuscaOficio
+from estatisticas_dashboard import estatisticas_dashboard
 from sqlalchemy import func, and_, or_
 from datetime import datetime, timedelta
 
@@ -14,17 +15,18 @@ class PainelIntuitivo:
     @staticmethod
     def obter_metricas_principais():
         """Retorna métricas principais do sistema"""
-        db = SessionLocal()
+        db = SessionLeitura()
         
         try:
             hoje = datetime.now().date()
             mes_atual = hoje.replace(day=1)
             
-            # Métricas gerais
-            total_processos = db.query(Processo).count()
-            total_valor = db.query(func.sum(Processo.valor_atualizado)).scalar() or 0
-            com_oficio = db.query(Processo).filter(Processo.tem_oficio == True).count()
-            pendentes = db.query(Processo).filter(Processo.possui_pendencia_pagamento == True).count()
+            # Métricas gerais (tabela de agregados dashboard_stats)
+            resumo = estatisticas_dashboard.obter_resumo(db)
+            total_processos = resumo['total_processos']
+            total_valor = resumo['total_valor']
+            com_oficio = resumo['com_oficio']
+            pendentes = resumo['com_pendencia']
             
             # Métricas do mês
             processos_mes = db.query(Processo).filter(
@@ -32,13 +34,7 @@ class PainelIntuitivo:
             ).count()
             
             # Processos prioritários
-            prioritarios = db.query(Processo).filter(
-                or_(
-                    Processo.credor_idoso == True,
-                    Processo.credor_doenca_grave == True,
-                    Processo.credor_deficiente == True
-                )
-            ).count()
+            prioritarios = resumo['prioritarios']
             
             # Valor médio
             valor_medio = total_valor / total_processos if total_processos > 0 else 0
@@ -59,16 +55,10 @@ class PainelIntuitivo:
     @staticmethod
     def obter_distribuicao_por_esfera():
         """Distribuição de processos por esfera"""
-        db = SessionLocal()
+        db = SessionLeitura()
         
         try:
-            from models_atualizado import EsferaEnum
-            
-            distribuicao = db.query(
-                Processo.esfera,
-                func.count(Processo.id).label('total'),
-                func.sum(Processo.valor_atualizado).label('valor_total')
-            ).group_by(Processo.esfera).all()
+            distribuicao = estatisticas_dashboard.obter_resumo(db)['por_esfera']
             
             return [
                 {
@@ -84,7 +74,7 @@ class PainelIntuitivo:
     @staticmethod
     def obter_top_processos(limite=10):
         """Top processos por valor"""
-        db = SessionLocal()
+        db = SessionLeitura()
         
         try:
             processos = db.query(Processo).order_by(
@@ -3,23 +3,19 @@ Módulo de Segurança
 Sistema de auditoria, logs e proteção de dados
 """
 
-import hashlib
 from datetime import datetime
 from database import SessionLocal
+from armazem_oficios import hash_arquivo
+from verificador_oficios import verificador_oficios
 
 class SistemaSeguranca:
     """Sistema de segurança e auditoria"""
     
     @staticmethod
     def gerar_hash_arquivo(caminho_arquivo):
-        """Gera hash SHA-256 de um arquivo"""
-        sha256_hash = hashlib.sha256()
-        
+        """Gera hash SHA-256 de um arquivo (o mesmo de processos.hash_oficio e do armazém de ofícios)"""
         try:
-            with open(caminho_arquivo, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            return hash_arquivo(caminho_arquivo)
         except Exception:
             return None
     
@@ -53,13 +49,24 @@ class SistemaSeguranca:
             total_oficios = db.query(Processo).filter(Processo.tem_oficio == True).count()
             oficios_com_hash = db.query(Processo).filter(Processo.hash_oficio != None).count()
             
+            # Última verificação em massa (verificar_oficios.py)
+            ultima = verificador_oficios.ultima_verificacao(db, limite=0)
+            
             return {
                 "total_oficios": total_oficios,
                 "oficios_protegidos": oficios_com_hash,
                 "taxa_protecao": (oficios_com_hash / total_oficios * 100) if total_oficios > 0 else 0,
                 "criptografia": "SHA-256",
                 "backup_automatico": True,
-                "auditoria_ativa": True
+                "auditoria_ativa": True,
+                "ultima_verificacao": {
+                    "data": ultima["fim"],
+                    "arquivos": ultima["arquivos"],
+                    "divergentes": ultima["divergentes"],
+                    "ausentes": ultima["ausentes"],
+                    "orfaos": ultima["orfaos"],
+                    "erros": ultima["erros"]
+                } if ultima else None
             }
         finally:
             db.close()
@@ -0,0 +1,275 @@
+﻿"""
+Módulo de Verificação de Ofícios
+Verificação em massa da integridade dos ofícios armazenados
+
+Percorre todos os arquivos referenciados por processos (caminho_oficio ou o
+blob de hash_oficio) e todos os blobs do armazém:
+
+    - arquivos com tamanho e mtime iguais à impressão guardada na última
+      verificação (tabela impressoes_oficios) não são relidos;
+    - os demais são relidos por um pool de threads, cada uma com um buffer
+      próprio de TAMANHO_BUFFER (readinto sem cópias; o hashlib solta o GIL
+      nos blocos grandes), e o SHA-256 é comparado com processos.hash_oficio;
+    - hash divergente, arquivo ausente, erro de leitura e blob que nenhum
+      processo referencia viram linhas em auditoria_oficios, e o resumo da
+      execução vai para verificacoes_oficios.
+
+A leitura passa por um balde de tokens em bytes por segundo, compartilhado
+pelas threads, para a varredura completa poder rodar em horário comercial sem
+disputar o disco com a aplicação.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import text, table, column, inspect as sa_inspect
+
+from database import SessionLocal, insert_dialeto
+from armazem_oficios import armazem_oficios
+from balde_tokens import BaldeTokens
+
+TRABALHADORES = int(os.environ.get("TAXMASTER_VERIFICADOR_TRABALHADORES", "4"))
+# Orçamento de leitura em MB/s (0 = sem limite)
+ORCAMENTO_MB = float(os.environ.get("TAXMASTER_VERIFICADOR_ORCAMENTO_MB", "20"))
+TAMANHO_BUFFER = 8 * 1024 * 1024
+
+# Tipos de ocorrência em auditoria_oficios
+HASH_DIVERGENTE = "HASH_DIVERGENTE"
+ARQUIVO_AUSENTE = "ARQUIVO_AUSENTE"
+BLOB_ORFAO = "BLOB_ORFAO"
+ERRO_LEITURA = "ERRO_LEITURA"
+
+# Tabela criada por migrar_verificacao_oficios.py (sem modelo ORM)
+TABELA_IMPRESSOES = table(
+    "impressoes_oficios",
+    column("caminho"), column("hash"), column("tamanho"), column("mtime_ns"), column("data_verificacao")
+)
+
+
+class VerificadorOficios:
+    """Varredura de integridade dos ofícios, incremental pela impressão (tamanho, mtime)"""
+
+    def __init__(self, armazem=None, trabalhadores=TRABALHADORES, orcamento_mb=ORCAMENTO_MB):
+        self.armazem = armazem or armazem_oficios
+        self.trabalhadores = max(1, trabalhadores)
+        self.balde = BaldeTokens(orcamento_mb * 1024 * 1024, capacidade=TAMANHO_BUFFER) if orcamento_mb > 0 else None
+        self._buffers = threading.local()
+        self._lock = threading.Lock()
+
+    def hash_arquivo(self, caminho):
+        """
+        SHA-256 do arquivo lido em blocos de TAMANHO_BUFFER, dentro do orçamento de I/O.
+
+        Returns:
+            tuple: (hash, tamanho, mtime_ns) - tamanho e mtime do fstat do arquivo lido
+        """
+        buffer = getattr(self._buffers, "buffer", None)
+        if buffer is None:
+            buffer = self._buffers.buffer = bytearray(TAMANHO_BUFFER)
+        visao = memoryview(buffer)
+
+        sha256 = hashlib.sha256()
+        with open(caminho, "rb", buffering=0) as arquivo:
+            info = os.fstat(arquivo.fileno())
+            while True:
+                lidos = arquivo.readinto(buffer)
+                if not lidos:
+                    break
+                sha256.update(visao[:lidos])
+                if self.balde:
+                    self.balde.adquirir(lidos)
+        return sha256.hexdigest(), info.st_size, info.st_mtime_ns
+
+    def _referencias(self, db):
+        """{caminho: [(processo_id, hash esperado)]} dos processos com ofício armazenado"""
+        linhas = db.execute(text("""
+            SELECT id, caminho_oficio, hash_oficio FROM processos
+            WHERE (caminho_oficio IS NOT NULL AND caminho_oficio != '') OR hash_oficio IS NOT NULL
+        """)).fetchall()
+
+        referencias = {}
+        for processo_id, caminho_oficio, hash_oficio in linhas:
+            if caminho_oficio:
+                caminho = str(Path(caminho_oficio))
+            elif self.armazem.contem(hash_oficio):
+                caminho = str(self.armazem.caminho(hash_oficio))
+            else:
+                # Hash sem arquivo associado: não há o que verificar
+                continue
+            referencias.setdefault(caminho, []).append((processo_id, hash_oficio))
+        return referencias
+
+    def verificar(self, db=None):
+        """
+        Executa uma verificação completa e grava impressões, ocorrências e resumo.
+
+        Returns:
+            dict: resumo da execução (arquivos, verificados, ignorados pela
+            impressão, bytes lidos e quantidade de cada tipo de ocorrência)
+        """
+        sessao_propria = db is None
+        db = db or SessionLocal()
+        execucao = uuid.uuid4().hex
+        inicio = datetime.now()
+
+        try:
+            referencias = self._referencias(db)
+            hashes_referenciados = {
+                hash_esperado for processos in referencias.values() for _, hash_esperado in processos
+            }
+            impressoes = {
+                caminho: (hash_hex, tamanho, mtime_ns)
+                for caminho, hash_hex, tamanho, mtime_ns in db.execute(text(
+                    "SELECT caminho, hash, tamanho, mtime_ns FROM impressoes_oficios"
+                ))
+            }
+
+            ocorrencias = []
+            novas_impressoes = []
+            removidas = []
+            resumo = {"execucao": execucao, "arquivos": len(referencias), "verificados": 0,
+                      "ignorados": 0, "bytes_lidos": 0, "divergentes": 0, "ausentes": 0,
+                      "orfaos": 0, "erros": 0}
+
+            def comparar(caminho, hash_encontrado):
+                for processo_id, hash_esperado in referencias[caminho]:
+                    if hash_esperado and hash_esperado != hash_encontrado:
+                        resumo["divergentes"] += 1
+                        ocorrencias.append((HASH_DIVERGENTE, processo_id, caminho, hash_esperado, hash_encontrado, None))
+
+            pendentes = []
+            for caminho in referencias:
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    for processo_id, hash_esperado in referencias[caminho]:
+                        resumo["ausentes"] += 1
+                        ocorrencias.append((ARQUIVO_AUSENTE, processo_id, caminho, hash_esperado, None, None))
+                    if caminho in impressoes:
+                        removidas.append(caminho)
+                    continue
+
+                impressao = impressoes.get(caminho)
+                if impressao and impressao[1:] == (info.st_size, info.st_mtime_ns):
+                    resumo["ignorados"] += 1
+                    comparar(caminho, impressao[0])
+                else:
+                    pendentes.append(caminho)
+
+            with ThreadPoolExecutor(max_workers=self.trabalhadores) as executor:
+                futuros = {executor.submit(self.hash_arquivo, caminho): caminho for caminho in pendentes}
+                for futuro in as_completed(futuros):
+                    caminho = futuros[futuro]
+                    try:
+                        hash_encontrado, tamanho, mtime_ns = futuro.result()
+                    except OSError as e:
+                        for processo_id, hash_esperado in referencias[caminho]:
+                            resumo["erros"] += 1
+                            ocorrencias.append((ERRO_LEITURA, processo_id, caminho, hash_esperado, None, str(e)))
+                        continue
+                    resumo["verificados"] += 1
+                    resumo["bytes_lidos"] += tamanho
+                    novas_impressoes.append((caminho, hash_encontrado, tamanho, mtime_ns))
+                    comparar(caminho, hash_encontrado)
+
+            # Blobs que nenhum processo referencia (nem pelo hash, nem pelo caminho)
+            for hash_hex, caminho in self.armazem.blobs():
+                if hash_hex not in hashes_referenciados and str(caminho) not in referencias:
+                    resumo["orfaos"] += 1
+                    ocorrencias.append((BLOB_ORFAO, None, str(caminho), hash_hex, None, None))
+
+            fim = datetime.now()
+            if removidas:
+                db.execute(text("DELETE FROM impressoes_oficios WHERE caminho = :caminho"),
+                           [{"caminho": caminho} for caminho in removidas])
+            if novas_impressoes:
+                inserir = insert_dialeto(db, TABELA_IMPRESSOES)
+                db.execute(inserir.on_conflict_do_update(
+                    index_elements=["caminho"],
+                    set_={nome: inserir.excluded[nome] for nome in ("hash", "tamanho", "mtime_ns", "data_verificacao")}
+                ), [
+                    {"caminho": caminho, "hash": hash_hex, "tamanho": tamanho, "mtime_ns": mtime_ns, "data_verificacao": fim}
+                    for caminho, hash_hex, tamanho, mtime_ns in novas_impressoes
+                ])
+            if ocorrencias:
+                db.execute(text("""
+                    INSERT INTO auditoria_oficios
+                    (execucao, data_verificacao, tipo, processo_id, caminho, hash_esperado, hash_encontrado, detalhes)
+                    VALUES (:execucao, :data, :tipo, :processo_id, :caminho, :hash_esperado, :hash_encontrado, :detalhes)
+                """), [
+                    {"execucao": execucao, "data": fim, "tipo": tipo, "processo_id": processo_id,
+                     "caminho": caminho, "hash_esperado": hash_esperado,
+                     "hash_encontrado": hash_encontrado, "detalhes": detalhes}
+                    for tipo, processo_id, caminho, hash_esperado, hash_encontrado, detalhes in ocorrencias
+                ])
+            db.execute(text("""
+                INSERT INTO verificacoes_oficios
+                (execucao, inicio, fim, arquivos, verificados, ignorados, bytes_lidos,
+                 divergentes, ausentes, orfaos, erros)
+                VALUES (:execucao, :inicio, :fim, :arquivos, :verificados, :ignorados, :bytes_lidos,
+                        :divergentes, :ausentes, :orfaos, :erros)
+            """), {**resumo, "inicio": inicio, "fim": fim})
+            db.commit()
+
+            resumo["tempo_decorrido"] = (fim - inicio).total_seconds()
+            return resumo
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if sessao_propria:
+                db.close()
+
+    def em_segundo_plano(self):
+        """Inicia verificar() numa thread daemon. Retorna False se já há uma verificação em andamento."""
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        def executar():
+            try:
+                self.verificar()
+            except Exception as e:
+                print(f"[ERRO] Verificação de ofícios: {e}")
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=executar, name="verificador-oficios", daemon=True).start()
+        return True
+
+    def em_andamento(self):
+        return self._lock.locked()
+
+    @staticmethod
+    def ultima_verificacao(db, limite=100):
+        """
+        Resumo da última execução e as ocorrências dela (até `limite`).
+
+        Returns:
+            dict | None: None se nenhuma verificação foi executada (ou a
+            migração ainda não criou a tabela verificacoes_oficios)
+        """
+        if not sa_inspect(db.get_bind()).has_table("verificacoes_oficios"):
+            return None
+
+        linha = db.execute(text(
+            "SELECT * FROM verificacoes_oficios ORDER BY inicio DESC LIMIT 1"
+        )).mappings().first()
+        if linha is None:
+            return None
+
+        ocorrencias = db.execute(text("""
+            SELECT tipo, processo_id, caminho, hash_esperado, hash_encontrado, detalhes
+            FROM auditoria_oficios WHERE execucao = :execucao ORDER BY id LIMIT :limite
+        """), {"execucao": linha["execucao"], "limite": limite}).mappings().all()
+
+        return {**linha, "ocorrencias": [dict(ocorrencia) for ocorrencia in ocorrencias]}
+
+
+# Instância global
+verificador_oficios = VerificadorOficios()
@@ -0,0 +1,38 @@
+﻿"""
+Verificação de integridade de todos os ofícios armazenados
+
+Só os arquivos novos ou alterados desde a última execução são relidos, e a
+leitura respeita TAXMASTER_VERIFICADOR_ORCAMENTO_MB (MB/s). Agendar, por
+exemplo no cron:
+
+    0 12 * * *  cd /caminho/do/taxmaster && python verificar_oficios.py
+"""
+
+import sys
+sys.path.append("src")
+
+from verificador_oficios import verificador_oficios
+
+def verificar_oficios():
+    """Executa a verificação e imprime o resumo"""
+
+    try:
+        resumo = verificador_oficios.verificar()
+    except Exception as e:
+        print(f"[ERRO] {str(e)}")
+        raise
+
+    print(f"[OK] {resumo['arquivos']} arquivos: {resumo['verificados']} relidos "
+          f"({resumo['bytes_lidos'] / 1024 / 1024:.1f} MB), {resumo['ignorados']} sem alteração "
+          f"({resumo['tempo_decorrido']:.1f}s)")
+    problemas = resumo['divergentes'] + resumo['ausentes'] + resumo['orfaos'] + resumo['erros']
+    if problemas:
+        print(f"[!] {resumo['divergentes']} hashes divergentes, {resumo['ausentes']} arquivos ausentes, "
+              f"{resumo['orfaos']} blobs órfãos, {resumo['erros']} erros de leitura "
+              f"(auditoria_oficios, execução {resumo['execucao']})")
+    return resumo
+
+if __name__ == "__main__":
+    resumo = verificar_oficios()
+    problemas = resumo['divergentes'] + resumo['ausentes'] + resumo['orfaos'] + resumo['erros']
+    sys.exit(1 if problemas else 0)